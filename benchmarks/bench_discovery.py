@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""Compares cold-start discovery of installed distributions.
+
+Generates synthetic site-packages directory with given number of
+distributions and measures (in fresh interpreters) how long it takes to list
+them with `pkg_resources.working_set` and with `pip_manager.discovery`.
+
+Usage:
+    python benchmarks/bench_discovery.py [--dists 5000] [--repeat 5]
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from synthetic import make_site_packages
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SNIPPETS = {
+    'pkg_resources': (
+        'import sys, time; t = time.time(); sys.path.insert(0, {path!r}); '
+        'import pkg_resources; '
+        'n = len(list(pkg_resources.working_set)); '
+        'print(time.time() - t, n)'
+    ),
+    'discovery': (
+        'import sys, time; t = time.time(); sys.path.insert(0, {path!r}); '
+        'sys.path.insert(0, {root!r}); '
+        'from pip_manager.discovery import iter_installed; '
+        'n = len(list(iter_installed())); '
+        'print(time.time() - t, n)'
+    ),
+}
+
+
+def measure(snippet, path, repeat):
+    """Runs snippet in fresh interpreters.
+
+    :return: Tuple of timings (seconds) and distributions count.
+    :rtype: tuple
+    """
+    timings = []
+    count = 0
+    for _ in range(repeat):
+        output = subprocess.check_output([
+            sys.executable, '-c', snippet.format(path=path, root=ROOT_DIR)
+        ]).decode()
+        elapsed, count = output.split()
+        timings.append(float(elapsed))
+    return timings, int(count)
+
+
+def run(dists_count, repeat):
+    """Runs benchmark.
+
+    :return: Results keyed by backend name.
+    :rtype: dict
+    """
+    path = tempfile.mkdtemp(prefix='pip-manager-bench-')
+    try:
+        make_site_packages(path, dists_count)
+        results = {}
+        for backend, snippet in sorted(SNIPPETS.items()):
+            timings, count = measure(snippet, path, repeat)
+            results[backend] = {
+                'min': min(timings),
+                'median': sorted(timings)[len(timings) // 2],
+                'dists': count,
+            }
+        return results
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dists', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    results = run(args.dists, args.repeat)
+    for backend, result in sorted(results.items()):
+        print('{:<15} median {:.3f}s  min {:.3f}s  ({} dists)'.format(
+            backend, result['median'], result['min'], result['dists']
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""Measures memory footprint of distributions list.
+
+Builds given number of synthetic distributions spread over several
+environments (names and versions are parsed from separate strings, like
+directory names of different environments) and measures memory allocated for
+them with `pip_manager.distribution.Distribution` and with a plain
+dict-backed class (how distributions used to be stored).
+
+Usage:
+    python benchmarks/bench_memory.py [--dists 50000] [--envs 5]
+"""
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # noqa: E501 line too long
+
+from pip_manager.distribution import PENDING  # noqa: E402 import not at top
+from pip_manager.distribution import Distribution  # noqa: E402 import not at top
+
+
+class DictDistribution(object):
+    def __init__(self, name, version, newest_version=PENDING, env=None):
+        self.name = name
+        self.version = version
+        self.newest_version = newest_version
+        self.env = env
+        self.is_selected = False
+
+
+def iter_entries(dists_count, envs_count):
+    """Yields names, versions and environments of synthetic distributions.
+
+    Every environment has its own copies of strings - the same projects
+    are installed in many environments.
+    """
+    per_env = dists_count // envs_count
+    for env in range(envs_count):
+        for i in range(per_env):
+            entry = 'synthetic_dist_{}-1.{}.0.dist-info'.format(i, i % 20)
+            name, _, rest = entry.partition('-')
+            yield name, rest.rpartition('.dist-info')[0], env
+
+
+def measure(cls, dists_count, envs_count):
+    """Measures memory allocated for distributions of given class.
+
+    :return: Tuple of allocated bytes and distributions count.
+    :rtype: tuple
+    """
+    gc.collect()
+    tracemalloc.start()
+    distributions = [
+        cls(name=name, version=version, env=env)
+        for name, version, env in iter_entries(dists_count, envs_count)
+    ]
+    by_name = dict(((d.env, d.name), d) for d in distributions)
+    allocated = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    assert len(by_name) == len(distributions)
+    return allocated, len(distributions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dists', type=int, default=50000)
+    parser.add_argument('--envs', type=int, default=5)
+    args = parser.parse_args()
+
+    for label, cls in (('dict', DictDistribution), ('slots', Distribution)):
+        allocated, count = measure(cls, args.dists, args.envs)
+        print('{:<6} {:>8.1f} MiB  {:>4} B/dist  ({} dists)'.format(
+            label, allocated / 1024.0 / 1024, allocated // count, count
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,335 @@
+# -*- coding: utf-8 -*-
+"""Benchmarks startup, version resolution, rendering and jobs.
+
+Runs against synthetic environments (see `synthetic.py`) of given sizes:
+
+- `discovery` - wall time of `PipManager.get_distributions` on synthetic
+  site-packages,
+- `resolve` - throughput of newest version lookups against a local fake
+  index with configurable latency,
+- `render` - per-keystroke cost of moving the cursor and of typing filter
+  query (`Gui.draw_distributions` under a curses stub),
+- `jobs` - upgrades and removals of many packages batched into one pip run
+  vs one pip run per package (with a fake pip).
+
+Results can be stored as JSON and compared with results of another revision
+(exit status is 1 if anything got slower by more than the threshold).
+
+Usage:
+    python benchmarks/bench_suite.py [--dists 100 1000 20000] [--latency 0.01]
+        [--only render jobs] [--output results.json]
+        [--compare baseline.json] [--threshold 0.1]
+"""
+import argparse
+import datetime
+import functools
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from synthetic import FakeIndex
+from synthetic import dist_name
+from synthetic import dist_version
+from synthetic import make_fake_python
+from synthetic import make_site_packages
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from pip_manager import app  # noqa: E402 import not at top
+from pip_manager import gui  # noqa: E402 import not at top
+from pip_manager import index  # noqa: E402 import not at top
+from pip_manager.commands import pip_install  # noqa: E402 import not at top
+from pip_manager.commands import pip_uninstall  # noqa: E402 import not at top
+from pip_manager.discovery import iter_installed  # noqa: E402 import not at top
+from pip_manager.distribution import Distribution  # noqa: E402 import not at top
+from pip_manager.jobs import DONE  # noqa: E402 import not at top
+from pip_manager.jobs import Job  # noqa: E402 import not at top
+from pip_manager.jobs import JobQueue  # noqa: E402 import not at top
+from pip_manager.profiling import clock  # noqa: E402 import not at top
+from pip_manager.profiling import percentile  # noqa: E402 import not at top
+from pip_manager.resolver import Resolver  # noqa: E402 import not at top
+from pip_manager.search import SearchIndex  # noqa: E402 import not at top
+from pip_manager.viewport import ColumnWidths  # noqa: E402 import not at top
+from pip_manager.viewport import Viewport  # noqa: E402 import not at top
+
+BENCHMARKS = ('discovery', 'resolve', 'render', 'jobs')
+
+
+def _noop(*args, **kwargs):
+    return None
+
+
+class _StubWindow(object):
+    """Curses window which draws nothing."""
+
+    def __init__(self, lines=50, columns=80):
+        self._size = (lines, columns)
+
+    def getmaxyx(self):
+        return self._size
+
+    def __getattr__(self, name):
+        return _noop
+
+
+class _StubCurses(object):
+    """Stand-in for curses module, so only pip-manager's own work is
+    measured."""
+
+    error = Exception
+    A_BOLD = A_DIM = A_NORMAL = A_REVERSE = A_UNDERLINE = 0
+
+    def initscr(self):
+        return _StubWindow()
+
+    def newwin(self, *args):
+        return _StubWindow()
+
+    def __getattr__(self, name):
+        return _noop
+
+
+def _result(value, unit, better='lower', **details):
+    details.update(value=value, unit=unit, better=better)
+    return details
+
+
+def _timings(timings, unit='s', scale=1):
+    timings = sorted(t * scale for t in timings)
+    return _result(
+        percentile(timings, 0.5), unit, min=timings[0],
+        p95=percentile(timings, 0.95), samples=len(timings),
+    )
+
+
+def _synthetic_dists(count):
+    return [
+        Distribution(name=dist_name(i), version=dist_version(i))
+        for i in range(count)
+    ]
+
+
+def bench_discovery(dists_count, repeat, workdir):
+    site = os.path.join(workdir, 'site-packages-{}'.format(dists_count))
+    make_site_packages(site, dists_count)
+    stub = argparse.Namespace(environments=None)
+    original = app.iter_installed
+    app.iter_installed = lambda paths=None: iter_installed([site])
+    try:
+        timings = []
+        for _ in range(repeat):
+            started = clock()
+            distributions = app.PipManager.get_distributions(stub)
+            timings.append(clock() - started)
+    finally:
+        app.iter_installed = original
+    assert len(distributions) == dists_count
+    return {'get_distributions': _timings(timings)}
+
+
+def bench_resolve(dists_count, latency, workers):
+    fake_index = FakeIndex(latency=latency)
+    index.set_version_source(index.SimpleIndexSource([fake_index.url]))
+    try:
+        distributions = _synthetic_dists(dists_count)
+        started = clock()
+        resolver = Resolver(distributions, workers)
+        for _ in resolver.iter_resolved():
+            pass
+        elapsed = clock() - started
+    finally:
+        index.set_version_source(None)
+        fake_index.shutdown()
+    assert all(d.newest_version == '2.0.0' for d in distributions)
+    return {'throughput': _result(
+        dists_count / elapsed, 'dists/s', better='higher', seconds=elapsed,
+        requests=fake_index.requests, latency=latency, workers=workers,
+    )}
+
+
+def bench_render(dists_count, keystrokes):
+    original = gui.curses
+    gui.curses = _StubCurses()
+    try:
+        screen = gui.Gui(line_width=79)
+        distributions = _synthetic_dists(dists_count)
+        widths = ColumnWidths(distributions)
+        viewport = Viewport(total=dists_count, height=screen.dist_win_height)
+
+        def draw(view):
+            screen.draw_distributions(
+                view[viewport.top:viewport.bottom], viewport.top,
+                viewport.total, viewport.cursor_row, widths,
+            )
+
+        draw(distributions)
+        move = []
+        for _ in range(keystrokes):
+            started = clock()
+            viewport.move(1)
+            draw(distributions)
+            move.append(clock() - started)
+
+        search_index = SearchIndex([d.name for d in distributions])
+        query = dist_name(dists_count - 1)
+        typing = []
+        for _ in range(max(keystrokes // len(query), 1)):
+            for end in range(1, len(query) + 1):
+                started = clock()
+                view = [distributions[i] for i in search_index.search(query[:end])]  # noqa: E501 line too long
+                viewport.resize(total=len(view))
+                viewport.move_to(0)
+                draw(view)
+                typing.append(clock() - started)
+        screen.stdscr = None  # Nothing to clean up.
+    finally:
+        gui.curses = original
+    return {
+        'move': _timings(move, 'us', 1e6),
+        'filter': _timings(typing, 'us', 1e6),
+    }
+
+
+def bench_jobs(packages, pip_startup, workdir):
+    python = make_fake_python(
+        os.path.join(workdir, 'python'), startup=pip_startup
+    )
+    names = [dist_name(i) for i in range(packages)]
+    results = {}
+    for kind, action, options in (
+        ('upgrade', pip_install, {'pip_version': '23.0'}),
+        ('remove', pip_uninstall, {}),
+    ):
+        for label, batches in (
+            ('batched', [names]), ('one_by_one', [[n] for n in names]),
+        ):
+            queue = JobQueue(history=len(batches))
+            started = clock()
+            for batch in batches:
+                queue.submit(Job(kind, [], functools.partial(
+                    action, batch, python=python, **options
+                )))
+            queue.wait()
+            elapsed = clock() - started
+            assert all(job.state == DONE for job in queue.drain())
+            results['{}.{}'.format(kind, label)] = _result(
+                elapsed, 's', packages=packages, pip_runs=len(batches),
+            )
+    return results
+
+
+def run(args):
+    """Runs selected benchmarks.
+
+    :return: Results keyed by `<benchmark>.<metric>[<size>]`.
+    :rtype: dict
+    """
+    results = {}
+
+    def add(benchmark, size, metrics):
+        for metric, result in sorted(metrics.items()):
+            key = '{}.{}[{}]'.format(benchmark, metric, size)
+            results[key] = result
+            print('{:<36} {:>12.3f} {}'.format(key, result['value'], result['unit']))  # noqa: E501 line too long
+            sys.stdout.flush()
+
+    workdir = tempfile.mkdtemp(prefix='pip-manager-bench-')
+    try:
+        for dists_count in args.dists:
+            if 'discovery' in args.only:
+                add('discovery', dists_count, bench_discovery(
+                    dists_count, args.repeat, workdir
+                ))
+            if 'resolve' in args.only:
+                resolved = min(dists_count, args.resolve_limit)
+                add('resolve', resolved, bench_resolve(
+                    resolved, args.latency, args.workers
+                ))
+            if 'render' in args.only:
+                add('render', dists_count, bench_render(
+                    dists_count, args.keystrokes
+                ))
+        if 'jobs' in args.only:
+            add('jobs', args.packages, bench_jobs(
+                args.packages, args.pip_startup, workdir
+            ))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def get_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR,
+            stderr=subprocess.STDOUT,
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    """Prints changes against baseline results.
+
+    :return: Keys of results which got worse by more than threshold.
+    :rtype: list
+    """
+    regressions = []
+    print('\n{:<36} {:>12} {:>12} {:>8}'.format(
+        'benchmark', 'baseline', 'current', 'change'
+    ))
+    for key in sorted(set(results) & set(baseline)):
+        current, previous = results[key]['value'], baseline[key]['value']
+        change = (current - previous) / previous if previous else 0.0
+        worse = -change if results[key]['better'] == 'higher' else change
+        flag = ''
+        if worse > threshold:
+            regressions.append(key)
+            flag = '  REGRESSION'
+        print('{:<36} {:>12.3f} {:>12.3f} {:>+7.1%}{}'.format(
+            key, previous, current, change, flag
+        ))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dists', type=int, nargs='+', default=[100, 1000])
+    parser.add_argument('--only', nargs='+', choices=BENCHMARKS, default=BENCHMARKS)  # noqa: E501 line too long
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--latency', type=float, default=0.01, help='seconds per index request')  # noqa: E501 line too long
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--resolve-limit', type=int, default=500, help='max distributions resolved per size')  # noqa: E501 line too long
+    parser.add_argument('--keystrokes', type=int, default=200)
+    parser.add_argument('--packages', type=int, default=20, help='packages upgraded and removed by jobs benchmark')  # noqa: E501 line too long
+    parser.add_argument('--pip-startup', type=float, default=0.0, help='extra seconds every fake pip run takes')  # noqa: E501 line too long
+    parser.add_argument('--output', help='write results to JSON file')
+    parser.add_argument('--compare', metavar='BASELINE', help='compare with results JSON file')  # noqa: E501 line too long
+    parser.add_argument('--threshold', type=float, default=0.1)
+    args = parser.parse_args()
+
+    results = run(args)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'revision': get_revision(),
+                'created': datetime.datetime.utcnow().isoformat() + 'Z',
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'options': vars(args),
+                'results': results,
+            }, f, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
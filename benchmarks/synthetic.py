@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""Synthetic environments for benchmarks.
+
+- `make_site_packages` - site-packages directory with given number of
+  distributions,
+- `FakeIndex` - local "simple" index serving every synthetic project with
+  configurable latency,
+- `make_fake_python` - interpreter stand-in whose `-m pip install/uninstall`
+  only pretends to do the work (POSIX only).
+"""
+import os
+import stat
+import sys
+import threading
+import time
+
+try:
+    from http.server import BaseHTTPRequestHandler
+    from http.server import HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler
+    from BaseHTTPServer import HTTPServer
+    from SocketServer import ThreadingMixIn
+
+METADATA = 'Metadata-Version: 2.1\nName: {name}\nVersion: {version}\n'
+
+
+def dist_name(i):
+    return 'synthetic_dist_{}'.format(i)
+
+
+def dist_version(i):
+    return '1.{}.0'.format(i % 100)
+
+
+def make_site_packages(path, dists_count):
+    """Creates synthetic site-packages with `dists_count` distributions."""
+    for i in range(dists_count):
+        name, version = dist_name(i), dist_version(i)
+        dist_info = os.path.join(
+            path, '{}-{}.dist-info'.format(name, version)
+        )
+        os.makedirs(dist_info)
+        with open(os.path.join(dist_info, 'METADATA'), 'w') as f:
+            f.write(METADATA.format(name=name, version=version))
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class FakeIndex(object):
+    """Serves PEP 503 project pages of every requested project.
+
+    Every project has `versions` releases (`1.0.0` ... `1.<versions-1>.0`
+    and `2.0.0`) and every response is delayed by `latency` seconds.
+    """
+
+    def __init__(self, latency=0.0, versions=20):
+        self.latency = latency
+        self.versions = versions
+        self.requests = 0
+        fake_index = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                fake_index.requests += 1
+                time.sleep(fake_index.latency)
+                body = fake_index.render(self.path.strip('/').split('/')[-1])
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = _ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = 'http://127.0.0.1:{}/simple/'.format(
+            self.server.server_address[1]
+        )
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def render(self, project):
+        versions = ['1.{}.0'.format(i) for i in range(self.versions)]
+        links = ''.join(
+            '<a href="../../files/{0}-{1}.tar.gz">{0}-{1}.tar.gz</a><br/>'.format(  # noqa: E501 line too long
+                project, version
+            )
+            for version in versions + ['2.0.0']
+        )
+        return '<html><body>{}</body></html>'.format(links).encode('utf-8')
+
+    def shutdown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+FAKE_PIP = '''#!{executable}
+import json, sys, time
+time.sleep({startup!r})
+command, options = sys.argv[3], sys.argv[4:]
+names, report = [], None
+with_value = ('--report', '--find-links', '--index-url')
+i = 0
+while i < len(options):
+    if options[i] in with_value:
+        if options[i] == '--report':
+            report = options[i + 1]
+        i += 2
+        continue
+    if not options[i].startswith('-'):
+        names.append(options[i])
+    i += 1
+for name in names:
+    time.sleep({per_package!r})
+    if command == 'uninstall':
+        print('Found existing installation: %s 1.0.0' % name)
+        print('  Successfully uninstalled %s-1.0.0' % name)
+if command == 'install':
+    print('Successfully installed ' + ' '.join(n + '-2.0.0' for n in names))
+    if report:
+        with open(report, 'w') as f:
+            json.dump({{'install': [
+                {{'metadata': {{'name': n, 'version': '2.0.0'}}}} for n in names
+            ]}}, f)
+'''
+
+
+def make_fake_python(path, startup=0.0, per_package=0.0):
+    """Creates executable pretending to be python with pip installed.
+
+    :param str path: Path of the executable to create.
+    :param float startup: Seconds every invocation takes.
+    :param float per_package: Seconds every package takes.
+    :return: Path of the executable.
+    :rtype: str
+    """
+    with open(path, 'w') as f:
+        f.write(FAKE_PIP.format(
+            executable=sys.executable, startup=startup,
+            per_package=per_package,
+        ))
+    os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR)
+    return path
@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+"""Known vulnerabilities from local OSV database.
+
+Database is a directory with advisories in OSV format (JSON files, e.g. the
+extracted `PyPI/all.zip` export of osv.dev), synced by other means. It is
+compiled into a binary index in cache directory (again whenever database
+changes), which is memory-mapped, so checking installed distributions takes
+milliseconds and nothing is parsed at startup.
+
+Index layout (little-endian):
+
+- header - magic, signature of the database directory, number of names,
+- names - sorted by normalized name: name offset and length, offset of the
+  first interval and number of intervals,
+- intervals - lower bound, upper bound (offsets and lengths of versions,
+  empty if unbounded), kind (see `FIXED`, `LAST_AFFECTED` and `EXACT`),
+  advisory ID (offset and length),
+- strings - UTF-8 encoded names, versions and advisory IDs.
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+
+from pip_manager.utils import get_cache_dir
+from pip_manager.utils import normalize_name
+from pip_manager.version import version_key
+
+INDEX_FILE_NAME = 'advisories.idx'
+MAGIC = b'PMOSV\x00\x01\x00'
+HEADER = struct.Struct('<8s40sI')
+NAME = struct.Struct('<IHII')
+INTERVAL = struct.Struct('<IHIHBIH')
+
+#: Affected from lower bound (inclusive) to upper bound (exclusive).
+FIXED = 0
+#: Affected from lower bound to upper bound (both inclusive).
+LAST_AFFECTED = 1
+#: Only version equal to lower bound is affected.
+EXACT = 2
+
+
+class InvalidAdvisoryDatabase(Exception):
+    pass
+
+
+def _iter_advisory_files(db_dir):
+    for root, dirs, files in os.walk(db_dir):
+        dirs.sort()
+        for filename in sorted(files):
+            if filename.endswith('.json'):
+                yield os.path.join(root, filename)
+
+
+def get_signature(db_dir):
+    """Gets signature of database directory (changes whenever any advisory
+    file is added, removed or modified).
+
+    :param str db_dir: Database directory.
+    :rtype: str
+    """
+    digest = hashlib.sha1()
+    for path in _iter_advisory_files(db_dir):
+        stat = os.stat(path)
+        digest.update('{}\0{}\0{}\0'.format(
+            os.path.relpath(path, db_dir), stat.st_size, stat.st_mtime
+        ).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def get_intervals(advisory):
+    """Gets affected PyPI versions from OSV advisory.
+
+    :param dict advisory: Advisory in OSV format.
+    :return: List of tuples of normalized name, lower bound, upper bound,
+        kind and advisory ID (bounds are '' if unbounded).
+    :rtype: list
+    """
+    if advisory.get('withdrawn'):
+        return []
+    intervals = []
+    advisory_id = advisory['id']
+    for affected in advisory.get('affected', []):
+        package = affected.get('package', {})
+        if package.get('ecosystem', '').split(':')[0] != 'PyPI':
+            continue
+        name = normalize_name(package['name'])
+        found = []
+        for affected_range in affected.get('ranges', []):
+            if affected_range.get('type') not in ('ECOSYSTEM', 'SEMVER'):
+                continue
+            introduced = None
+            for event in affected_range.get('events', []):
+                if 'introduced' in event:
+                    introduced = event['introduced']
+                    if introduced == '0':
+                        introduced = ''
+                elif introduced is not None and 'fixed' in event:
+                    found.append((introduced, event['fixed'], FIXED))
+                    introduced = None
+                elif introduced is not None and 'last_affected' in event:
+                    found.append(
+                        (introduced, event['last_affected'], LAST_AFFECTED)
+                    )
+                    introduced = None
+            if introduced is not None:
+                found.append((introduced, '', FIXED))
+        if not found:
+            # Enumerated versions are used only if there are no ranges, as
+            # the list may be very long.
+            found = [(v, v, EXACT) for v in affected.get('versions', [])]
+        intervals.extend(
+            (name, lower, upper, kind, advisory_id)
+            for lower, upper, kind in found
+        )
+    return intervals
+
+
+def build_index(db_dir, path, signature=None):
+    """Compiles OSV database into index file.
+
+    :param str db_dir: Database directory.
+    :param str path: Index file path (replaced atomically).
+    :param str signature: Signature of the database (computed if not
+        given).
+    :raises InvalidAdvisoryDatabase: If database directory does not exist.
+    """
+    if not os.path.isdir(db_dir):
+        raise InvalidAdvisoryDatabase(
+            'Advisory database not found: {}'.format(db_dir)
+        )
+    signature = signature or get_signature(db_dir)
+    by_name = {}
+    for advisory_path in _iter_advisory_files(db_dir):
+        try:
+            with open(advisory_path, 'rb') as f:
+                advisory = json.loads(f.read().decode('utf-8'))
+            intervals = get_intervals(advisory)
+        except (ValueError, KeyError, TypeError, AttributeError):
+            continue  # Not an OSV advisory.
+        for interval in intervals:
+            by_name.setdefault(interval[0], set()).add(interval[1:])
+
+    strings = bytearray()
+    offsets = {}
+
+    def add_string(text):
+        data = text.encode('utf-8')
+        if data not in offsets:
+            offsets[data] = len(strings)
+            strings.extend(data)
+        return offsets[data], len(data)
+
+    names = sorted(by_name, key=lambda n: n.encode('utf-8'))
+    names_size = NAME.size * len(names)
+    intervals_size = INTERVAL.size * sum(len(v) for v in by_name.values())
+    strings_start = HEADER.size + names_size + intervals_size
+    names_table, intervals_table = [], []
+    for name in names:
+        name_offset, name_length = add_string(name)
+        names_table.append(NAME.pack(
+            strings_start + name_offset, name_length,
+            HEADER.size + names_size + INTERVAL.size * len(intervals_table),
+            len(by_name[name]),
+        ))
+        for lower, upper, kind, advisory_id in sorted(by_name[name]):
+            lower_offset, lower_length = add_string(lower)
+            upper_offset, upper_length = add_string(upper)
+            id_offset, id_length = add_string(advisory_id)
+            intervals_table.append(INTERVAL.pack(
+                strings_start + lower_offset, lower_length,
+                strings_start + upper_offset, upper_length, kind,
+                strings_start + id_offset, id_length,
+            ))
+
+    directory = os.path.dirname(path)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+    fd, tmp_path = tempfile.mkstemp(dir=directory or None, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, signature.encode('ascii'), len(names)))
+        f.write(b''.join(names_table))
+        f.write(b''.join(intervals_table))
+        f.write(bytes(strings))
+    if sys.platform.startswith('win') and os.path.exists(path):
+        os.remove(path)
+    os.rename(tmp_path, path)
+
+
+class AdvisoryIndex(object):
+    """Memory-mapped advisory index."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, signature, self._names_count = HEADER.unpack_from(
+                self._map
+            )
+        except struct.error:
+            magic = None
+        if magic != MAGIC:
+            self.close()
+            raise ValueError('Not an advisory index: {}'.format(path))
+        self.signature = signature.decode('ascii')
+
+    def _string(self, offset, length):
+        return self._map[offset:offset + length].decode('utf-8')
+
+    def _find_name(self, name):
+        key = name.encode('utf-8')
+        low, high = 0, self._names_count
+        while low < high:
+            middle = (low + high) // 2
+            offset, length, first, count = NAME.unpack_from(
+                self._map, HEADER.size + NAME.size * middle
+            )
+            found = self._map[offset:offset + length]
+            if found == key:
+                return first, count
+            if found < key:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def get_advisories(self, name, version):
+        """Gets advisories affecting given distribution version.
+
+        :param str name: Distribution name (not necessarily normalized).
+        :param str version: Installed version.
+        :return: Sorted advisory IDs.
+        :rtype: list
+        """
+        found = self._find_name(normalize_name(name))
+        if found is None:
+            return []
+        first, count = found
+        key = version_key(version)
+        advisories = set()
+        for i in range(count):
+            (lower_offset, lower_length, upper_offset, upper_length, kind,
+             id_offset, id_length) = INTERVAL.unpack_from(
+                self._map, first + INTERVAL.size * i
+            )
+            lower = self._string(lower_offset, lower_length)
+            upper = self._string(upper_offset, upper_length)
+            if kind == EXACT:
+                affected = key == version_key(lower)
+            else:
+                affected = not lower or key >= version_key(lower)
+                if affected and upper:
+                    if kind == FIXED:
+                        affected = key < version_key(upper)
+                    else:
+                        affected = key <= version_key(upper)
+            if affected:
+                advisories.add(self._string(id_offset, id_length))
+        return sorted(advisories)
+
+    def close(self):
+        self._map.close()
+
+
+def load_advisories(db_dir, path=None):
+    """Opens index of given OSV database (building it first if it is missing
+    or out of date).
+
+    :param str db_dir: Database directory.
+    :param str path: Index file path (`advisories.idx` in cache directory by
+        default).
+    :rtype: AdvisoryIndex
+    :raises InvalidAdvisoryDatabase: If database directory does not exist.
+    """
+    if not os.path.isdir(db_dir):
+        raise InvalidAdvisoryDatabase(
+            'Advisory database not found: {}'.format(db_dir)
+        )
+    path = path or os.path.join(get_cache_dir(), INDEX_FILE_NAME)
+    signature = get_signature(db_dir)
+    try:
+        index = AdvisoryIndex(path)
+    except (IOError, OSError, ValueError):
+        index = None
+    if index is not None and index.signature == signature:
+        return index
+    if index is not None:
+        index.close()
+    build_index(db_dir, path, signature)
+    return AdvisoryIndex(path)
@@ -1,149 +1,799 @@
 # -*- coding: utf-8 -*-
 import curses
-import os
-import pkg_resources
-import subprocess
-import sys
+import functools
+from collections import OrderedDict
+from collections import namedtuple
 
+from pip_manager.advisories import load_advisories
+from pip_manager.commands import pip_install
+from pip_manager.commands import pip_uninstall
+from pip_manager.discovery import is_requested
+from pip_manager.discovery import iter_installed
+from pip_manager.depgraph import DependencyGraph
 from pip_manager.distribution import Distribution
+from pip_manager.environment import discover_environments
+from pip_manager.environment import get_python
 from pip_manager.gui import Gui
+from pip_manager.index import LocalSource
+from pip_manager.index import get_version_source
+from pip_manager.index import set_version_source
+from pip_manager.jobs import DONE
+from pip_manager.jobs import FAILED
+from pip_manager.jobs import REMOVE
+from pip_manager.jobs import RUNNING
+from pip_manager.jobs import UPGRADE
+from pip_manager.jobs import Job
+from pip_manager.jobs import JobQueue
+from pip_manager.lockfile import InvalidLockfile
+from pip_manager.profiling import clock
+from pip_manager.profiling import profiler
+from pip_manager.resolver import Resolver
+from pip_manager.search import SearchIndex
+from pip_manager.utils import get_advisory_db
+from pip_manager.utils import get_allow_prereleases
 from pip_manager.utils import get_protected_dists
+from pip_manager.utils import get_wheel_store_size
+from pip_manager.utils import get_workers_count
+from pip_manager.utils import normalize_name
+from pip_manager.version import version_key
+from pip_manager.viewport import ColumnWidths
+from pip_manager.viewport import Viewport
+from pip_manager.worker import get_worker_pool
+from pip_manager.wheelstore import WheelStore
+from pip_manager.wheelstore import install_with_store
 
 ENTER = 10
+ESCAPE = 27
 SPACE = ord(' ')
-DEVNULL = open(os.devnull, 'w')
+SLASH = ord('/')
+BACKSPACE_KEYS = (curses.KEY_BACKSPACE, 127, 8)
+RESOLVE_POLL_INTERVAL = 100  # milliseconds
+JOBS_SHOWN = 3
+
+SyncPlan = namedtuple('SyncPlan', ['env', 'install', 'remove'])
+
+
+def _group_by_env(distributions):
+    """Groups distributions by environment they are installed in.
+
+    :return: List of tuples of environment and its distributions (in order of
+        first appearance).
+    :rtype: list
+    """
+    groups = OrderedDict()
+    for d in distributions:
+        groups.setdefault(d.env, []).append(d)
+    return list(groups.items())
+
+
+def _describe(d):
+    if d.env is None:
+        return d.name
+    return '{} ({})'.format(d.name, d.env.label)
+
+
+def _describe_job(job):
+    return '#{} {} {}'.format(
+        job.id, job.kind, ', '.join(_describe(d) for d in job.distributions)
+    )
 
 
 class PipManager(object):
-    def __init__(self):
-        self.page = self.cursor_pos = 0
-        self.gui = Gui(line_width=79)
-        self.distributions = self.get_distributions()
+    def __init__(self, refresh=False, headless=False, environments=None,
+                 pre=False, find_links=None, mirror=None, advisory_db=None):
+        if find_links or mirror:
+            set_version_source(LocalSource(find_links or (), mirror))
+        version_source = get_version_source()
+        version_source.refresh = refresh
+        # Upgrades are installed from where the newest versions were found.
+        self.pip_args = list(version_source.pip_args)
+        wheel_store_size = get_wheel_store_size()
+        self.wheel_store = (
+            WheelStore(max_size=wheel_store_size) if wheel_store_size else None
+        )
+        Distribution.allow_prereleases = pre or get_allow_prereleases()
+        self.environments = environments
+        # Environments are inspected before the screen gets taken over, so
+        # errors are printed to the terminal as usual.
+        with profiler.span('startup.discover', 'startup'):
+            self.distributions = self.get_distributions()
+        self._by_name = self._index_by_name(self.distributions)
+        self.advisories = None
+        advisory_db = advisory_db or get_advisory_db()
+        if advisory_db:
+            with profiler.span('startup.advisories', 'startup'):
+                self.advisories = load_advisories(advisory_db)
+                self._check_advisories(self.distributions)
+        self._graphs = {}
+        self.gui = None
+        if not headless:
+            self._prewarm_workers()
+            with profiler.span('startup.gui', 'startup'):
+                self.gui = Gui(line_width=79)
+        self.filter_query = ''
+        self.view = self.distributions
+        self._search_index = None
+        self.viewport = Viewport(total=len(self.view))
+        self.widths = ColumnWidths(self.distributions)
+        self.resolver = Resolver(self.distributions, get_workers_count())
+        self.jobs = JobQueue()
+
+    def _prewarm_workers(self):
+        """Starts pip workers of all environments, so they are ready by the
+        time the first upgrade or removal is requested."""
+        pool = get_worker_pool()
+        if pool is not None:
+            for python in sorted(set(
+                get_python(d.env) for d in self.distributions
+            )):
+                pool.prewarm(python)
+
+    def _check_advisories(self, distributions):
+        """Looks up advisories affecting installed versions of given
+        distributions."""
+        if self.advisories is not None:
+            for d in distributions:
+                d.advisories = tuple(
+                    self.advisories.get_advisories(d.name, d.version)
+                )
 
     @property
     def dists_to_draw(self):
-        """Returns list of distributions to draw for current page and window
-        height.
+        """Returns list of distributions visible in the viewport.
 
         :return: List of distributions to draw.
         :rtype: list
         """
-        start_idx = self.page * self.gui.dist_win_height
-        stop_idx = start_idx + self.gui.dist_win_height
-        return self.distributions[start_idx:stop_idx]
+        return self.view[self.viewport.top:self.viewport.bottom]
+
+    @property
+    def search_index(self):
+        """Search index over names of distributions (built on first use).
+
+        :rtype: SearchIndex
+        """
+        if self._search_index is None:
+            self._search_index = SearchIndex(
+                [d.name for d in self.distributions]
+            )
+        return self._search_index
+
+    def set_filter(self, query):
+        """Narrows the list to distributions matching query.
+
+        :param str query: Substring or fuzzy query (empty shows everything).
+        """
+        self.filter_query = query
+        if query:
+            self.view = [
+                self.distributions[pos]
+                for pos in self.search_index.search(query)
+            ]
+        else:
+            self.view = self.distributions
+        self.viewport.resize(total=len(self.view))
+        self.viewport.move_to(0)
+
+    @staticmethod
+    def _index_by_name(distributions):
+        return dict(((d.env, d.name), d) for d in distributions)
+
+    def get_distribution(self, name, env=None):
+        """Gets installed distribution by name in O(1).
+
+        :param str name: Distribution name (not necessarily normalized).
+        :param Environment env: Environment (None for the current
+            interpreter).
+        :rtype: Distribution or None
+        """
+        return self._by_name.get((env, normalize_name(name)))
+
+    def _set_distributions(self, distributions):
+        """Replaces list of distributions keeping current filter."""
+        self.distributions = distributions
+        self._by_name = self._index_by_name(distributions)
+        self._search_index = None
+        cursor = self.viewport.cursor
+        self.set_filter(self.filter_query)
+        self.viewport.move_to(cursor)
 
     def get_distributions(self):
         """Gets list of installed distributions.
 
-        :return: List of installed distributions.
+        If environments were given, distributions of all of them are listed
+        (environments are inspected in parallel). Otherwise distributions of
+        the current interpreter are listed.
+
+        Newest versions are not known yet - they are resolved in the
+        background by `self.resolver`.
+
+        :return: List of installed distributions sorted by name (and
+            environment).
         :rtype: list
         """
-        distributions = []
-        for d in sorted(pkg_resources.working_set, key=lambda x: x.key):
-            self.gui.draw_popup(
-                'Checking the newest version for {}'.format(d.key)
+        if self.environments:
+            installed = [
+                (env, d)
+                for env, dists in discover_environments(
+                    self.environments, get_workers_count()
+                )
+                for d in dists
+            ]
+        else:
+            installed = [(None, d) for d in iter_installed()]
+        return sorted(
+            (Distribution(name=d.name, version=d.version, env=env, path=d.path) for env, d in installed),  # noqa: E501 line too long
+            key=lambda x: (x.name, x.env_label)
+        )
+
+    def get_graph(self, env=None):
+        """Gets dependency graph of given environment.
+
+        Graph is built on first use (it requires reading metadata of all
+        distributions) and then kept up to date incrementally.
+
+        :param Environment env: Environment (None for the current
+            interpreter).
+        :rtype: DependencyGraph
+        """
+        if env not in self._graphs:
+            self._graphs[env] = DependencyGraph(
+                d for d in self.distributions if d.env is env
+            )
+        return self._graphs[env]
+
+    def _refresh_metadata(self, env, names):
+        """Updates metadata paths (and dependency graph) of distributions
+        which got reinstalled. Distributions installed for the first time
+        (e.g. new dependencies) are added to the list."""
+        graph = self._graphs.get(env)
+        added = []
+        for installed in iter_installed(None if env is None else env.paths):
+            if installed.name not in names:
+                continue
+            d = self.get_distribution(installed.name, env)
+            if d is None:
+                d = Distribution(
+                    name=installed.name, version=installed.version, env=env,
+                    path=installed.path,
+                )
+                added.append(d)
+            else:
+                d.path = installed.path
+            if graph is not None:
+                graph.add(d.name, d.path)
+        if added:
+            for d in added:
+                self.widths.add(d)
+            self._check_advisories(added)
+            self.resolver.add(added)
+            self._set_distributions(sorted(
+                self.distributions + added,
+                key=lambda x: (x.name, x.env_label)
+            ))
+
+    def plan_upgrade(self, distributions):
+        """Plans upgrade of given distributions to their newest versions.
+
+        :return: List of tuples of environment, its distributions in order of
+            upgrade (dependencies first) and conflicts with requirements of
+            other installed distributions.
+        :rtype: list
+        """
+        plans = []
+        for env, dists in _group_by_env(distributions):
+            plan = self.get_graph(env).plan(
+                dict((d.name, d.newest_version) for d in dists)
             )
-            distributions.append(Distribution(name=d.key, version=d.version))
-        return distributions
+            plans.append((
+                env, [self.get_distribution(name, env) for name in plan.order],
+                plan.conflicts,
+            ))
+        return plans
+
+    def _confirm_upgrade(self, plans):
+        """Shows upgrade plan and asks for confirmation.
+
+        :rtype: bool
+        """
+        lines = ['Upgrade plan:']
+        conflicts = []
+        for env, dists, env_conflicts in plans:
+            for d in dists:
+                lines.append('  {} {} -> {}'.format(
+                    _describe(d), d.version, d.newest_version
+                ))
+            conflicts.extend((env, c) for c in env_conflicts)
+        if conflicts:
+            lines.append('Conflicts:')
+            for env, c in conflicts:
+                dependent = self.get_distribution(c.dependent, env)
+                lines.append('  {} requires {}{}'.format(
+                    _describe(dependent) if dependent else c.dependent,
+                    c.name, c.specifier
+                ))
+        lines.append('Proceed? [y/N]')
+        self.gui.draw_popup('\n'.join(lines))
+        return self.gui.stdscr.getch() in (ord('y'), ord('Y'))
 
     def toggle_one(self, idx):
         """Toggles selection of currently chosen distribution."""
-        self.distributions[
-            idx
-        ].is_selected = not self.distributions[idx].is_selected
+        if idx < len(self.view):
+            self.view[idx].is_selected = not self.view[idx].is_selected
 
     def toggle_all(self):
-        """Toggles selection of ALL distributions."""
-        is_all_checked = all(d.is_selected for d in self.distributions)
-        for d in self.distributions:
+        """Toggles selection of ALL distributions (matching the filter)."""
+        is_all_checked = all(d.is_selected for d in self.view)
+        for d in self.view:
             d.is_selected = not is_all_checked
 
+    def select_vulnerable(self):
+        """Selects all distributions (matching the filter) with known
+        advisories, so they can be upgraded at once.
+
+        :return: Number of selected vulnerable distributions.
+        :rtype: int
+        """
+        vulnerable = [d for d in self.view if d.is_vulnerable]
+        for d in vulnerable:
+            d.is_selected = True
+        return len(vulnerable)
+
     def update_distributions(self):
         """Updates selected distributions to newest stable version available.
+
+        Upgrade plan (distributions ordered by dependencies and requirements
+        of other installed distributions which would get broken) is shown
+        first and nothing is upgraded unless it gets confirmed.
+
+        All distributions of an environment are upgraded with single pip
+        invocation (so they are resolved together) run in the background by
+        `self.jobs`. Results are applied by `apply_finished_jobs`. If wheel
+        store is enabled, wheels are taken from (and added to) it.
         """
         to_update = [
-            d for d in self.distributions
-            if d.is_selected and d.newest_version != 'n/a' and
-            d.version != d.newest_version
+            d for d in self.distributions if d.is_selected and d.is_outdated
         ]
         if to_update:
-            for d in to_update:
-                self.gui.draw_popup('Upgrading {}'.format(d.name))
-                subprocess.call([sys.executable, '-m', 'pip', 'install', '-U', d.name], stderr=DEVNULL, stdout=DEVNULL)  # noqa: E501 line too long
-                d.version = d.newest_version
+            plans = self.plan_upgrade(to_update)
+            if not self._confirm_upgrade(plans):
+                return
+            for env, dists, _ in plans:
+                options = self._get_install_options(env)
+                if self.wheel_store is None:
+                    run = functools.partial(
+                        pip_install, [d.name for d in dists], **options
+                    )
+                else:
+                    run = functools.partial(
+                        install_with_store, self.wheel_store, dists, **options
+                    )
+                self.jobs.submit(Job(UPGRADE, dists, run, env))
             for d in self.distributions:
                 d.is_selected = False
 
+    def _get_install_options(self, env, extra_args=()):
+        """Gets keyword arguments of `pip_install` for given environment."""
+        options = {'python': get_python(env)}
+        if env is not None:
+            options['pip_version'] = env.pip_version
+        if self.pip_args or extra_args:
+            options['extra_args'] = self.pip_args + list(extra_args)
+        return options
+
+    def _confirm_installed(self, env, result):
+        """Keeps only distributions from pip's report which are really
+        installed in reported versions.
+
+        pip writes its report after resolving and before installing, so
+        report of failed run may list distributions which never got
+        installed.
+
+        :rtype: InstallResult
+        """
+        reported = result.installed
+        installed = dict(
+            (d.name, d.version)
+            for d in iter_installed(None if env is None else env.paths)
+            if d.name in reported
+        )
+        return result._replace(installed=dict(
+            (name, version) for name, version in reported.items()
+            if name in installed and
+            version_key(installed[name]) == version_key(version)
+        ))
+
+    def _apply_upgrade(self, job):
+        """Applies installed versions taken from pip's report (confirmed with
+        installed metadata if pip failed). Distributions which failed to
+        upgrade get selected again."""
+        result = job.result
+        if result is not None and not result.succeeded and result.installed:
+            result = self._confirm_installed(job.env, result)
+        if result is not None:
+            upgraded = []
+            for name, version in result.installed.items():
+                d = self.get_distribution(name, job.env)
+                if d is not None:
+                    self.widths.change_version(d.version, version)
+                    d.version = version
+                    upgraded.append(d)
+            self._check_advisories(upgraded)
+            self._refresh_metadata(job.env, result.installed)
+        for d in job.distributions:
+            if result is None or result.get_outcome(d.name) == 'failed':
+                d.is_selected = True
+
+    def plan_removal(self, distributions):
+        """Plans removal of given distributions.
+
+        Distributions mentioned in config.ini in [protected] section and all
+        distributions they (transitively) require are never removed.
+
+        :return: Tuple of distributions which can be removed and their
+            dependencies which nothing else would require after removal
+            (orphans), excluding ones which were installed on purpose.
+        :rtype: tuple
+        """
+        protected = get_protected_dists()
+        to_remove = []
+        orphans = []
+        for env, dists in _group_by_env(distributions):
+            graph = self.get_graph(env)
+            kept = graph.get_closure(
+                d.name for d in self.distributions
+                if d.env is env and d.name in protected
+            )
+            env_to_remove = [d for d in dists if d.name not in kept]
+
+            def keep(name, env=env, kept=kept):
+                d = self.get_distribution(name, env)
+                return d is None or name in kept or is_requested(d.path)
+
+            to_remove.extend(env_to_remove)
+            orphans.extend(
+                self.get_distribution(name, env) for name in
+                graph.find_orphans([d.name for d in env_to_remove], keep)
+            )
+        return to_remove, orphans
+
     def uninstall_distributions(self):
         """Uninstalls selected distributions.
 
         Does NOT uninstall distributions mentioned in config.ini in [protected]
-        section - you either have to remove them manually or remove them from
-        config.ini.
+        section (nor distributions they require) - you either have to remove
+        them manually or remove them from config.ini.
+
+        If some dependencies of removed distributions would not be needed
+        anymore, removing them too is offered.
+
+        All distributions of an environment are removed with single pip
+        invocation run in the background by `self.jobs`. Results are applied
+        by `apply_finished_jobs`.
         """
-        protected = get_protected_dists()
-        to_remove = [
-            d for d in self.distributions
-            if d.is_selected and d.name not in protected
-        ]
+        to_remove, orphans = self.plan_removal(
+            [d for d in self.distributions if d.is_selected]
+        )
         if to_remove:
             self.gui.draw_popup(
                 'Do you really want to remove selected packages? [y/N]'
             )
             if self.gui.stdscr.getch() in (ord('y'), ord('Y')):
+                if orphans:
+                    self.gui.draw_popup('\n'.join(
+                        ['Dependencies not needed anymore:'] +
+                        ['  {}'.format(_describe(d)) for d in orphans] +
+                        ['Remove them too? [y/N]']
+                    ))
+                    if self.gui.stdscr.getch() in (ord('y'), ord('Y')):
+                        to_remove = to_remove + orphans
+                for env, dists in _group_by_env(to_remove):
+                    run = functools.partial(
+                        pip_uninstall, [d.name for d in dists],
+                        python=get_python(env),
+                    )
+                    self.jobs.submit(Job(REMOVE, dists, run, env))
                 for d in to_remove:
-                    self.gui.draw_popup('Removing {}'.format(d.name))
-                    subprocess.call([sys.executable, '-m', 'pip', 'uninstall', '--yes', d.name], stdout=DEVNULL, stderr=DEVNULL)  # noqa: E501 line too long
-                    self.distributions.remove(d)
+                    d.is_selected = False
 
-    @property
-    def last_page(self):
-        """Gets max pages count.
+    def _apply_removal(self, job):
+        """Drops removed distributions from the list. Distributions which
+        failed to uninstall get selected again."""
+        uninstalled = job.result.uninstalled if job.result else ()
+        removed = set((job.env, name) for name in uninstalled)
+        for env, name in removed:
+            d = self.get_distribution(name, env)
+            if d is not None:
+                self.widths.remove(d)
+            if env in self._graphs:
+                self._graphs[env].remove(name)
+        if removed:
+            self._set_distributions([
+                d for d in self.distributions
+                if (d.env, d.name) not in removed
+            ])
+        for d in job.distributions:
+            if (d.env, d.name) not in removed:
+                d.is_selected = True
 
-        :return: Max pages count.
-        :rtype: int
+    def plan_sync(self, locked):
+        """Plans syncing environments to a lockfile.
+
+        Only distributions which differ from the lockfile are touched -
+        missing ones and the ones with different versions (compared
+        according to PEP 440) are installed, and the ones not present in
+        the lockfile are removed (unless they are protected).
+
+        :param list locked: Locked distributions (the ones with `env_label`
+            apply only to environment with the same label).
+        :return: List of plans per environment.
+        :rtype: list
+        :raises InvalidLockfile: If distribution is locked more than once for
+            the same environment or if lockfile lists distributions of
+            labelled environments only and none of them is this environment
+            (everything would be removed otherwise).
+        """
+        plans = []
+        labels = sorted(set(x.env_label for x in locked if x.env_label))
+        groups = _group_by_env(self.distributions) or [(None, [])]
+        for env, dists in groups:
+            label = None if env is None else env.label
+            if labels and label not in labels:
+                message = 'Lockfile lists environments {} only'.format(
+                    ', '.join(labels)
+                )
+                raise InvalidLockfile(message + (
+                    ' (see --env)' if label is None else ', not ' + label
+                ))
+            wanted = {}
+            for x in locked:
+                if x.env_label not in (None, label):
+                    continue
+                name = normalize_name(x.name)
+                if name in wanted:
+                    if label is not None:
+                        name = '{} ({})'.format(name, label)
+                    raise InvalidLockfile(
+                        'Distribution locked more than once: {}'.format(name)
+                    )
+                wanted[name] = x.version
+            install = []
+            for name, version in sorted(wanted.items()):
+                d = self.get_distribution(name, env)
+                if d is None or version_key(d.version) != version_key(version):  # noqa: E501 line too long
+                    install.append((name, version))
+            remove, _ = self.plan_removal(
+                [d for d in dists if d.name not in wanted]
+            )
+            plans.append(SyncPlan(env, install, remove))
+        return plans
+
+    def sync_distributions(self, plans):
+        """Queues jobs syncing environments according to plans.
+
+        Every environment takes at most two pip runs - one removing
+        distributions and one installing exact versions of all the others
+        (without dependencies, as lockfile lists all of them).
+
+        :param list plans: Plans returned by `plan_sync`.
+        :return: List of submitted jobs.
+        :rtype: list
+        """
+        jobs = []
+        for plan in plans:
+            if plan.remove:
+                jobs.append(self.jobs.submit(Job(
+                    REMOVE, plan.remove, functools.partial(
+                        pip_uninstall, [d.name for d in plan.remove],
+                        python=get_python(plan.env),
+                    ), plan.env
+                )))
+            if plan.install:
+                dists = [
+                    self.get_distribution(name, plan.env)
+                    for name, _ in plan.install
+                ]
+                jobs.append(self.jobs.submit(Job(
+                    UPGRADE, [d for d in dists if d is not None],
+                    functools.partial(
+                        pip_install,
+                        ['{}=={}'.format(n, v) for n, v in plan.install],
+                        upgrade=False,
+                        **self._get_install_options(plan.env, ['--no-deps'])
+                    ), plan.env
+                )))
+        return jobs
+
+    def apply_finished_jobs(self):
+        """Applies results of background jobs finished so far.
+
+        :return: List of finished jobs.
+        :rtype: list
+        """
+        finished = self.jobs.drain()
+        for job in finished:
+            if job.kind == UPGRADE:
+                self._apply_upgrade(job)
+            else:
+                self._apply_removal(job)
+        return finished
+
+    def show_failed_log(self):
+        """Shows output of the most recent failed job."""
+        job = self.jobs.last_failed
+        if job is None:
+            return
+        lines = ['{} failed:'.format(_describe_job(job))]
+        lines.extend('  {}'.format(line) for line in job.get_tail())
+        if job.log_path:
+            lines.append('Full log: {}'.format(job.log_path))
+        lines.append('Press any key')
+        self.gui.draw_popup('\n'.join(lines))
+        self.gui.stdscr.getch()
+
+    def _get_jobs_lines(self):
+        """Gets lines of status pane describing the most recent jobs.
+
+        :return: List of tuples of text and curses attributes.
+        :rtype: list
         """
-        return int((len(self.distributions) - 1) / self.gui.dist_win_height)
+        lines = []
+        for job in self.jobs.get_recent(JOBS_SHOWN):
+            text = '{:<7} {:>4.0f}s  {}'.format(
+                job.state, job.elapsed, _describe_job(job)
+            )
+            if job.state == FAILED:
+                lines.append((text + '  (L - show log)', curses.A_BOLD))
+            else:
+                lines.append((
+                    text,
+                    curses.A_DIM if job.state == DONE else curses.A_NORMAL,
+                ))
+            if job.state == RUNNING:
+                tail = job.get_tail(1)
+                if tail:
+                    lines.append(('    {}'.format(tail[0].strip()), curses.A_DIM))  # noqa: E501 line too long
+        return lines
+
+    def _prioritize_visible(self):
+        """Resolves visible rows and the next screenful before the rest of
+        the list."""
+        self.resolver.prioritize(self.view[
+            self.viewport.top:self.viewport.top + 2 * self.viewport.height
+        ])
+
+    def _get_key(self):
+        """Gets pressed key.
+
+        While newest versions are being resolved or jobs are running, waits
+        for key press only for a while and returns None as soon as some
+        versions got resolved (or jobs made progress), so the screen can be
+        redrawn.
+
+        :return: Key code or None.
+        :rtype: int or None
+        """
+        while True:
+            is_busy = not self.resolver.is_finished or self.jobs.is_busy
+            self.gui.dist_win.timeout(
+                RESOLVE_POLL_INTERVAL if is_busy else -1
+            )
+            key = self.gui.dist_win.getch()
+            if key != curses.ERR:
+                return key
+            resolved = self.resolver.drain()
+            if self.apply_finished_jobs() or resolved or self.jobs.is_busy:
+                return None
+
+    def _handle_filter_key(self, key):
+        """Edits filter query while in filter mode.
+
+        :return: True if filter mode is still on.
+        :rtype: bool
+        """
+        if key == ENTER:
+            return False
+        if key == ESCAPE:
+            self.set_filter('')
+            return False
+        if key in BACKSPACE_KEYS:
+            self.set_filter(self.filter_query[:-1])
+        elif key is not None and SPACE < key < 127:
+            self.set_filter(self.filter_query + chr(key))
+        return True
+
+    def _get_status(self, filtering):
+        """Gets status shown under distributions list.
+
+        :param bool filtering: Whether filter query is being edited.
+        :rtype: str
+        """
+        parts = []
+        if filtering or self.filter_query:
+            parts.append('/{}{}'.format(
+                self.filter_query, '_' if filtering else ''
+            ))
+        if not self.resolver.is_finished:
+            parts.append('{}/{} checked'.format(
+                self.resolver.resolved, self.resolver.total
+            ))
+        return '  '.join(parts)
 
     def mainloop(self):
         """Main program loop."""
+        prioritized = None
+        filtering = False
+        first_frame = True
         while True:
-            max_cursor_pos = len(self.dists_to_draw) - 1
-            self.cursor_pos = min(self.cursor_pos, max_cursor_pos)
+            self.gui.set_jobs(self._get_jobs_lines())
+            self.viewport.resize(
+                total=len(self.view),
+                height=self.gui.dist_win_height
+            )
+            visible = (
+                self.viewport.top, self.viewport.height, self.filter_query
+            )
+            if prioritized != visible:
+                prioritized = visible
+                self._prioritize_visible()
+            status = self._get_status(filtering)
             self.gui.draw_distributions(
-                self.dists_to_draw, self.page + 1, self.last_page + 1,
-                self.cursor_pos
+                self.dists_to_draw, self.viewport.top, self.viewport.total,
+                self.viewport.cursor_row, self.widths, status
             )
+            if first_frame:
+                first_frame = False
+                profiler.record(
+                    'startup.first_frame', profiler.origin, clock(), 'startup'
+                )
 
             try:
-                key = self.gui.dist_win.getch()
+                key = self._get_key()
             except KeyboardInterrupt:
                 break
 
-            if key == curses.KEY_UP:
-                self.cursor_pos = max(self.cursor_pos - 1, 0)
+            if filtering and key not in (
+                curses.KEY_UP, curses.KEY_DOWN, SPACE, curses.KEY_RESIZE
+            ):
+                filtering = self._handle_filter_key(key)
+            elif key == curses.KEY_UP:
+                self.viewport.move(-1)
             elif key == curses.KEY_DOWN:
-                self.cursor_pos = min(self.cursor_pos + 1, max_cursor_pos)
+                self.viewport.move(1)
             elif key == curses.KEY_HOME:
-                self.cursor_pos = 0
+                self.viewport.move_to(0)
             elif key == curses.KEY_END:
-                self.cursor_pos = max_cursor_pos
-            elif key == curses.KEY_PPAGE:
-                self.cursor_pos = max(self.cursor_pos - 5, 0)
-            elif key == curses.KEY_NPAGE:
-                self.cursor_pos = min(self.cursor_pos + 5, max_cursor_pos)
+                self.viewport.move_to(self.viewport.total - 1)
+            elif key in (curses.KEY_PPAGE, curses.KEY_LEFT):
+                self.viewport.page(-1)
+            elif key in (curses.KEY_NPAGE, curses.KEY_RIGHT):
+                self.viewport.page(1)
             elif key in (ord('q'), ord('Q')):
-                break
-            elif key == curses.KEY_LEFT:
-                self.page = max(self.page - 1, 0)
-            elif key == curses.KEY_RIGHT:
-                self.page = min(self.page + 1, self.last_page)
-            elif key == SPACE:
-                self.toggle_one(
-                    self.page * self.gui.dist_win_height + self.cursor_pos
+                if not self.jobs.is_busy:
+                    break
+                self.gui.draw_popup(
+                    'Some jobs are still running. Quit anyway? [y/N]'
                 )
+                if self.gui.stdscr.getch() in (ord('y'), ord('Y')):
+                    break
+            elif key in (ord('l'), ord('L')):
+                self.show_failed_log()
+            elif key == SLASH:
+                filtering = True
+            elif key == ESCAPE:
+                self.set_filter('')
+            elif key == SPACE:
+                self.toggle_one(self.viewport.cursor)
             elif key in (ord('a'), ord('A')):
                 self.toggle_all()
+            elif key in (ord('v'), ord('V')):
+                if not self.select_vulnerable():
+                    self.gui.draw_popup('{}\nPress any key'.format(
+                        'No packages with known advisories.'
+                        if self.advisories is not None else
+                        'No advisory database (see --advisory-db).'
+                    ))
+                    self.gui.stdscr.getch()
             elif key == ENTER:
                 self.update_distributions()
             elif key == curses.KEY_DC:
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+from pip_manager.utils import get_cache_dir
+from pip_manager.utils import get_cache_ttl
+
+CACHE_FILE_NAME = 'versions.sqlite3'
+
+
+class CacheEntry(namedtuple(
+    'CacheEntry', ['versions', 'fetched_at', 'etag', 'last_modified']
+)):
+    """Versions of one project found on one index."""
+
+    def is_fresh(self, ttl, now=None):
+        """Checks if entry is younger than given TTL.
+
+        :param int ttl: Time to live in seconds.
+        :param float now: Current timestamp (defaults to `time.time()`).
+        :rtype: bool
+        """
+        return (now or time.time()) - self.fetched_at < ttl
+
+
+class VersionCache(object):
+    """Persistent cache of versions keyed by index URL and project name.
+
+    Cache is stored in SQLite database which is opened lazily on first use.
+    Any database error disables the cache for the rest of the session instead
+    of breaking versions lookup.
+    """
+
+    def __init__(self, path=None, ttl=None):
+        self.path = path or os.path.join(get_cache_dir(), CACHE_FILE_NAME)
+        self.ttl = get_cache_ttl() if ttl is None else ttl
+        self._db = None
+        self._disabled = False
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._db is None and not self._disabled:
+            try:
+                directory = os.path.dirname(self.path)
+                if directory and not os.path.isdir(directory):
+                    os.makedirs(directory)
+                self._db = sqlite3.connect(
+                    self.path, check_same_thread=False
+                )
+                self._db.execute(
+                    'CREATE TABLE IF NOT EXISTS versions ('
+                    'index_url TEXT, name TEXT, versions TEXT, '
+                    'fetched_at REAL, etag TEXT, last_modified TEXT, '
+                    'PRIMARY KEY (index_url, name))'
+                )
+            except (sqlite3.Error, OSError, IOError):
+                self._disable()
+        return self._db
+
+    def _disable(self):
+        self._disabled = True
+        if self._db is not None:
+            self._db.close()
+        self._db = None
+
+    def get(self, index_url, name):
+        """Gets cached entry.
+
+        :param str index_url: Index URL.
+        :param str name: Normalized project name.
+        :return: Cached entry or None if there is none.
+        :rtype: CacheEntry or None
+        """
+        with self._lock:
+            db = self._connect()
+            if db is None:
+                return None
+            try:
+                row = db.execute(
+                    'SELECT versions, fetched_at, etag, last_modified '
+                    'FROM versions WHERE index_url = ? AND name = ?',
+                    (index_url, name)
+                ).fetchone()
+            except sqlite3.Error:
+                self._disable()
+                return None
+        if row is None:
+            return None
+        try:
+            versions = json.loads(row[0])
+        except ValueError:
+            return None
+        return CacheEntry(versions, row[1], row[2], row[3])
+
+    def put(self, index_url, name, entry):
+        """Stores entry in cache, replacing the previous one.
+
+        :param str index_url: Index URL.
+        :param str name: Normalized project name.
+        :param CacheEntry entry: Entry to store.
+        """
+        with self._lock:
+            db = self._connect()
+            if db is None:
+                return
+            try:
+                with db:
+                    db.execute(
+                        'INSERT OR REPLACE INTO versions VALUES '
+                        '(?, ?, ?, ?, ?, ?)',
+                        (
+                            index_url, name, json.dumps(entry.versions),
+                            entry.fetched_at, entry.etag, entry.last_modified,
+                        )
+                    )
+            except sqlite3.Error:
+                self._disable()
+
+    def close(self):
+        """Closes database connection."""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""Batched pip invocations."""
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+from collections import namedtuple
+from subprocess import STDOUT
+
+from pip_manager.profiling import profiler
+from pip_manager.utils import normalize_name
+from pip_manager.worker import get_worker_pool
+
+INSTALL_REPORT_PIP_VERSION = (22, 2)
+
+
+class InstallResult(namedtuple(
+    'InstallResult', ['returncode', 'installed', 'output']
+)):
+    """Outcome of pip install run.
+
+    `installed` maps normalized names of ALL distributions pip installed
+    (including dependencies) to their new versions. If pip failed, it may
+    list distributions which never got installed (report is written before
+    installing), so it has to be confirmed with installed metadata.
+    """
+
+    @property
+    def succeeded(self):
+        return self.returncode == 0
+
+    def get_outcome(self, name):
+        """Gets outcome for one of requested distributions.
+
+        :param str name: Distribution name.
+        :return: 'installed', 'unchanged' (already up to date) or 'failed'.
+        :rtype: str
+        """
+        if normalize_name(name) in self.installed:
+            return 'installed'
+        return 'unchanged' if self.succeeded else 'failed'
+
+
+class UninstallResult(namedtuple(
+    'UninstallResult', ['returncode', 'uninstalled', 'output']
+)):
+    """Outcome of pip uninstall run.
+
+    `uninstalled` is a set of normalized names of removed distributions.
+    """
+
+    @property
+    def succeeded(self):
+        return self.returncode == 0
+
+
+def _get_pip_version(pip_version=None):
+    if pip_version is None:
+        import pip
+        pip_version = pip.__version__
+    return tuple(int(p) for p in re.findall(r'\d+', pip_version)[:2])
+
+
+def supports_install_report(pip_version=None):
+    """Checks if pip can write installation report (`--report` option).
+
+    :param str pip_version: Version of pip to check (the one imported here by
+        default).
+    :rtype: bool
+    """
+    return _get_pip_version(pip_version) >= INSTALL_REPORT_PIP_VERSION
+
+
+def _run(args, on_line=None):
+    """Runs command collecting its (merged) output.
+
+    :param list args: Command to run.
+    :param on_line: Optional callable called with every output line as soon
+        as it is printed.
+    :return: Tuple of return code and output.
+    :rtype: tuple
+    """
+    process = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=STDOUT)
+    lines = []
+    for line in iter(process.stdout.readline, b''):
+        line = line.decode('utf-8', 'replace')
+        lines.append(line)
+        if on_line is not None:
+            on_line(line.rstrip('\r\n'))
+    process.stdout.close()
+    return process.wait(), ''.join(lines)
+
+
+def run_pip(python, args, on_line=None, retire=False):
+    """Runs pip command in a pip worker of given interpreter (or in a new
+    process if workers are disabled or cannot be started).
+
+    :param str python: Interpreter to run pip with.
+    :param list args: pip arguments (e.g. `['install', 'flask']`).
+    :param on_line: Optional callable called with every output line as soon
+        as it is printed.
+    :param bool retire: Whether the command may change installed
+        distributions.
+    :return: Tuple of return code and output.
+    :rtype: tuple
+    """
+    pool = get_worker_pool()
+    if pool is not None:
+        result = pool.run(python, args, on_line, retire)
+        if result is not None:
+            return result
+    return _run([python, '-m', 'pip'] + list(args), on_line)
+
+
+def parse_install_report(report):
+    """Gets installed distributions from pip installation report.
+
+    :param dict report: Report as written by `pip install --report`.
+    :return: Normalized names mapped to installed versions.
+    :rtype: dict
+    """
+    return dict(
+        (
+            normalize_name(item['metadata']['name']),
+            item['metadata']['version'],
+        )
+        for item in report.get('install', [])
+    )
+
+
+def parse_install_output(output):
+    """Gets installed distributions from "Successfully installed ..." line.
+
+    Used with pip versions which cannot write installation report.
+
+    :param str output: pip output.
+    :return: Normalized names mapped to installed versions.
+    :rtype: dict
+    """
+    installed = {}
+    for line in output.splitlines():
+        if line.startswith('Successfully installed '):
+            for dist in line.split()[2:]:
+                name, _, version = dist.rpartition('-')
+                installed[normalize_name(name)] = version
+    return installed
+
+
+def pip_install(names, upgrade=True, python=sys.executable, pip_version=None,
+                on_line=None, extra_args=()):
+    """Installs given distributions with single pip invocation.
+
+    :param list names: Names of distributions (or requirements) to install.
+    :param bool upgrade: Whether to pass `--upgrade` option.
+    :param str python: Interpreter to run pip with.
+    :param str pip_version: Version of pip installed for `python` (needed
+        only if it is not the current interpreter).
+    :param on_line: Optional callable called with every line of pip output
+        as soon as it is printed.
+    :param list extra_args: Additional pip options (e.g. telling where to
+        find distributions).
+    :rtype: InstallResult
+    """
+    args = ['install']
+    if upgrade:
+        args.append('-U')
+    args.extend(extra_args)
+    if not supports_install_report(pip_version):
+        with profiler.span('pip.install', 'pip'):
+            returncode, output = run_pip(
+                python, args + list(names), on_line, retire=True
+            )
+        return InstallResult(
+            returncode, parse_install_output(output), output
+        )
+
+    report_dir = tempfile.mkdtemp(prefix='pip-manager-')
+    report_path = os.path.join(report_dir, 'report.json')
+    try:
+        with profiler.span('pip.install', 'pip'):
+            returncode, output = run_pip(
+                python, args + ['--report', report_path] + list(names),
+                on_line, retire=True
+            )
+        try:
+            with open(report_path) as f:
+                installed = parse_install_report(json.load(f))
+        except (IOError, OSError, ValueError, KeyError, TypeError):
+            installed = {}
+    finally:
+        shutil.rmtree(report_dir, ignore_errors=True)
+    return InstallResult(returncode, installed, output)
+
+
+def pip_wheel(requirements, wheel_dir, python=sys.executable, on_line=None,
+              extra_args=()):
+    """Downloads or builds wheels of given requirements (without their
+    dependencies) with single pip invocation.
+
+    :param list requirements: Requirements (e.g. `Flask==1.0`).
+    :param str wheel_dir: Directory to save wheels to.
+    :param str python: Interpreter to run pip with.
+    :param on_line: Optional callable called with every line of pip output
+        as soon as it is printed.
+    :param list extra_args: Additional pip options.
+    :return: pip return code.
+    :rtype: int
+    """
+    with profiler.span('pip.wheel', 'pip'):
+        returncode, _ = run_pip(
+            python, ['wheel', '--no-deps', '--wheel-dir', wheel_dir] +
+            list(extra_args) + list(requirements), on_line
+        )
+    return returncode
+
+
+def parse_uninstall_line(line):
+    """Gets name of removed distribution from pip uninstall output line.
+
+    :param str line: Output line (e.g. `Successfully uninstalled Flask-1.0`).
+    :return: Normalized name or None if line does not report removal.
+    :rtype: str or None
+    """
+    line = line.strip()
+    if not line.startswith('Successfully uninstalled '):
+        return None
+    return normalize_name(line.split()[2].rpartition('-')[0])
+
+
+def pip_uninstall(names, python=sys.executable, on_uninstalled=None,
+                  on_line=None):
+    """Uninstalls given distributions with single pip invocation.
+
+    :param list names: Names of distributions to uninstall.
+    :param str python: Interpreter to run pip with.
+    :param on_uninstalled: Optional callable called with normalized name of
+        every distribution as soon as it is removed.
+    :param on_line: Optional callable called with every line of pip output
+        as soon as it is printed.
+    :rtype: UninstallResult
+    """
+    uninstalled = set()
+
+    def on_uninstall_line(line):
+        if on_line is not None:
+            on_line(line)
+        name = parse_uninstall_line(line)
+        if name is not None:
+            uninstalled.add(name)
+            if on_uninstalled is not None:
+                on_uninstalled(name)
+
+    with profiler.span('pip.uninstall', 'pip'):
+        returncode, output = run_pip(
+            python, ['uninstall', '--yes'] + list(names), on_uninstall_line,
+            retire=True
+        )
+    return UninstallResult(returncode, uninstalled, output)
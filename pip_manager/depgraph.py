@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+"""Dependency graph of installed distributions.
+
+Graph is built from `Requires-Dist` metadata of installed distributions and
+keeps reverse dependencies too, so it can tell which distributions would be
+affected by upgrading (or removing) others. Metadata of every distribution is
+read once - after installing or removing distributions only the affected
+nodes are updated.
+"""
+import heapq
+import re
+from collections import defaultdict
+from collections import namedtuple
+
+try:
+    from importlib import metadata as importlib_metadata
+except ImportError:
+    import importlib_metadata
+
+try:
+    from packaging.markers import InvalidMarker
+    from packaging.markers import Marker
+except ImportError:
+    Marker = None
+
+from pip_manager.utils import normalize_name
+from pip_manager.version import matches_specifier
+
+REQUIREMENT_PATTERN = re.compile(r'''
+    ^\s*
+    (?P<name>[A-Za-z0-9](?:[A-Za-z0-9._-]*[A-Za-z0-9])?)
+    \s*
+    (?:\[[^\]]*\])?
+    \s*
+    \(?(?P<specifier>[^;()]*)\)?
+    \s*
+    (?:;\s*(?P<marker>.*?))?
+    \s*$
+''', re.VERBOSE)
+
+Requirement = namedtuple('Requirement', ['name', 'specifier', 'marker'])
+
+Conflict = namedtuple('Conflict', ['name', 'version', 'dependent', 'specifier'])  # noqa: E501 line too long
+
+UpgradePlan = namedtuple('UpgradePlan', ['order', 'conflicts'])
+
+
+def parse_requirement(line):
+    """Parses single `Requires-Dist` entry.
+
+    :param str line: Requirement (e.g. `Jinja2 (>=2.10); extra == "i18n"`).
+    :return: Requirement with normalized name or None if it is invalid.
+    :rtype: Requirement or None
+    """
+    match = REQUIREMENT_PATTERN.match(line)
+    if match is None:
+        return None
+    specifier = re.sub(r'\s+', '', match.group('specifier'))
+    if specifier.startswith('@'):
+        specifier = ''  # URL requirements do not constrain versions.
+    return Requirement(
+        normalize_name(match.group('name')), specifier, match.group('marker')
+    )
+
+
+def applies(requirement):
+    """Checks if requirement applies to plain installation (no extras).
+
+    Markers are evaluated against the current interpreter if `packaging` is
+    installed. Otherwise only requirements of extras are skipped.
+
+    :rtype: bool
+    """
+    if not requirement.marker:
+        return True
+    if Marker is None:
+        return 'extra' not in requirement.marker
+    try:
+        return Marker(requirement.marker).evaluate({'extra': ''})
+    except (InvalidMarker, ValueError, TypeError):
+        return 'extra' not in requirement.marker
+
+
+def read_requirements(path):
+    """Reads requirements of distribution installed at given path.
+
+    :param str path: Path to `*.dist-info` or `*.egg-info` entry.
+    :return: Requirements which apply to plain installation.
+    :rtype: list
+    """
+    if not path:
+        return []
+    try:
+        lines = importlib_metadata.Distribution.at(path).requires or []
+    except Exception:
+        # Broken metadata must not break the whole graph.
+        return []
+    requirements = (parse_requirement(line) for line in lines)
+    return [r for r in requirements if r is not None and applies(r)]
+
+
+class DependencyGraph(object):
+    """Dependencies and reverse dependencies of installed distributions.
+
+    Distributions are identified by normalized names, so there should be one
+    graph per environment.
+    """
+
+    def __init__(self, distributions=(), read=read_requirements):
+        """
+        :param distributions: Distributions with `name` and `path`.
+        :param read: Callable reading requirements from metadata path.
+        """
+        self._read = read
+        self.requires = {}
+        self.required_by = defaultdict(set)
+        for d in distributions:
+            self.add(d.name, d.path)
+
+    def __contains__(self, name):
+        return normalize_name(name) in self.requires
+
+    def add(self, name, path):
+        """Adds (or replaces) distribution reading its metadata."""
+        name = normalize_name(name)
+        self.remove(name)
+        self.requires[name] = self._read(path)
+        for requirement in self.requires[name]:
+            self.required_by[requirement.name].add(name)
+
+    def remove(self, name):
+        """Removes distribution (but not the references to it)."""
+        name = normalize_name(name)
+        for requirement in self.requires.pop(name, ()):
+            dependents = self.required_by[requirement.name]
+            dependents.discard(name)
+            if not dependents:
+                del self.required_by[requirement.name]
+
+    def get_dependencies(self, name):
+        """Gets names of installed distributions required by given one.
+
+        :rtype: list
+        """
+        return sorted(set(
+            r.name for r in self.requires.get(normalize_name(name), ())
+            if r.name in self.requires
+        ))
+
+    def get_dependents(self, name):
+        """Gets names of installed distributions requiring given one.
+
+        :rtype: list
+        """
+        return sorted(self.required_by.get(normalize_name(name), ()))
+
+    def get_closure(self, names):
+        """Gets given names and names of all distributions they (transitively)
+        require.
+
+        :rtype: set
+        """
+        closure = set()
+        pending = [normalize_name(name) for name in names]
+        while pending:
+            name = pending.pop()
+            if name not in closure:
+                closure.add(name)
+                pending.extend(self.get_dependencies(name))
+        return closure
+
+    def find_orphans(self, removed, keep=lambda name: False):
+        """Finds distributions which nothing would require after removing
+        given ones.
+
+        :param removed: Names of distributions to be removed.
+        :param keep: Callable telling whether distribution with given name
+            must stay even if nothing requires it (e.g. because it was
+            installed on purpose).
+        :return: Names of orphaned distributions.
+        :rtype: list
+        """
+        gone = set(normalize_name(name) for name in removed)
+        orphans = []
+        pending = [dep for name in gone for dep in self.get_dependencies(name)]
+        while pending:
+            name = pending.pop()
+            if name in gone or keep(name):
+                continue
+            if all(dependent in gone for dependent in self.get_dependents(name)):  # noqa: E501 line too long
+                gone.add(name)
+                orphans.append(name)
+                pending.extend(self.get_dependencies(name))
+        return sorted(orphans)
+
+    def get_conflicts(self, name, version, ignored=()):
+        """Gets requirements of installed distributions which given version
+        would not satisfy.
+
+        :param str name: Distribution name.
+        :param str version: Version to be installed.
+        :param ignored: Names of dependents not to check (e.g. because they
+            are going to be upgraded too).
+        :rtype: list
+        """
+        name = normalize_name(name)
+        conflicts = []
+        for dependent in self.get_dependents(name):
+            if dependent in ignored:
+                continue
+            for requirement in self.requires.get(dependent, ()):
+                if requirement.name == name and not matches_specifier(
+                    version, requirement.specifier
+                ):
+                    conflicts.append(Conflict(
+                        name, version, dependent, requirement.specifier
+                    ))
+        return conflicts
+
+    def plan(self, upgrades):
+        """Plans upgrade of given distributions.
+
+        :param dict upgrades: Names mapped to versions to upgrade to.
+        :return: Names ordered so that dependencies come before distributions
+            requiring them (ties and cycles are ordered by name) and
+            requirements of other installed distributions that the new
+            versions would break.
+        :rtype: UpgradePlan
+        """
+        names = dict((normalize_name(n), n) for n in upgrades)
+        pending = dict((name, 0) for name in names)
+        for name in names:
+            for dependency in self.get_dependencies(name):
+                if dependency in pending and dependency != name:
+                    pending[name] += 1
+
+        ready = [name for name, count in pending.items() if not count]
+        heapq.heapify(ready)
+        order = []
+        while len(order) < len(names):
+            if not ready:
+                # Dependency cycle - break it at the first remaining name.
+                ready = [min(n for n, c in pending.items() if c)]
+                pending[ready[0]] = 0
+            name = heapq.heappop(ready)
+            order.append(names[name])
+            for dependent in self.get_dependents(name):
+                if pending.get(dependent):
+                    pending[dependent] -= 1
+                    if not pending[dependent]:
+                        heapq.heappush(ready, dependent)
+
+        conflicts = []
+        for name in order:
+            conflicts.extend(
+                self.get_conflicts(name, upgrades[name], ignored=pending)
+            )
+        return UpgradePlan(order, conflicts)
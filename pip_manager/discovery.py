@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""Discovery of installed distributions.
+
+Installed distributions are found by listing `*.dist-info` and `*.egg-info`
+entries on sys.path. Name and version are taken from the entry name whenever
+possible, so metadata files are read only for entries which do not carry
+version in their name (e.g. `setup.py develop` installs).
+"""
+import email
+import os
+import sys
+from collections import namedtuple
+
+try:
+    from importlib import metadata as importlib_metadata
+except ImportError:
+    import importlib_metadata
+
+from pip_manager.utils import normalize_name
+
+METADATA_SUFFIXES = ('.dist-info', '.egg-info')
+
+InstalledDistribution = namedtuple(
+    'InstalledDistribution', ['name', 'version', 'path']
+)
+
+
+def _parse_entry_name(entry):
+    """Gets name and version from metadata directory (or file) name.
+
+    :param str entry: Entry name (e.g. `Flask-1.0.2.dist-info`).
+    :return: Tuple of name and version (None if not present in entry name).
+    :rtype: tuple
+    """
+    stem = os.path.splitext(entry)[0]
+    name, _, rest = stem.partition('-')
+    # egg-info may contain python version too: name-1.0-py2.7.egg-info
+    version = rest.split('-')[0] or None
+    return name, version
+
+
+def _read_metadata(path):
+    """Gets name and version from metadata stored at given path.
+
+    :param str path: Path to `*.dist-info` or `*.egg-info` entry.
+    :return: Tuple of name and version or None if metadata is broken.
+    :rtype: tuple or None
+    """
+    dist = importlib_metadata.Distribution.at(path)
+    # egg-info may be a directory (with PKG-INFO) or a plain metadata file.
+    text = (
+        dist.read_text('METADATA') or dist.read_text('PKG-INFO') or
+        dist.read_text('')
+    )
+    if not text:
+        return None
+    metadata = email.message_from_string(text)
+    if not metadata['Name'] or not metadata['Version']:
+        return None
+    return metadata['Name'], metadata['Version']
+
+
+def is_requested(path):
+    """Checks if distribution was installed on purpose rather than as
+    a dependency of another one.
+
+    Relies on `REQUESTED` file (PEP 376) written by pip to `*.dist-info`
+    directories. Distributions without such information are assumed to be
+    requested.
+
+    :param str path: Path to `*.dist-info` or `*.egg-info` entry.
+    :rtype: bool
+    """
+    if not path or not path.lower().endswith('.dist-info'):
+        return True
+    return os.path.exists(os.path.join(path, 'REQUESTED'))
+
+
+def iter_installed(paths=None):
+    """Lazily yields distributions installed in given paths.
+
+    Like `pkg_resources.working_set`, the first distribution found for given
+    (normalized) name wins.
+
+    :param list paths: Paths to scan (sys.path by default).
+    :return: Generator of installed distributions with normalized names.
+    :rtype: generator
+    """
+    seen = set()
+    for path in sys.path if paths is None else paths:
+        try:
+            entries = sorted(os.listdir(path or '.'))
+        except (OSError, IOError):
+            continue
+        for entry in entries:
+            if not entry.lower().endswith(METADATA_SUFFIXES):
+                continue
+            entry_path = os.path.join(path or '.', entry)
+            name, version = _parse_entry_name(entry)
+            if version is None:
+                name_version = _read_metadata(entry_path)
+                if name_version is None:
+                    continue
+                name, version = name_version
+            name = normalize_name(name)
+            if name not in seen:
+                seen.add(name)
+                yield InstalledDistribution(name, version, entry_path)
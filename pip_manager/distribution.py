@@ -1,18 +1,38 @@
 # -*- coding: utf-8 -*-
-import re
-import subprocess
-import sys
+from pip_manager.index import get_version_source
+from pip_manager.utils import intern_string
+from pip_manager.version import get_newest
+from pip_manager.version import is_newer
 
-from subprocess import CalledProcessError
-from subprocess import STDOUT
+PENDING = '…'
 
 
 class Distribution(object):
-    def __init__(self, name, version):
-        self.name = name
-        self.version = version
-        self.newest_version = self.get_newest_version()
+    """Installed distribution.
+
+    Uses slots and interned strings, so large (and many) environments are
+    cheap to keep in memory - the same names and versions appear in many
+    environments. Distributions are hashed by name, which never changes.
+    """
+
+    __slots__ = (
+        'name', 'version', 'newest_version', 'env', 'path', 'is_selected',
+        'advisories',
+    )
+
+    #: Whether pre-releases are offered as upgrades.
+    allow_prereleases = False
+
+    def __init__(self, name, version, newest_version=PENDING, env=None,
+                 path=None):
+        self.name = intern_string(name)
+        self.version = intern_string(version)
+        self.newest_version = newest_version
+        self.env = env
+        self.path = path
         self.is_selected = False
+        #: IDs of known advisories affecting installed version.
+        self.advisories = ()
 
     def __str__(self):
         return '<Distribution({}|{}|{})>'.format(
@@ -25,36 +45,67 @@ class Distribution(object):
         )
 
     def __eq__(self, other):
-        return self.name == other.name and self.version == other.version
+        return (
+            self.name == other.name and self.version == other.version and
+            self.env == getattr(other, 'env', None)
+        )
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.name)
+
+    @property
+    def env_label(self):
+        """Label of environment the distribution is installed in (empty for
+        the current interpreter).
+
+        :rtype: str
+        """
+        return '' if self.env is None else self.env.label
+
+    @property
+    def is_resolved(self):
+        """Checks if newest version has been already looked up.
+
+        :rtype: bool
+        """
+        return self.newest_version != PENDING
+
+    @property
+    def is_vulnerable(self):
+        """Checks if installed version has known advisories.
+
+        :rtype: bool
+        """
+        return bool(self.advisories)
+
+    @property
+    def is_outdated(self):
+        """Checks if there is newer version available (according to PEP 440,
+        so e.g. `1.0` is up to date with `1.0.0`).
+
+        :rtype: bool
+        """
+        return (
+            self.newest_version not in ('n/a', PENDING) and
+            is_newer(self.newest_version, self.version)
+        )
 
     def get_newest_version(self):
         """Gets newest version of distribution available.
 
-        Returns newest *stable* version if available (assumption is that stable
-        version consists of only numbers separated by dots (e.g. 1.9.23)).
-        If not returns newest version available (e.g. 3.2.3.post2).
-        If version cannot be determined 'n/a' is returned.
+        Returns newest final release (according to PEP 440) if available,
+        unless pre-releases are allowed. If there are only pre-releases
+        returns the newest of them. If version cannot be determined 'n/a' is
+        returned.
 
         :return: Newest version.
         :rtype: str
         """
-        error_msg = 'n/a'
-        try:
-            subprocess.check_output([sys.executable, '-m', 'pip', 'install', '{}==lxPhr_ffmS3fZ3E4P7U1Lw'.format(self.name)], stderr=STDOUT)  # noqa: E501 line too long
-        except CalledProcessError as e:
-            error_msg = e.output.decode()
-
-        versions = [
-            ver
-            for ver in re.findall(
-                r'[\d\.]+[\d]*[\w]*',
-                error_msg.split('(')[1].split(')')[0].split(':')[1]
-            )
-        ]
-        try:
-            return [v for v in versions if v.replace('.', '').isdigit()][-1]
-        except IndexError:
-            try:
-                return versions[-1]
-            except IndexError:
-                return 'n/a'
+        newest = get_newest(
+            get_version_source().get_versions(self.name),
+            prereleases=self.allow_prereleases,
+        )
+        return 'n/a' if newest is None else newest
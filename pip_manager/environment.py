@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""Python environments (interpreters or virtualenvs) managed in one session.
+
+Every environment is inspected by running its interpreter once to get its
+sys.path and pip version. Installed distributions are then found by scanning
+these paths directly, so nothing has to be imported in the environment.
+"""
+import json
+import os
+import subprocess
+import sys
+from collections import namedtuple
+from multiprocessing.pool import ThreadPool
+
+from pip_manager.discovery import iter_installed
+from pip_manager.profiling import profiler
+
+PROBE = (
+    'import json, sys\n'
+    'try:\n'
+    '    import pip\n'
+    '    pip_version = pip.__version__\n'
+    'except ImportError:\n'
+    '    pip_version = None\n'
+    'print(json.dumps({\n'
+    '    "prefix": sys.prefix,\n'
+    '    "path": [p for p in sys.path if p],\n'
+    '    "pip_version": pip_version,\n'
+    '}))\n'
+)
+
+Environment = namedtuple(
+    'Environment', ['python', 'label', 'paths', 'pip_version']
+)
+
+
+class InvalidEnvironment(Exception):
+    pass
+
+
+def find_python(target):
+    """Gets interpreter of given environment.
+
+    :param str target: Interpreter (path or command) or virtualenv directory.
+    :return: Interpreter to run.
+    :rtype: str
+    """
+    if not os.path.isdir(target):
+        return target
+    for candidate in (
+        os.path.join(target, 'bin', 'python'),
+        os.path.join(target, 'Scripts', 'python.exe'),
+    ):
+        if os.path.isfile(candidate):
+            return candidate
+    raise InvalidEnvironment(
+        'No python interpreter found in {}'.format(target)
+    )
+
+
+def probe_environment(target):
+    """Inspects given environment.
+
+    :param str target: Interpreter (path or command) or virtualenv directory.
+    :rtype: Environment
+    """
+    python = find_python(target)
+    try:
+        with profiler.span('startup.probe_env', 'startup', target=target):
+            output = subprocess.check_output(
+                [python, '-c', PROBE], stderr=subprocess.STDOUT
+            )
+        probe = json.loads(output.decode('utf-8'))
+    except (OSError, subprocess.CalledProcessError, ValueError):
+        raise InvalidEnvironment(
+            'Cannot inspect python environment: {}'.format(target)
+        )
+    return Environment(
+        python=python,
+        label=os.path.normpath(probe['prefix']),
+        paths=tuple(probe['path']),
+        pip_version=probe['pip_version'],
+    )
+
+
+def _discover(target):
+    env = probe_environment(target)
+    return env, list(iter_installed(env.paths))
+
+
+def discover_environments(targets, workers):
+    """Inspects environments and lists their distributions in parallel.
+
+    Environments pointing to the same interpreter are listed once. They are
+    labelled with the shortest ends of their prefixes which tell them apart.
+
+    :param list targets: Interpreters or virtualenv directories.
+    :param int workers: Maximum number of environments inspected at once.
+    :return: List of tuples of Environment and its installed distributions
+        (in order of targets).
+    :rtype: list
+    """
+    pool = ThreadPool(max(min(workers, len(targets)), 1))
+    try:
+        discovered = pool.map(_discover, targets)
+    finally:
+        pool.close()
+    seen = set()
+    unique = []
+    for env, installed in discovered:
+        if env.paths not in seen:
+            seen.add(env.paths)
+            unique.append((env, installed))
+    labels = shorten_labels([env.label for env, _ in unique])
+    return [
+        (env._replace(label=label), installed)
+        for (env, installed), label in zip(unique, labels)
+    ]
+
+
+def shorten_labels(prefixes):
+    """Gets the shortest labels telling given environment prefixes apart.
+
+    Label is the last component of the prefix, extended with parent
+    components for as long as it is the same as label of another prefix
+    (e.g. `/tmp/a/.venv` and `/tmp/b/.venv` become `a/.venv` and `b/.venv`).
+
+    :param list prefixes: Environment prefixes (normalized paths).
+    :return: Labels in order of prefixes.
+    :rtype: list
+    """
+    parts = [p.split(os.sep) for p in prefixes]
+    depths = [1] * len(parts)
+    while True:
+        labels = [os.sep.join(p[-d:]) for p, d in zip(parts, depths)]
+        grown = False
+        for i, label in enumerate(labels):
+            if labels.count(label) > 1 and depths[i] < len(parts[i]):
+                depths[i] += 1
+                grown = True
+        if not grown:
+            return labels
+
+
+def get_python(env):
+    """Gets interpreter of given environment (None means the current one).
+
+    :rtype: str
+    """
+    return sys.executable if env is None else env.python
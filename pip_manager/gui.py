@@ -3,21 +3,28 @@ import curses
 import sys
 
 from pip_manager import __version__
+from pip_manager.profiling import profiler
 
 
 class Gui(object):
 
     stdscr = None
+    dist_win = None
+    page_win = None
+    jobs_win = None
+    menu_win = None
 
     menu_options = [
         ('Up/Down', ' - prev/next package\n'),
-        ('Left/Right', ' - prev/next page\n'),
-        ('PgUp/PgDn', ' - jump up/down by 5\n'),
+        ('Left/Right/PgUp/PgDn', ' - prev/next page\n'),
         ('Home/End', ' - jump to top/bottom\n'),
         ('Space', ' - (un)select package\n'),
         ('A', ' - toggle all\n'),
+        ('V', ' - select packages with known advisories\n'),
+        ('/', ' - filter packages (Esc - clear filter)\n'),
         ('Enter', ' - upgrade selected\n'),
         ('Delete', ' - uninstall selected\n'),
+        ('L', ' - show log of the last failed job\n'),
         ('Q', ' - exit'),
     ]
 
@@ -27,18 +34,28 @@ class Gui(object):
         self.menu_height = len(self.menu_options) + 1
         self.min_height = self.menu_height + 3
         self.popup_win = curses.newwin(3, 20, 1, 0)
+        self._jobs = []
         self._draw_header()
         self.check_win_size()
         self.dist_win = curses.newwin(
             self.dist_win_height, self.line_width, 1, 0
         )
         self.dist_win.keypad(True)
+        self._layout = None
+        self._rows = []
+        self._page_line = None
+        self._jobs_drawn = None
 
     def _initialize_curses(self):
         self.stdscr = curses.initscr()
         curses.noecho()
         curses.cbreak()
         self.stdscr.keypad(1)
+        try:
+            # Esc clears the filter - do not wait a second for a key sequence.
+            curses.set_escdelay(25)
+        except AttributeError:
+            pass
         try:
             curses.start_color()
         except curses.error:
@@ -47,6 +64,8 @@ class Gui(object):
 
     def __del__(self):
         """Cleanup."""
+        if self.stdscr is None:
+            return
         self.stdscr.keypad(0)
         curses.echo()
         curses.nocbreak()
@@ -59,7 +78,21 @@ class Gui(object):
         :return: Distributions list window height.
         :rtype: int
         """
-        return self.stdscr.getmaxyx()[0] - self.menu_height - 2
+        return (
+            self.stdscr.getmaxyx()[0] - self.menu_height - 2 - len(self._jobs)
+        )
+
+    def set_jobs(self, lines):
+        """Sets lines of jobs status pane (shown between distributions list
+        and menu). The pane takes as many lines as needed, but distributions
+        list always keeps at least one row.
+
+        :param list lines: List of tuples of text and curses attributes.
+        """
+        max_lines = max(
+            self.stdscr.getmaxyx()[0] - self.menu_height - 3, 0
+        )
+        self._jobs = list(lines[:max_lines])
 
     def _draw_header(self):
         """Draws top most header with program name and python version."""
@@ -70,83 +103,208 @@ class Gui(object):
         )
         self.stdscr.refresh()
 
-    def _draw_page_number(self, curr_page, last_page):
-        """Draws page number under distributions list."""
-        win = curses.newwin(
-            1, self.line_width,
-            self.stdscr.getmaxyx()[0] - self.menu_height - 1, 0
+    def _update_layout(self):
+        """Fits windows to the terminal size (and jobs pane height) if it has
+        changed.
+
+        Page number, jobs pane and menu windows are created once per layout
+        and reused for every frame.
+        """
+        screen_size = self.stdscr.getmaxyx()
+        layout = (screen_size, len(self._jobs))
+        if layout == self._layout:
+            return
+        self._layout = layout
+        self.stdscr.erase()
+        self._draw_header()
+        self.dist_win.resize(self.dist_win_height, self.line_width)
+        page_win_y = screen_size[0] - self.menu_height - 1 - len(self._jobs)
+        self.page_win = curses.newwin(1, self.line_width, page_win_y, 0)
+        self.jobs_win = curses.newwin(
+            len(self._jobs), self.line_width, page_win_y + 1, 0
+        ) if self._jobs else None
+        self.menu_win = curses.newwin(
+            self.menu_height, self.line_width,
+            page_win_y + 1 + len(self._jobs), 0
+        )
+        self._draw_menu()
+        self.invalidate()
+
+    def invalidate(self):
+        """Forces all rows, page number and menu to be repainted with next
+        frame (e.g. because a popup was drawn over them)."""
+        self._rows = []
+        self._page_line = None
+        self._jobs_drawn = None
+        for win in (self.dist_win, self.jobs_win, self.menu_win):
+            if win is not None:
+                win.touchwin()
+
+    def _draw_page_number(self, first_row, last_row, total, status=''):
+        """Draws range of visible rows (and optional status) under
+        distributions list."""
+        page_line = (
+            'Rows: {}-{}/{}'.format(first_row, last_row, total), status
         )
-        win.addstr('Page: {}/{}'.format(curr_page, last_page))
-        win.refresh()
+        if page_line == self._page_line:
+            return
+        self._page_line = page_line
+        self.page_win.erase()
+        self.page_win.addstr(page_line[0])
+        if status:
+            self.page_win.addstr('  {}'.format(status), curses.A_DIM)
+        self.page_win.noutrefresh()
+
+    def _draw_jobs(self):
+        """Draws jobs status pane (if there are any jobs)."""
+        if self.jobs_win is None or self._jobs == self._jobs_drawn:
+            return
+        self._jobs_drawn = self._jobs
+        self.jobs_win.erase()
+        for y, (text, attr) in enumerate(self._jobs):
+            # Writing the last column would move the cursor out of the window.
+            self.jobs_win.addnstr(y, 0, text, self.line_width - 1, attr)
+        self.jobs_win.noutrefresh()
 
     def _draw_menu(self):
         """Draws options menu at the bottom of the terminal."""
-        win = curses.newwin(
-            self.menu_height, self.line_width,
-            self.stdscr.getmaxyx()[0] - self.menu_height, 0
-        )
-        win.addstr('Options:\n', curses.A_UNDERLINE)
+        self.menu_win.erase()
+        self.menu_win.addstr('Options:\n', curses.A_UNDERLINE)
         for opt, desc in self.menu_options:
-            win.addstr(opt, curses.A_BOLD)
-            win.addstr(desc)
-        win.refresh()
-
-    def draw_distributions(self, dists_to_draw, page, last_page, cursor_pos):
-        self._resize_dist_win()
-        self._draw_distributions_list(dists_to_draw)
-        self._draw_page_number(page, last_page)
-        self._draw_menu()
-        self.dist_win.chgat(cursor_pos, 3, curses.A_REVERSE)
-        self.dist_win.move(cursor_pos, 1)
+            self.menu_win.addstr(opt, curses.A_BOLD)
+            self.menu_win.addstr(desc)
+
+    def draw_distributions(self, dists_to_draw, top, total, cursor_pos,
+                           widths, status=''):
+        """Draws visible part of distributions list, rows range, jobs status
+        pane and menu.
 
-    def _draw_distributions_list(self, dists_to_draw):
+        Only parts of the screen which have changed since the previous frame
+        are rewritten and terminal is updated once per frame.
+
+        :param list dists_to_draw: Visible distributions.
+        :param int top: Index of the first visible distribution.
+        :param int total: Length of the whole list.
+        :param int cursor_pos: Cursor position relative to the first visible
+            row.
+        :param ColumnWidths widths: Column widths of the whole list.
+        :param str status: Optional status to show next to the rows range.
+        """
+        with profiler.span('render', 'render'):
+            self._update_layout()
+            self._draw_distributions_list(dists_to_draw, cursor_pos, widths)
+            self._draw_page_number(top + 1, top + len(dists_to_draw), total, status)  # noqa: E501 line too long
+            self._draw_jobs()
+            self.menu_win.noutrefresh()
+            self.dist_win.move(cursor_pos, 1)
+            self.dist_win.noutrefresh()
+            curses.doupdate()
+
+    def _draw_distributions_list(self, dists_to_draw, cursor_pos, widths):
         """Draws distributions list.
 
-        Draws list of distributions with their current versions and newest
-        versions available.
+        Draws list of distributions with their current versions, newest
+        versions available and IDs of known advisories (right-aligned). Rows
+        identical to the ones drawn in the previous frame are left untouched.
         """
         selection_mapping = {
             True: 'x',
             False: ' ',
         }
 
-        longest_name = max(len(d.name) for d in dists_to_draw)
-        longest_version = max(len(d.version) for d in dists_to_draw)
+        longest_env = widths.env
+        longest_name = widths.name
+        longest_version = widths.version
 
-        self.dist_win.erase()
-        for d in dists_to_draw:
-            self.dist_win.addstr(
-                '[{is_selected}] {name}{spaces}{version}'.format(
+        rows = []
+        for y in range(self.dist_win_height):
+            if y >= len(dists_to_draw):
+                rows.append(None)
+                continue
+            d = dists_to_draw[y]
+            rows.append((
+                '[{is_selected}] {env}{name}{spaces}{version}'.format(
                     is_selected=selection_mapping[d.is_selected],
+                    env=d.env_label.ljust(longest_env + 2) if longest_env else '',  # noqa: E501 line too long
                     name=d.name,
                     spaces=' ' * (longest_name - len(d.name) + 2),
                     version=d.version,
-                )
-            )
-            self.dist_win.addstr(
+                ),
                 '{spaces}{newest_ver}'.format(
                     spaces=' ' * (longest_version - len(d.version) + 2),
                     newest_ver=d.newest_version,
-                ), curses.A_BOLD
-                if d.version != d.newest_version else curses.A_DIM
+                ),
+                curses.A_BOLD if d.is_outdated else curses.A_DIM,
+                y == cursor_pos,
+                '! {}{}'.format(
+                    d.advisories[0],
+                    ' +{}'.format(len(d.advisories) - 1)
+                    if len(d.advisories) > 1 else '',
+                ) if d.advisories else '',
+            ))
+
+        for y, row in enumerate(rows):
+            if y < len(self._rows) and self._rows[y] == row:
+                continue
+            self._draw_row(y, row)
+        self._rows = rows
+
+    def _draw_row(self, y, row):
+        """Rewrites single row of distributions list.
+
+        :param int y: Row number.
+        :param tuple row: Tuple of name and version text, newest version text,
+            newest version attributes, cursor flag and advisories text (or
+            None for empty row).
+        """
+        self.dist_win.move(y, 0)
+        self.dist_win.clrtoeol()
+        if row is None:
+            return
+        text, newest_text, newest_attr, is_cursor, advisories_text = row
+        # Writing the last column would move the cursor out of the window.
+        self.dist_win.addnstr(y, 0, text, self.line_width - 1)
+        if len(text) < self.line_width - 1:
+            self.dist_win.addnstr(
+                newest_text, self.line_width - 1 - len(text), newest_attr
+            )
+        x = max(
+            self.line_width - 1 - len(advisories_text),
+            len(text) + len(newest_text) + 1,
+        )
+        if advisories_text and x < self.line_width - 1:
+            self.dist_win.addnstr(
+                y, x, advisories_text, self.line_width - 1 - x, curses.A_BOLD
             )
-            try:
-                self.dist_win.addstr('\n')
-            except curses.error:
-                pass
-        self.dist_win.refresh()
+        if is_cursor:
+            self.dist_win.chgat(y, 3, curses.A_REVERSE)
 
     def draw_popup(self, msg):
-        """Draws small bordered window with given message.
+        """Draws bordered window with given message.
+
+        Message may have many lines. If it does not fit the terminal, lines
+        from the middle are skipped (the last line usually asks a question).
 
         :param str msg: Message to display.
         """
+        lines = msg.split('\n')
+        max_lines = max(self.stdscr.getmaxyx()[0] - 3, 1)
+        if len(lines) > max_lines:
+            skipped = len(lines) - max_lines + 1
+            lines = lines[:max_lines - 2] + [
+                '  ... ({} more)'.format(skipped)
+            ] + lines[-1:]
+        width = min(
+            max(35, max(len(line) for line in lines) + 3), self.line_width
+        )
         self.popup_win.erase()
         self.popup_win.refresh()
-        self.popup_win.resize(3, max(35, len(msg) + 3))
+        self.popup_win.resize(len(lines) + 2, width)
         self.popup_win.box()
-        self.popup_win.addstr(1, 1, msg)
+        for y, line in enumerate(lines, 1):
+            self.popup_win.addnstr(y, 1, line, width - 2)
         self.popup_win.refresh()
+        self.invalidate()
 
     def check_win_size(self):
         """Checks if terminal has proper size to display all information."""
@@ -156,8 +314,3 @@ class Gui(object):
             self.draw_popup('Please resize the terminal.')
             self.stdscr.getch()
         curses.flushinp()
-
-    def _resize_dist_win(self):
-        self.dist_win.erase()
-        self.dist_win.resize(self.dist_win_height, self.line_width)
-        self.dist_win.refresh()
@@ -0,0 +1,642 @@
+# -*- coding: utf-8 -*-
+"""Sources of available distribution versions.
+
+`SimpleIndexSource` talks to package indexes directly using the "simple"
+repository API - PEP 691 JSON responses are preferred and PEP 503 HTML pages
+are used as a fallback. `LocalSource` works offline with local directories
+of distribution files and local mirrors. `PipSource` asks pip itself and
+parses its output.
+"""
+import base64
+import json
+import os
+import re
+import sys
+import threading
+import time
+
+try:
+    from configparser import RawConfigParser
+    from configparser import Error as ConfigError
+    from html.parser import HTMLParser
+    from http.client import HTTPConnection
+    from http.client import HTTPException
+    from http.client import HTTPSConnection
+    from urllib.parse import unquote
+    from urllib.parse import urljoin
+    from urllib.parse import urlsplit
+    from urllib.request import getproxies
+    from urllib.request import pathname2url
+    from urllib.request import proxy_bypass
+    from urllib.request import url2pathname
+except ImportError:
+    from ConfigParser import RawConfigParser
+    from ConfigParser import Error as ConfigError
+    from HTMLParser import HTMLParser
+    from httplib import HTTPConnection
+    from httplib import HTTPException
+    from httplib import HTTPSConnection
+    from urllib import getproxies
+    from urllib import pathname2url
+    from urllib import proxy_bypass
+    from urllib import unquote
+    from urllib import url2pathname
+    from urlparse import urljoin
+    from urlparse import urlsplit
+
+from pip_manager.cache import CacheEntry
+from pip_manager.cache import VersionCache
+from pip_manager.commands import run_pip
+from pip_manager.profiling import profiler
+from pip_manager.utils import get_find_links
+from pip_manager.utils import get_mirror
+from pip_manager.utils import get_version_source_name
+from pip_manager.utils import normalize_name
+
+PYPI_SIMPLE_URL = 'https://pypi.org/simple/'
+TIMEOUT = 15
+MAX_REDIRECTS = 5
+
+JSON_CONTENT_TYPE = 'application/vnd.pypi.simple.v1+json'
+ACCEPT_HEADER = ', '.join([
+    JSON_CONTENT_TYPE,
+    'application/vnd.pypi.simple.v1+html;q=0.2',
+    'text/html;q=0.01',
+])
+
+SDIST_EXTENSIONS = ('.tar.gz', '.tar.bz2', '.tar.xz', '.tgz', '.tar', '.zip')
+
+
+def _get_pip_config_files():
+    """Gets pip configuration files in the order pip itself loads them.
+
+    Later files override earlier ones.
+
+    :return: List of paths (not necessarily existing).
+    :rtype: list
+    """
+    config_file = os.environ.get('PIP_CONFIG_FILE')
+    if config_file == os.devnull:
+        return []
+
+    file_name = 'pip.ini' if sys.platform.startswith('win') else 'pip.conf'
+    if sys.platform.startswith('win'):
+        global_files = [
+            os.path.join(os.environ.get('ProgramData', 'C:\\ProgramData'), 'pip', file_name),  # noqa: E501 line too long
+        ]
+        user_files = [
+            os.path.join(os.environ.get('APPDATA', ''), 'pip', file_name),
+        ]
+    else:
+        xdg_dirs = os.environ.get('XDG_CONFIG_DIRS', '/etc/xdg')
+        global_files = [
+            os.path.join(d, 'pip', file_name) for d in xdg_dirs.split(':')
+        ] + [os.path.join('/etc', file_name)]
+        user_files = [
+            os.path.join(os.path.expanduser('~'), '.pip', file_name),
+            os.path.join(
+                os.environ.get(
+                    'XDG_CONFIG_HOME',
+                    os.path.join(os.path.expanduser('~'), '.config')
+                ), 'pip', file_name
+            ),
+        ]
+        if sys.platform == 'darwin':
+            user_files.append(os.path.join(
+                os.path.expanduser('~'),
+                'Library', 'Application Support', 'pip', file_name
+            ))
+
+    files = list(global_files)
+    if not (config_file and os.path.exists(config_file)):
+        files.extend(user_files)
+    files.append(os.path.join(sys.prefix, file_name))
+    if config_file:
+        files.append(config_file)
+    return files
+
+
+def get_pip_index_urls():
+    """Gets index URLs configured for pip.
+
+    Honours `index-url`, `extra-index-url` and `no-index` options from pip
+    configuration files ([global] and [install] sections) and PIP_INDEX_URL,
+    PIP_EXTRA_INDEX_URL and PIP_NO_INDEX environment variables.
+
+    :return: List of index URLs, main index first.
+    :rtype: list
+    """
+    options = {}
+    parser = RawConfigParser()
+    try:
+        parser.read(_get_pip_config_files())
+    except ConfigError:
+        pass
+    for section in ('global', 'install'):
+        if parser.has_section(section):
+            for key, value in parser.items(section):
+                options[key.replace('_', '-')] = value
+    for key in ('index-url', 'extra-index-url', 'no-index'):
+        env_var = 'PIP_{}'.format(key.replace('-', '_').upper())
+        if env_var in os.environ:
+            options[key] = os.environ[env_var]
+
+    if options.get('no-index', '').strip().lower() in ('1', 'yes', 'true', 'on'):  # noqa: E501 line too long
+        return []
+    index_url = options.get('index-url', '').strip() or PYPI_SIMPLE_URL
+    return [index_url] + options.get('extra-index-url', '').split()
+
+
+def _version_from_filename(filename, name):
+    """Extracts version from name of a distribution file.
+
+    :param str filename: File name (e.g. `Flask-1.0.2-py2.py3-none-any.whl`).
+    :param str name: Normalized project name.
+    :return: Version or None if it cannot be determined.
+    :rtype: str or None
+    """
+    if filename.endswith('.whl') or filename.endswith('.egg'):
+        parts = filename.split('-')
+        if len(parts) >= 3 and normalize_name(parts[0]) == name:
+            return parts[1]
+        return None
+    for ext in SDIST_EXTENSIONS:
+        if filename.endswith(ext):
+            stem = filename[:-len(ext)]
+            break
+    else:
+        return None
+    for match in re.finditer('-', stem):
+        version = stem[match.end():]
+        if normalize_name(stem[:match.start()]) == name and re.match(r'v?\d', version):  # noqa: E501 line too long
+            return version
+    return None
+
+
+def _split_filename(filename):
+    """Splits name of a distribution file into project name and version.
+
+    :param str filename: File name (e.g. `Flask-1.0.2-py2.py3-none-any.whl`).
+    :return: Tuple of normalized project name and version or None if it is
+        not a distribution file.
+    :rtype: tuple or None
+    """
+    if filename.endswith('.whl') or filename.endswith('.egg'):
+        parts = filename[:-4].split('-')
+        if len(parts) >= 2 and parts[0] and parts[1]:
+            return normalize_name(parts[0]), parts[1]
+        return None
+    for ext in SDIST_EXTENSIONS:
+        if filename.endswith(ext):
+            match = re.match(r'^(.+?)-(v?\d.*)$', filename[:-len(ext)])
+            if match is None:
+                return None
+            return normalize_name(match.group(1)), match.group(2)
+    return None
+
+
+class _LinksParser(HTMLParser):
+    """Collects non-yanked file names from PEP 503 project page."""
+
+    def __init__(self):
+        HTMLParser.__init__(self)
+        self.filenames = []
+        self._href = None
+        self._text = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag != 'a':
+            return
+        attrs = dict(attrs)
+        if 'data-yanked' in attrs:
+            return
+        self._href = attrs.get('href') or ''
+        self._text = []
+
+    def handle_data(self, data):
+        if self._href is not None:
+            self._text.append(data)
+
+    def handle_endtag(self, tag):
+        if tag != 'a' or self._href is None:
+            return
+        filename = ''.join(self._text).strip()
+        if not filename:
+            filename = unquote(
+                urlsplit(self._href).path.rstrip('/').rsplit('/', 1)[-1]
+            )
+        self.filenames.append(filename)
+        self._href = None
+
+
+def parse_json_page(body, name):
+    """Gets versions from PEP 691 JSON project page.
+
+    :param bytes body: Response body.
+    :param str name: Normalized project name.
+    :return: List of versions available.
+    :rtype: list
+    """
+    data = json.loads(body.decode('utf-8'))
+    return _unique_versions(
+        [
+            f.get('filename', '') for f in data.get('files', [])
+            if not f.get('yanked')
+        ], name
+    )
+
+
+def parse_html_page(body, name):
+    """Gets versions from PEP 503 HTML project page.
+
+    :param bytes body: Response body.
+    :param str name: Normalized project name.
+    :return: List of versions available.
+    :rtype: list
+    """
+    parser = _LinksParser()
+    parser.feed(body.decode('utf-8', 'replace'))
+    parser.close()
+    return _unique_versions(parser.filenames, name)
+
+
+def _unique_versions(filenames, name):
+    versions = []
+    seen = set()
+    for filename in filenames:
+        version = _version_from_filename(filename, name)
+        if version is not None and version not in seen:
+            seen.add(version)
+            versions.append(version)
+    return versions
+
+
+class ConnectionPool(object):
+    """Keeps HTTP(S) connections alive and reuses them between requests.
+
+    Connections are kept per scheme, host and port. The pool is safe to use
+    from many threads - each thread checks out its own connection.
+    """
+
+    def __init__(self, timeout=TIMEOUT):
+        self.timeout = timeout
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def _new_connection(self, scheme, host, port):
+        """Creates new connection, going through a proxy if one is configured.
+
+        :return: Tuple of connection and flag telling if requests have to use
+            absolute URLs (plain HTTP proxy).
+        :rtype: tuple
+        """
+        proxy = None if proxy_bypass(host) else getproxies().get(scheme)
+        if not proxy:
+            connection_cls = HTTPSConnection if scheme == 'https' else HTTPConnection  # noqa: E501 line too long
+            return connection_cls(host, port, timeout=self.timeout), False
+
+        proxy_parts = urlsplit(proxy)
+        proxy_port = proxy_parts.port or (
+            443 if proxy_parts.scheme == 'https' else 80
+        )
+        if scheme == 'https':
+            conn = HTTPSConnection(
+                proxy_parts.hostname, proxy_port, timeout=self.timeout
+            )
+            conn.set_tunnel(host, port)
+            return conn, False
+        return HTTPConnection(
+            proxy_parts.hostname, proxy_port, timeout=self.timeout
+        ), True
+
+    def _checkout(self, key):
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                return idle.pop()
+        return self._new_connection(*key)
+
+    def _checkin(self, key, entry):
+        with self._lock:
+            self._idle.setdefault(key, []).append(entry)
+
+    def request(self, url, headers=None):
+        """Performs GET request, following redirects.
+
+        :param str url: URL to get.
+        :param dict headers: Additional request headers.
+        :return: Tuple of final URL, status code, response headers (with
+            lowercase names) and body.
+        :rtype: tuple
+        """
+        for _ in range(MAX_REDIRECTS + 1):
+            status, response_headers, body = self._request_once(url, headers)
+            location = response_headers.get('location')
+            if status in (301, 302, 303, 307, 308) and location:
+                url = urljoin(url, location)
+                continue
+            return url, status, response_headers, body
+        raise HTTPException('Too many redirects for {}'.format(url))
+
+    def _request_once(self, url, headers):
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        port = parts.port or (443 if scheme == 'https' else 80)
+        key = (scheme, parts.hostname, port)
+        request_headers = dict(headers or {})
+        if parts.username:
+            credentials = '{}:{}'.format(
+                unquote(parts.username), unquote(parts.password or '')
+            ).encode('utf-8')
+            request_headers['Authorization'] = 'Basic {}'.format(
+                base64.b64encode(credentials).decode('ascii')
+            )
+
+        for attempt in range(2):
+            conn, via_proxy = self._checkout(key)
+            path = parts.path or '/'
+            if parts.query:
+                path = '{}?{}'.format(path, parts.query)
+            if via_proxy:
+                path = '{}://{}:{}{}'.format(scheme, parts.hostname, port, path)  # noqa: E501 line too long
+            try:
+                conn.request('GET', path, headers=request_headers)
+                response = conn.getresponse()
+                body = response.read()
+            except (HTTPException, OSError, IOError):
+                conn.close()
+                # Idle keep-alive connection might have been closed by the
+                # server - retry once with a fresh one.
+                if attempt:
+                    raise
+                continue
+            response_headers = dict(
+                (k.lower(), v) for k, v in response.getheaders()
+            )
+            if response.will_close:
+                conn.close()
+            else:
+                self._checkin(key, (conn, via_proxy))
+            return response.status, response_headers, body
+
+    def close(self):
+        """Closes all idle connections."""
+        with self._lock:
+            for connections in self._idle.values():
+                for conn, _ in connections:
+                    conn.close()
+            self._idle.clear()
+
+
+class VersionSource(object):
+    """Base class for sources of available distribution versions."""
+
+    #: If True, previously cached results must not be used.
+    refresh = False
+
+    #: Additional pip options making pip install from the same place the
+    #: versions are looked up in (empty if pip configuration is enough).
+    pip_args = ()
+
+    def get_versions(self, name):
+        """Gets versions of distribution available.
+
+        :param str name: Distribution name.
+        :return: List of versions available (in no particular order).
+        :rtype: list
+        """
+        raise NotImplementedError
+
+
+class SimpleIndexSource(VersionSource):
+    """Looks up versions using "simple" repository API of package indexes.
+
+    If cache is given, fresh entries are used without touching the network
+    and stale ones are revalidated with conditional requests (ETag and
+    Last-Modified).
+    """
+
+    def __init__(self, index_urls=None, pool=None, cache=None):
+        self.index_urls = (
+            get_pip_index_urls() if index_urls is None else index_urls
+        )
+        self.pool = pool or ConnectionPool()
+        self.cache = cache
+
+    def query(self, index_url, name):
+        """Gets versions of distribution available on one index.
+
+        :param str index_url: Index URL.
+        :param str name: Distribution name.
+        :return: List of versions available or None if the project page
+            could not be fetched.
+        :rtype: list or None
+        """
+        name = normalize_name(name)
+        entry = None
+        if self.cache is not None and not self.refresh:
+            entry = self.cache.get(index_url, name)
+            if entry is not None and entry.is_fresh(self.cache.ttl):
+                return entry.versions
+
+        headers = {'Accept': ACCEPT_HEADER}
+        if entry is not None and entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry is not None and entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+
+        url = urljoin(index_url.rstrip('/') + '/', name + '/')
+        try:
+            with profiler.span('index.request', 'network', project=name):
+                _, status, response_headers, body = self.pool.request(
+                    url, headers
+                )
+        except (HTTPException, OSError, IOError):
+            status = None
+
+        if entry is not None and status == 304:
+            versions = entry.versions
+        elif status == 200:
+            try:
+                if response_headers.get('content-type', '').startswith(JSON_CONTENT_TYPE):  # noqa: E501 line too long
+                    versions = parse_json_page(body, name)
+                else:
+                    versions = parse_html_page(body, name)
+            except ValueError:
+                return None
+        else:
+            # Stale versions are better than none when index is unreachable.
+            return entry.versions if entry is not None else None
+
+        if self.cache is not None:
+            if status == 200:
+                etag = response_headers.get('etag')
+                last_modified = response_headers.get('last-modified')
+            else:
+                etag = response_headers.get('etag', entry.etag)
+                last_modified = response_headers.get(
+                    'last-modified', entry.last_modified
+                )
+            self.cache.put(index_url, name, CacheEntry(
+                versions, time.time(), etag, last_modified
+            ))
+        return versions
+
+    def get_versions(self, name):
+        versions = []
+        for index_url in self.index_urls:
+            for v in self.query(index_url, name) or []:
+                if v not in versions:
+                    versions.append(v)
+        return versions
+
+
+def _to_path(location):
+    """Converts `file:` URL (or relative path) to absolute path."""
+    if location.startswith('file:'):
+        location = url2pathname(urlsplit(location).path)
+    return os.path.abspath(os.path.expanduser(location))
+
+
+class LocalSource(VersionSource):
+    """Looks up versions without network access.
+
+    Versions are found in local directories with distribution files
+    (wheelhouses, like `pip install --find-links` does) and in a local mirror
+    of the "simple" repository (a directory with `<project>/index.html`
+    pages, e.g. made with bandersnatch).
+
+    Directories are listed once - wheelhouse file names are indexed by
+    project and mirror projects are known up front, so every lookup is
+    answered from memory (only mirror project pages are read from disk).
+    """
+
+    def __init__(self, find_links=(), mirror=None):
+        """
+        :param list find_links: Directories with distribution files.
+        :param str mirror: Root directory of local "simple" repository.
+        """
+        self.find_links = [_to_path(location) for location in find_links]
+        self.mirror = _to_path(mirror) if mirror else None
+        self._versions = None
+        self._projects = None
+        self._lock = threading.Lock()
+
+    @property
+    def pip_args(self):
+        if self.mirror:
+            args = ['--index-url', urljoin('file:', pathname2url(self.mirror))]
+        else:
+            args = ['--no-index']
+        for location in self.find_links:
+            args.extend(['--find-links', location])
+        return args
+
+    def _build_index(self):
+        """Lists all directories once.
+
+        :return: Tuple of versions found in wheelhouses (by normalized
+            project name) and mirror project directories (by normalized
+            project name).
+        :rtype: tuple
+        """
+        versions = {}
+        for location in self.find_links:
+            try:
+                filenames = sorted(os.listdir(location))
+            except OSError:
+                continue
+            for filename in filenames:
+                parsed = _split_filename(filename)
+                if parsed is not None:
+                    versions.setdefault(parsed[0], []).append(parsed[1])
+        projects = {}
+        if self.mirror:
+            try:
+                projects = dict(
+                    (normalize_name(d), d) for d in os.listdir(self.mirror)
+                )
+            except OSError:
+                pass
+        return versions, projects
+
+    def _query_mirror(self, name):
+        directory = self._projects.get(name)
+        if directory is None:
+            return []
+        try:
+            with open(os.path.join(self.mirror, directory, 'index.html'), 'rb') as f:  # noqa: E501 line too long
+                body = f.read()
+        except (OSError, IOError):
+            return []
+        return parse_html_page(body, name)
+
+    def get_versions(self, name):
+        with self._lock:
+            if self._versions is None:
+                self._versions, self._projects = self._build_index()
+        name = normalize_name(name)
+        versions = []
+        seen = set()
+        for v in self._versions.get(name, []) + self._query_mirror(name):
+            if v not in seen:
+                seen.add(v)
+                versions.append(v)
+        return versions
+
+
+class PipSource(VersionSource):
+    """Looks up versions by asking pip to install nonexistent version.
+
+    pip lists all versions it found in its error message. pip is run by
+    pip workers (if enabled), so it is not started for every lookup.
+    """
+
+    def get_versions(self, name):
+        error_msg = 'n/a'
+        returncode, output = run_pip(sys.executable, ['install', '{}==lxPhr_ffmS3fZ3E4P7U1Lw'.format(name)])  # noqa: E501 line too long
+        if returncode != 0:
+            error_msg = output
+
+        try:
+            versions_msg = error_msg.split('(')[1].split(')')[0].split(':')[1]
+        except IndexError:
+            return []
+        return re.findall(r'[\d\.]+[\d]*[\w]*', versions_msg)
+
+
+_version_source = None
+_version_source_lock = threading.Lock()
+
+
+def get_version_source():
+    """Gets version source shared by the whole session.
+
+    Local directories are used if `find_links` or `mirror` option is set in
+    config.ini. Otherwise source type is chosen with `version_source` option.
+
+    :return: Version source.
+    :rtype: VersionSource
+    """
+    global _version_source
+    with _version_source_lock:
+        if _version_source is None:
+            find_links, mirror = get_find_links(), get_mirror()
+            if find_links or mirror:
+                _version_source = LocalSource(find_links, mirror)
+            elif get_version_source_name() == 'pip':
+                _version_source = PipSource()
+            else:
+                _version_source = SimpleIndexSource(cache=VersionCache())
+        return _version_source
+
+
+def set_version_source(source):
+    """Replaces version source shared by the whole session (e.g. with one
+    chosen by command line options).
+
+    :param VersionSource source: Version source.
+    """
+    global _version_source
+    with _version_source_lock:
+        _version_source = source
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""Background execution of pip invocations.
+
+Upgrades and removals are queued as jobs and run one after another by a
+single background worker, so the list stays responsive while pip works.
+Results are applied to distributions only by the thread calling `drain`.
+"""
+import itertools
+import os
+import threading
+import time
+import traceback
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+from pip_manager.utils import get_cache_dir
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+UPGRADE = 'upgrade'
+REMOVE = 'remove'
+
+TAIL_LINES = 20
+LOGS_DIR_NAME = 'logs'
+
+
+class Job(object):
+    """Single pip invocation with its state and captured output.
+
+    Output of successful jobs is trimmed to the last TAIL_LINES lines. Failed
+    jobs keep the whole output, which is also saved to the logs directory in
+    the cache directory.
+    """
+
+    def __init__(self, kind, distributions, run, env=None):
+        """
+        :param str kind: Job kind (e.g. `upgrade` or `remove`).
+        :param list distributions: Distributions the job works on.
+        :param run: Callable taking `on_line` keyword argument (called with
+            every line of output) and returning result with `succeeded`
+            property.
+        :param Environment env: Environment (None for the current
+            interpreter).
+        """
+        self.id = None
+        self.kind = kind
+        self.distributions = distributions
+        self.env = env
+        self.state = QUEUED
+        self.result = None
+        self.log = []
+        self.log_path = None
+        self.started_at = None
+        self.finished_at = None
+        self._run = run
+
+    @property
+    def elapsed(self):
+        """Seconds the job has been running for (0 if not started yet).
+
+        :rtype: float
+        """
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+    @property
+    def is_finished(self):
+        return self.state in (DONE, FAILED)
+
+    def add_line(self, line):
+        """Captures single line of output."""
+        self.log.append(line.rstrip('\n'))
+
+    def get_tail(self, count=TAIL_LINES):
+        """Gets the last non-empty lines of output.
+
+        :rtype: list
+        """
+        return [line for line in self.log[-count * 2:] if line.strip()][-count:]  # noqa: E501 line too long
+
+    def run(self):
+        """Runs the job (never raises)."""
+        self.state = RUNNING
+        self.started_at = time.time()
+        try:
+            self.result = self._run(on_line=self.add_line)
+            succeeded = self.result.succeeded
+        except Exception:
+            self.log.extend(traceback.format_exc().splitlines())
+            succeeded = False
+        self.finished_at = time.time()
+        if succeeded:
+            self.log = self.log[-TAIL_LINES:]
+        else:
+            self.log_path = self._save_log()
+        self.state = DONE if succeeded else FAILED
+
+    def _save_log(self):
+        """Saves the whole output (best effort).
+
+        :return: Path to the log file or None if it could not be written.
+        :rtype: str or None
+        """
+        directory = os.path.join(get_cache_dir(), LOGS_DIR_NAME)
+        path = os.path.join(directory, 'job-{}-{}.log'.format(
+            time.strftime('%Y%m%d-%H%M%S', time.localtime(self.started_at)),
+            self.id,
+        ))
+        try:
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+            with open(path, 'w') as f:
+                f.write('\n'.join(self.log) + '\n')
+        except (OSError, IOError):
+            return None
+        return path
+
+
+class JobQueue(object):
+    """Runs submitted jobs one by one in a background thread.
+
+    Finished jobs are kept for display - the most recent `history` ones and
+    all failed ones (so their logs can be inspected).
+    """
+
+    def __init__(self, history=10):
+        self.history = history
+        self.jobs = []
+        self._ids = itertools.count(1)
+        self._pending = queue.Queue()
+        self._finished = queue.Queue()
+        self._unfinished = 0
+        self._worker = None
+
+    @property
+    def is_busy(self):
+        """Checks if some jobs have not been drained yet.
+
+        :rtype: bool
+        """
+        return self._unfinished > 0
+
+    def submit(self, job):
+        """Queues job (worker is started on first use).
+
+        :rtype: Job
+        """
+        job.id = next(self._ids)
+        self.jobs.append(job)
+        self._prune()
+        self._unfinished += 1
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._work)
+            self._worker.daemon = True
+            self._worker.start()
+        self._pending.put(job)
+        return job
+
+    def _work(self):
+        while True:
+            job = self._pending.get()
+            try:
+                job.run()
+            finally:
+                self._finished.put(job)
+                self._pending.task_done()
+
+    def _prune(self):
+        done = [j for j in self.jobs if j.state == DONE]
+        excess = len(self.jobs) - self.history
+        if excess > 0:
+            dropped = set(id(j) for j in done[:excess])
+            self.jobs = [j for j in self.jobs if id(j) not in dropped]
+
+    def drain(self):
+        """Gets jobs finished since the last call without waiting for more.
+
+        :return: List of jobs in order they finished.
+        :rtype: list
+        """
+        finished = []
+        while True:
+            try:
+                finished.append(self._finished.get_nowait())
+            except queue.Empty:
+                self._unfinished -= len(finished)
+                return finished
+
+    def wait(self):
+        """Waits until all submitted jobs are finished (they still have to be
+        drained)."""
+        self._pending.join()
+
+    @property
+    def last_failed(self):
+        """Most recent failed job.
+
+        :rtype: Job or None
+        """
+        for job in reversed(self.jobs):
+            if job.state == FAILED:
+                return job
+        return None
+
+    def get_recent(self, count):
+        """Gets the most recently submitted jobs.
+
+        :rtype: list
+        """
+        return self.jobs[-count:] if count > 0 else []
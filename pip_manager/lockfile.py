@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""Lockfiles - snapshots of installed distributions.
+
+Lockfile is a JSON document listing names, installed versions and newest
+versions available of all distributions (with environment labels if many
+environments are managed). Environment can be synced to a lockfile - only
+distributions which differ are installed, upgraded, downgraded or removed.
+"""
+import datetime
+import json
+import platform
+import sys
+from collections import namedtuple
+
+from pip_manager.jobs import FAILED
+from pip_manager.jobs import REMOVE
+
+LOCKFILE_VERSION = 1
+
+LockedDistribution = namedtuple('LockedDistribution', ['name', 'version', 'newest_version', 'env_label'])  # noqa: E501 line too long
+
+
+class InvalidLockfile(Exception):
+    pass
+
+
+def dump_lockfile(distributions, out, with_env_label=False):
+    """Writes lockfile.
+
+    :param list distributions: Distributions to lock (with newest versions
+        resolved).
+    :param out: File-like object to write to.
+    :param bool with_env_label: Whether to record environment labels.
+    """
+    packages = []
+    for d in distributions:
+        package = {
+            'name': d.name,
+            'version': d.version,
+            'newest_version': d.newest_version,
+        }
+        if with_env_label:
+            package['env_label'] = d.env_label
+        packages.append(package)
+    json.dump({
+        'lockfile_version': LOCKFILE_VERSION,
+        'created': datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'python': platform.python_version(),
+        'packages': packages,
+    }, out, indent=2, sort_keys=True)
+    out.write('\n')
+
+
+def load_lockfile(f):
+    """Reads lockfile.
+
+    :param f: File-like object to read from.
+    :return: List of locked distributions (`env_label` is None if the
+        distribution applies to every environment).
+    :rtype: list
+    :raises InvalidLockfile: If the file is not a valid lockfile.
+    """
+    try:
+        data = json.load(f)
+    except ValueError as e:
+        raise InvalidLockfile('Invalid lockfile: {}'.format(e))
+    if not isinstance(data, dict) or data.get('lockfile_version') != LOCKFILE_VERSION:  # noqa: E501 line too long
+        raise InvalidLockfile(
+            'Unsupported lockfile version (expected {})'.format(LOCKFILE_VERSION)  # noqa: E501 line too long
+        )
+    locked = []
+    for package in data.get('packages', []):
+        try:
+            locked.append(LockedDistribution(
+                package['name'], package['version'],
+                package.get('newest_version'), package.get('env_label'),
+            ))
+        except (KeyError, TypeError):
+            raise InvalidLockfile(
+                'Invalid lockfile entry: {}'.format(json.dumps(package))
+            )
+    return locked
+
+
+def export_lockfile(pip_manager, out=None):
+    """Writes lockfile of all distributions once their newest versions are
+    resolved.
+
+    :param PipManager pip_manager: Headless pip manager.
+    :param out: File-like object to write to (sys.stdout by default).
+    :return: Exit code.
+    :rtype: int
+    """
+    for _ in pip_manager.resolver.iter_resolved():
+        pass
+    dump_lockfile(
+        pip_manager.distributions, out or sys.stdout,
+        with_env_label=bool(pip_manager.environments),
+    )
+    return 0
+
+
+def _describe_env(env):
+    return '' if env is None else ' ({})'.format(env.label)
+
+
+def sync_lockfile(pip_manager, locked, dry_run=False, out=None):
+    """Syncs environments to a lockfile.
+
+    Changes are printed first (`+` install, `~` upgrade or downgrade, `-`
+    remove). Then distributions to remove are removed with one pip run and
+    distributions to install with another one (per environment).
+
+    :param PipManager pip_manager: Headless pip manager.
+    :param list locked: Locked distributions.
+    :param bool dry_run: Whether to only print the changes.
+    :param out: File-like object to write to (sys.stdout by default).
+    :return: Exit code - 1 if some pip run failed, 0 otherwise.
+    :rtype: int
+    """
+    out = out or sys.stdout
+    plans = pip_manager.plan_sync(locked)
+    changes = 0
+    for plan in plans:
+        suffix = _describe_env(plan.env)
+        for d in plan.remove:
+            out.write('- {} {}{}\n'.format(d.name, d.version, suffix))
+        for name, version in plan.install:
+            d = pip_manager.get_distribution(name, plan.env)
+            if d is None:
+                out.write('+ {} {}{}\n'.format(name, version, suffix))
+            else:
+                out.write('~ {} {} -> {}{}\n'.format(
+                    name, d.version, version, suffix
+                ))
+        changes += len(plan.remove) + len(plan.install)
+    if not changes:
+        out.write('Already in sync.\n')
+        return 0
+    if dry_run:
+        return 0
+
+    jobs = pip_manager.sync_distributions(plans)
+    pip_manager.jobs.wait()
+    pip_manager.apply_finished_jobs()
+    failed = [job for job in jobs if job.state == FAILED]
+    for job in failed:
+        out.write('pip {} failed{}{}\n'.format(
+            'uninstall' if job.kind == REMOVE else 'install',
+            _describe_env(job.env),
+            ' - see {}'.format(job.log_path) if job.log_path else '',
+        ))
+    return 1 if failed else 0
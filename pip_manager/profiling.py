@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""Lightweight timing instrumentation.
+
+Hot paths are wrapped with `profiler.span(...)`. While profiling is disabled
+(the default) a span is a shared no-op context manager, so the hooks can stay
+in place. When enabled, every span is recorded as an event and summarized
+(count, total, p50, p95 and max duration per name) on exit. Events can also
+be written as Chrome trace-event JSON (viewable in chrome://tracing or
+Perfetto) and the main thread can be profiled with cProfile.
+"""
+import cProfile
+import json
+import math
+import os
+import sys
+import threading
+from collections import OrderedDict
+from collections import namedtuple
+
+try:
+    from time import perf_counter as clock
+except ImportError:
+    from time import time as clock  # Python 2
+
+Event = namedtuple('Event', ['name', 'category', 'start', 'duration', 'thread', 'args'])  # noqa: E501 line too long
+
+Summary = namedtuple('Summary', ['name', 'count', 'total', 'p50', 'p95', 'max'])  # noqa: E501 line too long
+
+
+def percentile(durations, fraction):
+    """Gets percentile of sorted durations (nearest-rank method).
+
+    :param list durations: Sorted durations.
+    :param float fraction: Percentile as a fraction (e.g. 0.95).
+    :rtype: float
+    """
+    if not durations:
+        return 0.0
+    rank = max(int(math.ceil(fraction * len(durations))), 1)
+    return durations[min(rank, len(durations)) - 1]
+
+
+class _NullSpan(object):
+    """Span used while profiling is disabled."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class _Span(object):
+    __slots__ = ('profiler', 'name', 'category', 'args', 'start')
+
+    def __init__(self, profiler, name, category, args):
+        self.profiler = profiler
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.start = clock()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.record(
+            self.name, self.start, clock(), self.category, self.args
+        )
+        return False
+
+
+class Profiler(object):
+    """Collects timings of named spans (from any thread)."""
+
+    def __init__(self):
+        self.enabled = False
+        self.origin = clock()
+        self.events = []
+        self._cprofile = None
+
+    def enable(self, cprofile=False):
+        """Starts recording spans.
+
+        :param bool cprofile: Whether to profile the main thread with
+            cProfile too (much higher overhead).
+        """
+        self.enabled = True
+        if cprofile and self._cprofile is None:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+
+    def span(self, name, category='app', **args):
+        """Times block of code.
+
+        :param str name: Span name (durations are summarized per name).
+        :param str category: Span category (e.g. `startup` or `render`).
+        :param args: Additional details stored with the event (e.g. project
+            name).
+        :return: Context manager.
+        """
+        if not self.enabled:
+            return NULL_SPAN
+        return _Span(self, name, category, args)
+
+    def record(self, name, start, end, category='app', args=None):
+        """Records span which has already ended.
+
+        :param float start: Start time (as returned by `clock`).
+        :param float end: End time (as returned by `clock`).
+        """
+        if self.enabled:
+            # list.append is atomic - no lock needed.
+            self.events.append(Event(
+                name, category, start, end - start,
+                threading.current_thread().ident, args or {},
+            ))
+
+    def get_summary(self):
+        """Summarizes durations (in seconds) per span name.
+
+        :return: List of summaries in order of first occurrence.
+        :rtype: list
+        """
+        durations = OrderedDict()
+        for event in list(self.events):
+            durations.setdefault(event.name, []).append(event.duration)
+        summary = []
+        for name, values in durations.items():
+            values.sort()
+            summary.append(Summary(
+                name, len(values), sum(values), percentile(values, 0.5),
+                percentile(values, 0.95), values[-1],
+            ))
+        return summary
+
+    def format_summary(self):
+        """Formats summary as a table (times in milliseconds).
+
+        :rtype: str
+        """
+        lines = ['{:<24} {:>7} {:>11} {:>9} {:>9} {:>9}'.format(
+            'span', 'count', 'total ms', 'p50 ms', 'p95 ms', 'max ms'
+        )]
+        for s in self.get_summary():
+            lines.append('{:<24} {:>7} {:>11.1f} {:>9.2f} {:>9.2f} {:>9.2f}'.format(  # noqa: E501 line too long
+                s.name, s.count, s.total * 1000, s.p50 * 1000,
+                s.p95 * 1000, s.max * 1000,
+            ))
+        return '\n'.join(lines)
+
+    def write_trace(self, path):
+        """Writes events in Chrome trace-event format.
+
+        :param str path: Output file path.
+        """
+        pid = os.getpid()
+        trace = {'traceEvents': [
+            {
+                'name': e.name, 'cat': e.category, 'ph': 'X',
+                'ts': (e.start - self.origin) * 1e6, 'dur': e.duration * 1e6,
+                'pid': pid, 'tid': e.thread, 'args': e.args,
+            }
+            for e in list(self.events)
+        ]}
+        with open(path, 'w') as f:
+            json.dump(trace, f)
+
+    def report(self, output=None, out=None):
+        """Prints summary and writes requested output file.
+
+        :param str output: Optional output path - Chrome trace-event JSON is
+            written if it ends with `.json`, cProfile stats otherwise.
+        :param out: Stream to print summary to (stderr by default).
+        """
+        out = out or sys.stderr
+        if self._cprofile is not None:
+            self._cprofile.disable()
+        out.write(self.format_summary() + '\n')
+        if not output:
+            return
+        if output.endswith('.json'):
+            self.write_trace(output)
+        elif self._cprofile is not None:
+            self._cprofile.dump_stats(output)
+        else:
+            return
+        out.write('Profile written to {}\n'.format(output))
+
+
+profiler = Profiler()
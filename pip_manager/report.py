@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""Non-interactive reports for scripts and CI pipelines."""
+import csv
+import json
+import sys
+
+from pip_manager.utils import get_protected_dists
+
+FIELDS = ['name', 'version', 'newest_version', 'protected']
+FORMATS = ('json', 'csv')
+
+
+class _JsonWriter(object):
+    """Writes one JSON object per line."""
+
+    def __init__(self, out, fields):
+        self.out = out
+
+    def write(self, record):
+        self.out.write(json.dumps(record, sort_keys=True) + '\n')
+        self.out.flush()
+
+
+class _CsvWriter(object):
+    """Writes CSV rows, starting with header."""
+
+    def __init__(self, out, fields):
+        self.out = out
+        self.writer = csv.DictWriter(out, fields, lineterminator='\n')
+        self.writer.writeheader()
+
+    def write(self, record):
+        self.writer.writerow(record)
+        self.out.flush()
+
+
+WRITERS = {
+    'json': _JsonWriter,
+    'csv': _CsvWriter,
+}
+
+
+def list_outdated(pip_manager, fmt='json', out=None):
+    """Writes outdated distributions as soon as their newest versions are
+    resolved.
+
+    Every record tells whether distribution is protected (according to
+    [protected] section of config files). Environment label is reported too
+    if many environments are managed.
+
+    :param PipManager pip_manager: Headless pip manager.
+    :param str fmt: Output format - one of FORMATS.
+    :param out: File-like object to write to (sys.stdout by default).
+    :return: Exit code - 1 if there are outdated distributions, 0 otherwise.
+    :rtype: int
+    """
+    fields = FIELDS + ['env_label'] if pip_manager.environments else FIELDS
+    writer = WRITERS[fmt](out or sys.stdout, fields)
+    protected = get_protected_dists()
+    outdated = 0
+    for d in pip_manager.resolver.iter_resolved():
+        if d.is_outdated:
+            outdated += 1
+            record = dict(
+                (field, getattr(d, field)) for field in fields
+                if field != 'protected'
+            )
+            record['protected'] = d.name in protected
+            writer.write(record)
+    return 1 if outdated else 0
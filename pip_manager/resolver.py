@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+import heapq
+import itertools
+import threading
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+from pip_manager.profiling import profiler
+
+
+class Resolver(object):
+    """Resolves newest versions of distributions in background threads.
+
+    Distributions are resolved in the order they were given unless some of
+    them get prioritized (e.g. because they are visible on the screen).
+    Results are applied to distributions only by `drain` and `iter_resolved`,
+    so they are never modified under the feet of the thread that reads them.
+
+    Newest version is looked up once per name, even if distributions with
+    the same name are installed in many environments.
+    """
+
+    def __init__(self, distributions, workers):
+        self.total = len(distributions)
+        self.resolved = 0
+        self._groups = {}
+        for d in distributions:
+            self._groups.setdefault(d.name, []).append(d)
+        self._counter = itertools.count()
+        self._heap = [(i, next(self._counter), d.name) for i, d in enumerate(distributions)]  # noqa: E501 line too long
+        self._top_priority = 0
+        self._taken = set()
+        self._applied = set()
+        self._lock = threading.Lock()
+        self._results = queue.Queue()
+        self._workers = workers
+        self._start_workers(len(self._groups))
+
+    def _start_workers(self, pending):
+        for _ in range(min(self._workers, pending)):
+            worker = threading.Thread(target=self._work)
+            worker.daemon = True
+            worker.start()
+
+    @property
+    def is_finished(self):
+        """Checks if all results have been applied.
+
+        :rtype: bool
+        """
+        return self.resolved == self.total
+
+    def prioritize(self, distributions):
+        """Moves given distributions to the front of the pending queue.
+
+        Distributions prioritized later take precedence over the ones
+        prioritized earlier. Order of given distributions is kept.
+
+        :param list distributions: Distributions to resolve first.
+        """
+        with self._lock:
+            self._top_priority -= len(distributions)
+            for i, d in enumerate(distributions):
+                if d.name not in self._taken:
+                    heapq.heappush(self._heap, (
+                        self._top_priority + i, next(self._counter), d.name
+                    ))
+
+    def add(self, distributions):
+        """Resolves newest versions of distributions which got installed
+        later (e.g. new dependencies pulled in by an upgrade).
+
+        Distributions with names which are already resolved get their newest
+        versions right away.
+
+        :param list distributions: Distributions to resolve.
+        """
+        pending = set()
+        with self._lock:
+            for d in distributions:
+                group = self._groups.setdefault(d.name, [])
+                group.append(d)
+                self.total += 1
+                if d.name in self._applied:
+                    d.newest_version = group[0].newest_version
+                    self.resolved += 1
+                elif d.name not in self._taken and d.name not in pending:
+                    pending.add(d.name)
+                    heapq.heappush(self._heap, (
+                        self.total, next(self._counter), d.name
+                    ))
+        self._start_workers(len(pending))
+
+    def _next(self):
+        with self._lock:
+            while self._heap:
+                name = heapq.heappop(self._heap)[2]
+                if name not in self._taken:
+                    self._taken.add(name)
+                    return name
+        return None
+
+    def _work(self):
+        name = self._next()
+        while name is not None:
+            try:
+                with profiler.span('resolve', 'resolve', project=name):
+                    newest_version = self._groups[name][0].get_newest_version()  # noqa: E501 line too long
+            except Exception:
+                # Worker must never die silently - results are awaited.
+                newest_version = 'n/a'
+            self._results.put((name, newest_version))
+            name = self._next()
+
+    def _apply(self, result):
+        name, newest_version = result
+        group = self._groups[name]
+        self._applied.add(name)
+        for d in group:
+            d.newest_version = newest_version
+        self.resolved += len(group)
+        return group
+
+    def drain(self):
+        """Applies results resolved so far without waiting for more.
+
+        :return: List of distributions resolved since the last call.
+        :rtype: list
+        """
+        resolved = []
+        while True:
+            try:
+                resolved.extend(self._apply(self._results.get_nowait()))
+            except queue.Empty:
+                return resolved
+
+    def iter_resolved(self):
+        """Applies results as soon as they are resolved.
+
+        :return: Generator of distributions in order they got resolved.
+        :rtype: generator
+        """
+        while not self.is_finished:
+            for d in self._apply(self._results.get()):
+                yield d
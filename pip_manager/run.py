@@ -1,16 +1,161 @@
 # -*- coding: utf-8 -*-
+import argparse
+import atexit
 import sys
 
+from pip_manager.profiling import clock
+from pip_manager.profiling import profiler
+
+_imports_started = clock()
+
 try:
     import pip  # noqa: F401 'pip' imported but unused
 except ImportError:
     sys.exit("'pip' is not installed.")
 
-from pip_manager.app import PipManager
+from pip_manager.advisories import InvalidAdvisoryDatabase  # noqa: E402
+from pip_manager.app import PipManager  # noqa: E402
+from pip_manager.environment import InvalidEnvironment  # noqa: E402
+from pip_manager.lockfile import InvalidLockfile  # noqa: E402
+from pip_manager.lockfile import export_lockfile  # noqa: E402
+from pip_manager.lockfile import load_lockfile  # noqa: E402
+from pip_manager.lockfile import sync_lockfile  # noqa: E402
+from pip_manager.report import FORMATS  # noqa: E402
+from pip_manager.report import list_outdated  # noqa: E402
+from pip_manager.utils import get_wheel_store_size  # noqa: E402
+from pip_manager.wheelstore import WheelStore  # noqa: E402
+from pip_manager.wheelstore import format_stats  # noqa: E402
+
+_imports_finished = clock()
+
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(
+        prog='pip-manager',
+        description='Command line tool to make Python packages management '
+                    'easy.',
+    )
+    parser.add_argument(
+        '--refresh', action='store_true',
+        help='ignore cached versions and query package indexes again',
+    )
+    parser.add_argument(
+        '--pre', action='store_true',
+        help='offer pre-release and development versions as upgrades',
+    )
+    parser.add_argument(
+        '--env', action='append', dest='environments', metavar='PYTHON',
+        help='manage packages of given interpreter or virtualenv directory '
+             'instead of the current interpreter (can be given many times)',
+    )
+    parser.add_argument(
+        '--find-links', action='append', metavar='DIR',
+        help='look up newest versions in (and upgrade from) local directory '
+             'with wheels and sdists instead of package indexes (can be '
+             'given many times)',
+    )
+    parser.add_argument(
+        '--mirror', metavar='DIR',
+        help='look up newest versions in (and upgrade from) local mirror of '
+             'the "simple" repository instead of package indexes',
+    )
+    parser.add_argument(
+        '--advisory-db', metavar='DIR',
+        help='flag installed versions with known vulnerabilities found in '
+             'local OSV database (directory with advisories in OSV JSON '
+             'format)',
+    )
+    parser.add_argument(
+        '--profile', action='store_true',
+        help='print timings (count, total, p50, p95 and max) of startup '
+             'phases, version lookups, rendering and pip runs on exit',
+    )
+    parser.add_argument(
+        '--profile-output', metavar='FILE',
+        help='implies --profile; also write Chrome trace-event JSON (if FILE '
+             'ends with .json) or cProfile stats of the main thread to FILE',
+    )
+    parser.add_argument(
+        '--list-outdated', action='store_true',
+        help='print outdated packages without starting the interactive UI '
+             'and exit with status 1 if there are any',
+    )
+    parser.add_argument(
+        '--format', choices=FORMATS, default='json',
+        help='output format for --list-outdated (default: %(default)s)',
+    )
+    parser.add_argument(
+        '--export', metavar='FILE',
+        help='write lockfile (JSON) of installed packages and their newest '
+             'versions to FILE ("-" for stdout) and exit',
+    )
+    parser.add_argument(
+        '--sync', metavar='FILE',
+        help='install, upgrade, downgrade and remove packages, so they match '
+             'lockfile FILE, and exit',
+    )
+    parser.add_argument(
+        '--dry-run', action='store_true',
+        help='only print changes --sync would make',
+    )
+    parser.add_argument(
+        '--wheel-store-stats', action='store_true',
+        help='print size and hit rate of the wheel store and exit',
+    )
+    return parser.parse_args(args)
+
+
+def start_profiling(output=None):
+    """Enables profiling and reports results on exit.
+
+    :param str output: Optional path of trace-event JSON or cProfile stats.
+    """
+    profiler.enable(cprofile=bool(output) and not output.endswith('.json'))
+    profiler.record(
+        'startup.imports', _imports_started, _imports_finished, 'startup'
+    )
+    # Registered handlers run after the screen has been restored.
+    atexit.register(profiler.report, output)
 
 
 def main():
-    PipManager().mainloop()
+    args = parse_args()
+    if args.wheel_store_stats:
+        store = WheelStore(max_size=get_wheel_store_size())
+        print(format_stats(store.get_stats()))
+        sys.exit(0)
+    if args.profile or args.profile_output:
+        start_profiling(args.profile_output)
+    options = {'refresh': args.refresh}
+    if args.pre:
+        options['pre'] = True
+    if args.environments:
+        options['environments'] = args.environments
+    if args.find_links:
+        options['find_links'] = args.find_links
+    if args.mirror:
+        options['mirror'] = args.mirror
+    if args.advisory_db:
+        options['advisory_db'] = args.advisory_db
+    try:
+        if args.list_outdated:
+            pip_manager = PipManager(headless=True, **options)
+            sys.exit(list_outdated(pip_manager, args.format))
+        if args.export:
+            pip_manager = PipManager(headless=True, **options)
+            if args.export == '-':
+                sys.exit(export_lockfile(pip_manager))
+            with open(args.export, 'w') as f:
+                sys.exit(export_lockfile(pip_manager, f))
+        if args.sync:
+            with open(args.sync) as f:
+                locked = load_lockfile(f)
+            pip_manager = PipManager(headless=True, **options)
+            sys.exit(sync_lockfile(pip_manager, locked, args.dry_run))
+        pip_manager = PipManager(**options)
+    except (InvalidEnvironment, InvalidLockfile, InvalidAdvisoryDatabase) as e:  # noqa: E501 line too long
+        sys.exit(str(e))
+    pip_manager.mainloop()
 
 
 if __name__ == '__main__':
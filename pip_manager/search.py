@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+from collections import defaultdict
+
+from pip_manager.utils import normalize_name
+
+
+def is_subsequence(query, name):
+    """Checks if all characters of query appear in name in the same order.
+
+    :rtype: bool
+    """
+    chars = iter(name)
+    return all(c in chars for c in query)
+
+
+class SearchIndex(object):
+    """Incremental substring and fuzzy filter over a list of names.
+
+    Names containing query as a substring come first, followed by names
+    containing query characters in the same order (e.g. `flsk` matches
+    `flask`). Order of the list is kept within both groups.
+
+    Index maps every character to positions of names containing it, so the
+    first keystroke only checks names containing all query characters. Every
+    next keystroke which extends the query filters the previous matches only
+    and removing characters reuses results computed before.
+    """
+
+    def __init__(self, names):
+        self.names = [normalize_name(name) for name in names]
+        self._chars = defaultdict(set)
+        for pos, name in enumerate(self.names):
+            for c in name:
+                self._chars[c].add(pos)
+        self._stack = [('', list(range(len(self.names))))]
+
+    def _candidates(self, query):
+        """Gets positions of names containing all characters of query.
+
+        :rtype: list
+        """
+        sets = sorted(
+            (self._chars.get(c, set()) for c in set(query)), key=len
+        )
+        positions = set(sets[0]).intersection(*sets[1:])
+        return sorted(positions)
+
+    def search(self, query):
+        """Gets positions of names matching query.
+
+        :param str query: Query (normalized the same way as names).
+        :return: List of matching positions - substring matches first.
+        :rtype: list
+        """
+        query = normalize_name(query)
+        while not query.startswith(self._stack[-1][0]):
+            self._stack.pop()
+        prev_query, prev_positions = self._stack[-1]
+        if query == prev_query:
+            return prev_positions
+        if not prev_query:
+            prev_positions = self._candidates(query)
+
+        substring, fuzzy = [], []
+        for pos in prev_positions:
+            name = self.names[pos]
+            if query in name:
+                substring.append(pos)
+            elif is_subsequence(query, name):
+                fuzzy.append(pos)
+        positions = substring + fuzzy
+        self._stack.append((query, positions))
+        return positions
@@ -1,20 +1,374 @@
 # -*- coding: utf-8 -*-
+import fnmatch
 import os
+import re
+import sys
+import threading
+import warnings
+
+try:
+    from sys import intern
+except ImportError:
+    pass  # Python 2 - intern is a builtin.
 
 try:
     from configparser import ConfigParser
+    from configparser import Error as ConfigError
 except ImportError:
     from ConfigParser import ConfigParser
+    from ConfigParser import Error as ConfigError
 
+DEFAULT_WORKERS = 8
+DEFAULT_VERSION_SOURCE = 'index'
+DEFAULT_CACHE_TTL = 3600
+DEFAULT_WORKER_TIMEOUT = 600
 
-def get_protected_dists():
-    """Gets list of protected distributions from config.ini file.
+CONFIG_FILE_NAME = 'config.ini'
+PROJECT_CONFIG_FILE_NAME = 'pip-manager.ini'
+CONFIG_ENV_VAR = 'PIP_MANAGER_CONFIG'
+FALSE_VALUES = ('0', 'false', 'no', 'off')
+
+
+def get_config_dir():
+    """Gets user config directory for pip-manager.
+
+    :return: Path to config directory (not necessarily existing).
+    :rtype: str
+    """
+    home = os.path.expanduser('~')
+    if sys.platform.startswith('win'):
+        return os.path.join(os.environ.get('APPDATA', home), 'pip-manager')
+    if sys.platform == 'darwin':
+        return os.path.join(
+            home, 'Library', 'Application Support', 'pip-manager'
+        )
+    return os.path.join(
+        os.environ.get('XDG_CONFIG_HOME', os.path.join(home, '.config')),
+        'pip-manager'
+    )
+
+
+def get_config_files():
+    """Gets paths of config files - every next one overrides the previous
+    ones.
 
-    :return: List with names of protected distributions.
+    These are: config.ini from pip-manager installation directory, config.ini
+    from user config directory, pip-manager.ini from current directory and
+    file pointed by PIP_MANAGER_CONFIG environment variable.
+
+    :return: List of paths (not necessarily existing).
     :rtype: list
     """
-    parser = ConfigParser()
-    parser.read(
-        os.path.join(os.path.abspath(os.path.dirname(__file__)), 'config.ini')
+    files = [
+        os.path.join(
+            os.path.abspath(os.path.dirname(__file__)), CONFIG_FILE_NAME
+        ),
+        os.path.join(get_config_dir(), CONFIG_FILE_NAME),
+        os.path.join(os.getcwd(), PROJECT_CONFIG_FILE_NAME),
+    ]
+    if os.environ.get(CONFIG_ENV_VAR):
+        files.append(os.environ[CONFIG_ENV_VAR])
+    return files
+
+
+class ProtectedMatcher(object):
+    """Tells whether distribution is protected.
+
+    Protected names may be glob patterns (e.g. `django-*`). All of them are
+    compiled into single regular expression.
+    """
+
+    def __init__(self, patterns):
+        self.patterns = sorted(set(normalize_name(p) for p in patterns))
+        self._regex = re.compile('|'.join(
+            fnmatch.translate(p) for p in self.patterns
+        )) if self.patterns else None
+
+    def __contains__(self, name):
+        return (
+            self._regex is not None and
+            self._regex.match(normalize_name(name)) is not None
+        )
+
+    def __iter__(self):
+        return iter(self.patterns)
+
+
+def _is_valid_config(path):
+    """Checks if config file can be parsed (warns about it if it cannot, so
+    it is skipped instead of breaking all settings).
+
+    :rtype: bool
+    """
+    try:
+        ConfigParser().read(path)
+    except (ConfigError, ValueError) as e:
+        warnings.warn('Skipping invalid config file {}: {}'.format(path, e))
+        return False
+    return True
+
+
+class _Config(object):
+    """Config files loaded once and reloaded only when some of them changes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._signature = None
+        self.parser = None
+        self.protected = None
+
+    @staticmethod
+    def _get_signature(files):
+        signature = []
+        for path in files:
+            try:
+                stat = os.stat(path)
+            except (OSError, IOError):
+                signature.append((path, None))
+            else:
+                signature.append((path, stat.st_mtime, stat.st_size))
+        return tuple(signature)
+
+    def load(self):
+        """Reloads config files if any of them has changed.
+
+        :rtype: _Config
+        """
+        files = get_config_files()
+        signature = self._get_signature(files)
+        with self._lock:
+            if signature != self._signature:
+                parser = ConfigParser()
+                for path in files:
+                    if _is_valid_config(path):
+                        parser.read(path)
+                protected = []
+                if parser.has_section('protected'):
+                    protected = [
+                        name for name, value in parser.items('protected')
+                        if value.strip().lower() not in FALSE_VALUES
+                    ]
+                self.parser = parser
+                self.protected = ProtectedMatcher(protected)
+                self._signature = signature
+        return self
+
+
+_config = _Config()
+
+
+def _read_config():
+    """Gets parser with all config files loaded.
+
+    :rtype: ConfigParser
+    """
+    return _config.load().parser
+
+
+def get_protected_dists():
+    """Gets protected distributions from [protected] section of config files.
+
+    Names may be glob patterns. Distribution protected by one file can be
+    unprotected by the next one with `name = false`.
+
+    :return: Matcher supporting `name in matcher` checks.
+    :rtype: ProtectedMatcher
+    """
+    return _config.load().protected
+
+
+def _get_int_setting(option, default, minimum):
+    parser = _read_config()
+    try:
+        return max(parser.getint('settings', option), minimum)
+    except (ConfigError, ValueError):
+        return default
+
+
+def get_workers_count():
+    """Gets number of workers used to check the newest versions concurrently.
+
+    Value is taken from `workers` option in [settings] section of config
+    files. Falls back to DEFAULT_WORKERS if it is missing or invalid.
+
+    :return: Number of workers (at least 1).
+    :rtype: int
+    """
+    return _get_int_setting('workers', DEFAULT_WORKERS, 1)
+
+
+def get_cache_ttl():
+    """Gets time (in seconds) for which cached versions are considered fresh.
+
+    Value is taken from `cache_ttl` option in [settings] section of config
+    files. Falls back to DEFAULT_CACHE_TTL if it is missing or invalid.
+
+    :return: Cache TTL in seconds (0 means always revalidate).
+    :rtype: int
+    """
+    return _get_int_setting('cache_ttl', DEFAULT_CACHE_TTL, 0)
+
+
+def get_cache_dir():
+    """Gets user cache directory for pip-manager.
+
+    :return: Path to cache directory (not necessarily existing).
+    :rtype: str
+    """
+    home = os.path.expanduser('~')
+    if sys.platform.startswith('win'):
+        return os.path.join(
+            os.environ.get('LOCALAPPDATA', home), 'pip-manager', 'Cache'
+        )
+    if sys.platform == 'darwin':
+        return os.path.join(home, 'Library', 'Caches', 'pip-manager')
+    return os.path.join(
+        os.environ.get('XDG_CACHE_HOME', os.path.join(home, '.cache')),
+        'pip-manager'
     )
-    return parser.options('protected')
+
+
+def get_version_source_name():
+    """Gets name of the source used to look up available versions.
+
+    Value is taken from `version_source` option in [settings] section of
+    config files - either `index` (query package index directly) or `pip`
+    (ask pip and parse its output).
+
+    :return: Version source name.
+    :rtype: str
+    """
+    parser = _read_config()
+    try:
+        return parser.get('settings', 'version_source').strip().lower()
+    except ConfigError:
+        return DEFAULT_VERSION_SOURCE
+
+
+def get_allow_prereleases():
+    """Checks if pre-releases should be offered as upgrades.
+
+    Value is taken from `pre` option in [settings] section of config files
+    (disabled if it is missing or invalid).
+
+    :rtype: bool
+    """
+    parser = _read_config()
+    try:
+        return parser.getboolean('settings', 'pre')
+    except (ConfigError, ValueError):
+        return False
+
+
+def get_use_pip_worker():
+    """Checks if pip commands should be run by long-lived pip workers.
+
+    Value is taken from `pip_worker` option in [settings] section of config
+    files (enabled if it is missing or invalid).
+
+    :rtype: bool
+    """
+    parser = _read_config()
+    try:
+        return parser.getboolean('settings', 'pip_worker')
+    except (ConfigError, ValueError):
+        return True
+
+
+def get_worker_timeout():
+    """Gets time (in seconds) pip worker may be silent before it is
+    considered hung.
+
+    Value is taken from `worker_timeout` option in [settings] section of
+    config files. Falls back to DEFAULT_WORKER_TIMEOUT if it is missing or
+    invalid.
+
+    :rtype: int
+    """
+    return _get_int_setting('worker_timeout', DEFAULT_WORKER_TIMEOUT, 1)
+
+
+def get_find_links():
+    """Gets local directories with distribution files to look up versions
+    in (and install upgrades from) instead of package indexes.
+
+    Value is taken from `find_links` option in [settings] section of config
+    files (paths separated by whitespace).
+
+    :return: List of directories (empty if not configured).
+    :rtype: list
+    """
+    parser = _read_config()
+    try:
+        return parser.get('settings', 'find_links').split()
+    except ConfigError:
+        return []
+
+
+def get_mirror():
+    """Gets local mirror of "simple" repository to look up versions in (and
+    install upgrades from) instead of package indexes.
+
+    Value is taken from `mirror` option in [settings] section of config
+    files.
+
+    :return: Path to mirror root directory or None if not configured.
+    :rtype: str or None
+    """
+    parser = _read_config()
+    try:
+        return parser.get('settings', 'mirror').strip() or None
+    except ConfigError:
+        return None
+
+
+def get_wheel_store_size():
+    """Gets size limit of the wheel store shared by all environments.
+
+    Value is taken from `wheel_store_size` option (in megabytes) in
+    [settings] section of config files. Store is disabled if it is 0,
+    missing or invalid.
+
+    :return: Size limit in bytes.
+    :rtype: int
+    """
+    return _get_int_setting('wheel_store_size', 0, 0) * 1024 * 1024
+
+
+def get_advisory_db():
+    """Gets local OSV database with known vulnerabilities.
+
+    Value is taken from `advisory_db` option in [settings] section of config
+    files.
+
+    :return: Path to database directory or None if not configured.
+    :rtype: str or None
+    """
+    parser = _read_config()
+    try:
+        return parser.get('settings', 'advisory_db').strip() or None
+    except ConfigError:
+        return None
+
+
+def intern_string(text):
+    """Interns string, so equal strings share memory.
+
+    Only native strings can be interned on Python 2 - unicode ones are
+    returned as they are.
+
+    :param str text: String.
+    :rtype: str
+    """
+    return intern(text) if isinstance(text, str) else text
+
+
+def normalize_name(name):
+    """Normalizes distribution name as described in PEP 503.
+
+    :param str name: Distribution name.
+    :return: Normalized name (e.g. `Zope.Interface` -> `zope-interface`).
+    :rtype: str
+    """
+    return re.sub(r'[-_.]+', '-', name).lower()
@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""PEP 440 version parsing and ordering.
+
+Parsed versions are memoized (keyed by interned version strings), because the
+same versions are compared over and over again - every project lists all its
+releases and many environments share the same installed versions.
+"""
+import re
+from collections import namedtuple
+
+from pip_manager.utils import intern_string
+
+# Regular expression from PEP 440 (Appendix B).
+VERSION_PATTERN = re.compile(r'''
+    ^\s*
+    v?
+    (?:
+        (?:(?P<epoch>[0-9]+)!)?
+        (?P<release>[0-9]+(?:\.[0-9]+)*)
+        (?P<pre>
+            [-_\.]?
+            (?P<pre_l>(a|b|c|rc|alpha|beta|pre|preview))
+            [-_\.]?
+            (?P<pre_n>[0-9]+)?
+        )?
+        (?P<post>
+            (?:-(?P<post_n1>[0-9]+))
+            |
+            (?:
+                [-_\.]?
+                (?P<post_l>post|rev|r)
+                [-_\.]?
+                (?P<post_n2>[0-9]+)?
+            )
+        )?
+        (?P<dev>
+            [-_\.]?
+            (?P<dev_l>dev)
+            [-_\.]?
+            (?P<dev_n>[0-9]+)?
+        )?
+    )
+    (?:\+(?P<local>[a-z0-9]+(?:[-_\.][a-z0-9]+)*))?
+    \s*$
+''', re.VERBOSE | re.IGNORECASE)
+
+PRE_RELEASE_RANKS = {
+    'a': 0, 'alpha': 0,
+    'b': 1, 'beta': 1,
+    'c': 2, 'rc': 2, 'pre': 2, 'preview': 2,
+}
+
+ParsedVersion = namedtuple('ParsedVersion', ['key', 'is_prerelease'])
+
+_parsed = {}
+
+
+def _local_key(local):
+    # Numeric segments sort above alphanumeric ones.
+    return tuple(
+        (1, int(part), '') if part.isdigit() else (0, 0, part)
+        for part in re.split(r'[-_\.]', local.lower())
+    )
+
+
+def _parse(version):
+    match = VERSION_PATTERN.match(version)
+    if match is None:
+        # Not a PEP 440 version - sorts below all valid versions.
+        return ParsedVersion((-1, version), False)
+
+    release = [int(p) for p in match.group('release').split('.')]
+    while len(release) > 1 and release[-1] == 0:
+        release.pop()
+
+    pre_l, dev_l = match.group('pre_l'), match.group('dev_l')
+    post_n = match.group('post_n1') or match.group('post_n2')
+    has_post = match.group('post') is not None
+    if pre_l is not None:
+        pre = (1, PRE_RELEASE_RANKS[pre_l.lower()], int(match.group('pre_n') or 0))  # noqa: E501 line too long
+    elif dev_l is not None and not has_post:
+        pre = (-1,)  # 1.0.dev0 < 1.0a0
+    else:
+        pre = (2,)
+    post = (0, int(post_n or 0)) if has_post else (-1,)
+    dev = (0, int(match.group('dev_n') or 0)) if dev_l is not None else (1,)
+    local = match.group('local')
+
+    key = (
+        int(match.group('epoch') or 0), tuple(release), pre, post, dev,
+        _local_key(local) if local else (),
+    )
+    return ParsedVersion(key, pre_l is not None or dev_l is not None)
+
+
+def parse_version(version):
+    """Parses version (results are memoized).
+
+    :param str version: Version string (e.g. `1.0.0`, `2.0rc1` or `1.0.post2`).
+    :return: Sort key and pre-release flag. Versions which are not valid
+        according to PEP 440 sort below all valid ones.
+    :rtype: ParsedVersion
+    """
+    try:
+        return _parsed[version]
+    except KeyError:
+        parsed = _parsed[intern_string(version)] = _parse(version)
+        return parsed
+
+
+def version_key(version):
+    """Gets sort key for given version.
+
+    :param str version: Version string.
+    :rtype: tuple
+    """
+    return parse_version(version).key
+
+
+def is_newer(version, other):
+    """Checks if version is newer than other (e.g. `1.0` is NOT newer than
+    `1.0.0` and `1.0.post1` is newer than `1.0`).
+
+    :rtype: bool
+    """
+    return version_key(version) > version_key(other)
+
+
+def get_newest(versions, prereleases=False):
+    """Gets newest version.
+
+    Pre-releases are taken into account only if asked for or if there are no
+    final releases at all.
+
+    :param list versions: Versions to choose from.
+    :param bool prereleases: Whether pre-releases are allowed.
+    :return: Newest version or None if versions are empty.
+    :rtype: str or None
+    """
+    newest = newest_final = None
+    for version in versions:
+        parsed = parse_version(version)
+        if newest is None or parsed.key > newest[0]:
+            newest = parsed.key, version
+        if not parsed.is_prerelease and (
+            newest_final is None or parsed.key > newest_final[0]
+        ):
+            newest_final = parsed.key, version
+    if newest_final is not None and not prereleases:
+        return newest_final[1]
+    return newest[1] if newest is not None else None
+
+
+SPECIFIER_PATTERN = re.compile(r'^\s*(~=|===|==|!=|<=|>=|<|>)\s*(\S+?)\s*$')
+
+
+def _release(version):
+    match = re.match(r'\s*v?(?:\d+!)?(\d+(?:\.\d+)*)', version)
+    return [int(p) for p in match.group(1).split('.')] if match else []
+
+
+def _padded(release, length):
+    return tuple(release[:length]) + (0,) * (length - len(release))
+
+
+def _matches_one(version, operator, spec):
+    if operator == '===':
+        return version == spec
+    parsed = parse_version(version)
+    if parsed.key[0] == -1:
+        return True  # Cannot tell - do not report false conflicts.
+    if spec.endswith('.*') and operator in ('==', '!='):
+        prefix = _release(spec[:-2])
+        equal = _padded(parsed.key[1], len(prefix)) == tuple(prefix)
+        return equal if operator == '==' else not equal
+    spec_parsed = parse_version(spec)
+    spec_key = spec_parsed.key
+    if spec_key[0] == -1:
+        return True
+    # Local version label is ignored unless specifier has one.
+    key = parsed.key if '+' in spec else parsed.key[:5]
+    spec_key = spec_key if '+' in spec else spec_key[:5]
+    if operator == '==':
+        return key == spec_key
+    if operator == '!=':
+        return key != spec_key
+    if operator == '<=':
+        return key <= spec_key
+    if operator == '>=':
+        return key >= spec_key
+    # Exclusive comparisons do not match pre-releases (<V) or post-releases
+    # (>V) of V itself, unless V is one.
+    if operator == '<':
+        return key < spec_key and not (
+            parsed.is_prerelease and not spec_parsed.is_prerelease and
+            key[:2] == spec_key[:2]
+        )
+    if operator == '>':
+        return key > spec_key and not (
+            key[3] != (-1,) and spec_key[3] == (-1,) and
+            key[:3] == spec_key[:3]
+        )
+    # ~= X.Y.Z means >= X.Y.Z, == X.Y.*
+    prefix = _release(spec)[:-1]
+    return key >= spec_key and (
+        _padded(parsed.key[1], len(prefix)) == tuple(prefix)
+    )
+
+
+def matches_specifier(version, specifier):
+    """Checks if version satisfies PEP 440 version specifier.
+
+    :param str version: Version (e.g. `1.4.2`).
+    :param str specifier: Comma separated version clauses (e.g.
+        `>=1.0,!=1.3.*,<2`). Empty specifier matches every version.
+    :return: False only if version surely does not satisfy the specifier.
+    :rtype: bool
+    """
+    for clause in specifier.split(','):
+        if not clause.strip():
+            continue
+        match = SPECIFIER_PATTERN.match(clause)
+        if match is not None and not _matches_one(version, *match.groups()):
+            return False
+    return True
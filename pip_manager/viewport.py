@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+from collections import Counter
+
+
+class Viewport(object):
+    """Scrollable window over a list of `total` rows.
+
+    Keeps absolute cursor position and index of the first visible row. All
+    operations are O(1) regardless of list length.
+    """
+
+    def __init__(self, total=0, height=1):
+        self.total = total
+        self.height = height
+        self.top = self.cursor = 0
+
+    @property
+    def bottom(self):
+        """Index one past the last visible row.
+
+        :rtype: int
+        """
+        return min(self.top + self.height, self.total)
+
+    @property
+    def cursor_row(self):
+        """Cursor position relative to the first visible row.
+
+        :rtype: int
+        """
+        return self.cursor - self.top
+
+    def resize(self, total=None, height=None):
+        """Changes list length and/or viewport height keeping cursor visible.
+        """
+        if total is not None:
+            self.total = total
+        if height is not None:
+            self.height = max(height, 1)
+        self.move_to(self.cursor)
+
+    def move_to(self, idx):
+        """Moves cursor to given row scrolling as little as possible."""
+        self.cursor = max(min(idx, self.total - 1), 0)
+        if self.cursor < self.top:
+            self.top = self.cursor
+        elif self.cursor >= self.top + self.height:
+            self.top = self.cursor - self.height + 1
+        self.top = max(min(self.top, self.total - self.height), 0)
+
+    def move(self, delta):
+        """Moves cursor by given number of rows."""
+        self.move_to(self.cursor + delta)
+
+    def page(self, delta):
+        """Scrolls by given number of pages keeping cursor on the same row of
+        the screen (as long as it is possible)."""
+        cursor_row = self.cursor_row
+        self.top = max(
+            min(self.top + delta * self.height, self.total - self.height), 0
+        )
+        self.move_to(self.top + cursor_row)
+
+
+class ColumnWidths(object):
+    """Widths of environment, name and version columns of the whole list.
+
+    Widths are kept up to date incrementally - adding, removing or changing
+    a row costs O(1) and reading a width costs O(number of distinct lengths),
+    never O(number of rows).
+    """
+
+    def __init__(self, distributions=()):
+        self._envs = Counter()
+        self._names = Counter()
+        self._versions = Counter()
+        for d in distributions:
+            self.add(d)
+
+    @property
+    def env(self):
+        return max(self._envs) if self._envs else 0
+
+    @property
+    def name(self):
+        return max(self._names) if self._names else 0
+
+    @property
+    def version(self):
+        return max(self._versions) if self._versions else 0
+
+    def add(self, d):
+        self._envs[len(d.env_label)] += 1
+        self._names[len(d.name)] += 1
+        self._versions[len(d.version)] += 1
+
+    def remove(self, d):
+        self._decrement(self._envs, len(d.env_label))
+        self._decrement(self._names, len(d.name))
+        self._decrement(self._versions, len(d.version))
+
+    def change_version(self, old_version, new_version):
+        self._decrement(self._versions, len(old_version))
+        self._versions[len(new_version)] += 1
+
+    @staticmethod
+    def _decrement(counter, key):
+        counter[key] -= 1
+        if counter[key] <= 0:
+            del counter[key]
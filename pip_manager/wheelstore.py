@@ -0,0 +1,432 @@
+# -*- coding: utf-8 -*-
+"""Content-addressed store of wheels shared by all environments.
+
+Wheels are kept under `<sha256[:2]>/<sha256>/<filename>` and listed in
+`index.html` with `#sha256=` fragments, so pip (pointed at it with
+`--find-links`) verifies every wheel it takes from the store. pip prefers
+files found by `--find-links` over the ones on package indexes with the same
+version, so a wheel downloaded or built once is not downloaded or built
+again, whichever environment it is installed in.
+
+Metadata (and hit/miss counters) is kept in SQLite database. The least
+recently used wheels are removed once the store outgrows its size limit.
+"""
+import hashlib
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from collections import namedtuple
+
+from pip_manager.commands import pip_install
+from pip_manager.commands import pip_wheel
+from pip_manager.utils import get_cache_dir
+from pip_manager.utils import normalize_name
+
+STORE_DIR_NAME = 'wheels'
+DB_FILE_NAME = 'store.sqlite3'
+INDEX_FILE_NAME = 'index.html'
+CHUNK_SIZE = 1024 * 1024
+
+StoredWheel = namedtuple('StoredWheel', ['sha256', 'filename', 'name', 'version', 'size', 'last_used'])  # noqa: E501 line too long
+
+StoreStats = namedtuple('StoreStats', ['wheels', 'size', 'max_size', 'hits', 'misses'])  # noqa: E501 line too long
+
+
+def hash_file(path):
+    """Computes SHA-256 of a file.
+
+    :param str path: File path.
+    :return: Hex digest.
+    :rtype: str
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def parse_wheel_filename(filename):
+    """Gets name, version and tags from wheel filename (PEP 427).
+
+    :param str filename: Wheel filename.
+    :return: Tuple of normalized name, version, python tag, ABI tag and
+        platform tag or None if it is not a wheel filename.
+    :rtype: tuple or None
+    """
+    if not filename.endswith('.whl'):
+        return None
+    parts = filename[:-len('.whl')].split('-')
+    if len(parts) not in (5, 6):
+        return None
+    return (normalize_name(parts[0]), parts[1]) + tuple(parts[-3:])
+
+
+def is_universal(filename):
+    """Checks if wheel can be installed with any interpreter on any platform.
+
+    :param str filename: Wheel filename.
+    :rtype: bool
+    """
+    parsed = parse_wheel_filename(filename)
+    return parsed is not None and parsed[3:] == ('none', 'any')
+
+
+class WheelStore(object):
+    """Content-addressed wheel store with LRU eviction.
+
+    Database is opened lazily on first use. Any database error disables the
+    store for the rest of the session instead of breaking upgrades.
+    """
+
+    def __init__(self, path=None, max_size=0):
+        """
+        :param str path: Store directory (`wheels` in cache directory by
+            default).
+        :param int max_size: Size limit in bytes.
+        """
+        self.path = path or os.path.join(get_cache_dir(), STORE_DIR_NAME)
+        self.max_size = max_size
+        self._db = None
+        self._disabled = False
+        self._lock = threading.Lock()
+
+    @property
+    def index_path(self):
+        return os.path.join(self.path, INDEX_FILE_NAME)
+
+    @property
+    def pip_args(self):
+        """Options making pip look for wheels in the store."""
+        return ['--find-links', self.index_path]
+
+    def get_wheel_path(self, wheel):
+        return os.path.join(
+            self.path, wheel.sha256[:2], wheel.sha256, wheel.filename
+        )
+
+    def _connect(self):
+        if self._db is None and not self._disabled:
+            try:
+                if not os.path.isdir(self.path):
+                    os.makedirs(self.path)
+                self._db = sqlite3.connect(
+                    os.path.join(self.path, DB_FILE_NAME),
+                    check_same_thread=False,
+                )
+                self._db.execute(
+                    'CREATE TABLE IF NOT EXISTS wheels ('
+                    'sha256 TEXT PRIMARY KEY, filename TEXT, name TEXT, '
+                    'version TEXT, size INTEGER, last_used REAL)'
+                )
+                self._db.execute(
+                    'CREATE TABLE IF NOT EXISTS stats ('
+                    'key TEXT PRIMARY KEY, value INTEGER)'
+                )
+            except (sqlite3.Error, OSError, IOError):
+                self._disable()
+        return self._db
+
+    def _disable(self):
+        self._disabled = True
+        if self._db is not None:
+            self._db.close()
+        self._db = None
+
+    def find(self, name, version):
+        """Gets stored wheels of given distribution version.
+
+        :param str name: Distribution name (not necessarily normalized).
+        :param str version: Version.
+        :rtype: list
+        """
+        with self._lock:
+            db = self._connect()
+            if db is None:
+                return []
+            try:
+                rows = db.execute(
+                    'SELECT * FROM wheels WHERE name = ? AND version = ?',
+                    (normalize_name(name), version)
+                ).fetchall()
+            except sqlite3.Error:
+                self._disable()
+                return []
+        return [StoredWheel(*row) for row in rows]
+
+    def touch(self, wheels, now=None):
+        """Marks wheels as used (so they are evicted last).
+
+        :param list wheels: Stored wheels.
+        :param float now: Current timestamp (defaults to `time.time()`).
+        """
+        with self._lock:
+            db = self._connect()
+            if db is None:
+                return
+            try:
+                with db:
+                    db.executemany(
+                        'UPDATE wheels SET last_used = ? WHERE sha256 = ?',
+                        [(now or time.time(), w.sha256) for w in wheels]
+                    )
+            except sqlite3.Error:
+                self._disable()
+
+    def add(self, path, now=None):
+        """Copies wheel into the store (unless it is already there).
+
+        :param str path: Path of a wheel file.
+        :param float now: Current timestamp (defaults to `time.time()`).
+        :return: Tuple of stored wheel (None if it could not be stored) and
+            a flag telling whether the very same file was stored already.
+        :rtype: tuple
+        """
+        filename = os.path.basename(path)
+        parsed = parse_wheel_filename(filename)
+        if parsed is None:
+            return None, False
+        sha256 = hash_file(path)
+        wheel = StoredWheel(
+            sha256, filename, parsed[0], parsed[1], os.path.getsize(path),
+            now or time.time(),
+        )
+        with self._lock:
+            db = self._connect()
+            if db is None:
+                return None, False
+            try:
+                row = db.execute(
+                    'SELECT 1 FROM wheels WHERE sha256 = ?', (sha256,)
+                ).fetchone()
+                if row is None or not os.path.isfile(self.get_wheel_path(wheel)):  # noqa: E501 line too long
+                    self._copy(path, self.get_wheel_path(wheel))
+                with db:
+                    db.execute(
+                        'INSERT OR REPLACE INTO wheels VALUES '
+                        '(?, ?, ?, ?, ?, ?)', wheel
+                    )
+            except (sqlite3.Error, OSError, IOError):
+                self._disable()
+                return None, False
+        return wheel, row is not None
+
+    @staticmethod
+    def _copy(source, target):
+        directory = os.path.dirname(target)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        # Copied under a temporary name, so pip never sees partial files.
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        os.close(fd)
+        shutil.copyfile(source, tmp_path)
+        os.rename(tmp_path, target)
+
+    def evict(self, keep=()):
+        """Removes the least recently used wheels until the store fits its
+        size limit.
+
+        :param list keep: Stored wheels which must not be removed (e.g. the
+            ones about to be installed).
+        :return: List of removed wheels.
+        :rtype: list
+        """
+        keep = set(w.sha256 for w in keep)
+        removed = []
+        with self._lock:
+            db = self._connect()
+            if db is None:
+                return removed
+            try:
+                rows = [
+                    StoredWheel(*row) for row in db.execute(
+                        'SELECT * FROM wheels ORDER BY last_used DESC'
+                    )
+                ]
+                size = sum(w.size for w in rows if w.sha256 in keep)
+                for wheel in rows:
+                    if wheel.sha256 in keep:
+                        continue
+                    size += wheel.size
+                    if size > self.max_size:
+                        removed.append(wheel)
+                with db:
+                    db.executemany(
+                        'DELETE FROM wheels WHERE sha256 = ?',
+                        [(w.sha256,) for w in removed]
+                    )
+            except sqlite3.Error:
+                self._disable()
+                return []
+        for wheel in removed:
+            shutil.rmtree(
+                os.path.dirname(self.get_wheel_path(wheel)),
+                ignore_errors=True,
+            )
+        return removed
+
+    def write_index(self):
+        """Writes page listing stored wheels (with their hashes) for pip."""
+        with self._lock:
+            db = self._connect()
+            if db is None:
+                return
+            try:
+                rows = db.execute(
+                    'SELECT * FROM wheels ORDER BY name, version'
+                ).fetchall()
+            except sqlite3.Error:
+                self._disable()
+                return
+        links = ''.join(
+            '<a href="{0}/{1}/{2}#sha256={1}">{2}</a><br/>\n'.format(
+                w.sha256[:2], w.sha256, w.filename
+            )
+            for w in (StoredWheel(*row) for row in rows)
+        )
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                f.write('<html><body>\n{}</body></html>\n'.format(links))
+            if sys.platform.startswith('win') and os.path.exists(self.index_path):  # noqa: E501 line too long
+                os.remove(self.index_path)
+            os.rename(tmp_path, self.index_path)
+        except (OSError, IOError):
+            pass  # pip only misses stored wheels.
+
+    def record(self, hits=0, misses=0):
+        """Adds to hit/miss counters.
+
+        :param int hits: Wheels found in the store.
+        :param int misses: Wheels which had to be downloaded or built.
+        """
+        with self._lock:
+            db = self._connect()
+            if db is None:
+                return
+            try:
+                with db:
+                    for key, value in (('hits', hits), ('misses', misses)):
+                        db.execute(
+                            'INSERT OR IGNORE INTO stats VALUES (?, 0)',
+                            (key,)
+                        )
+                        db.execute(
+                            'UPDATE stats SET value = value + ? '
+                            'WHERE key = ?', (value, key)
+                        )
+            except sqlite3.Error:
+                self._disable()
+
+    def get_stats(self):
+        """Gets number and total size of stored wheels and hit/miss counters
+        (since the store was created).
+
+        :rtype: StoreStats
+        """
+        with self._lock:
+            db = self._connect()
+            if db is None:
+                return StoreStats(0, 0, self.max_size, 0, 0)
+            try:
+                wheels, size = db.execute(
+                    'SELECT COUNT(*), TOTAL(size) FROM wheels'
+                ).fetchone()
+                stats = dict(db.execute('SELECT * FROM stats').fetchall())
+            except sqlite3.Error:
+                self._disable()
+                return StoreStats(0, 0, self.max_size, 0, 0)
+        return StoreStats(
+            wheels, int(size), self.max_size,
+            stats.get('hits', 0), stats.get('misses', 0),
+        )
+
+    def close(self):
+        """Closes database connection."""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+def format_stats(stats):
+    """Formats store statistics as one line.
+
+    :param StoreStats stats: Statistics.
+    :rtype: str
+    """
+    lookups = stats.hits + stats.misses
+    return (
+        'Wheel store: {} wheels, {:.1f} of {:.0f} MB, {} hits, {} misses '
+        '({:.0%} hit rate)'.format(
+            stats.wheels, stats.size / 1024.0 / 1024, stats.max_size / 1024.0 / 1024,  # noqa: E501 line too long
+            stats.hits, stats.misses,
+            float(stats.hits) / lookups if lookups else 0.0,
+        )
+    )
+
+
+def install_with_store(store, distributions, python=sys.executable,
+                       pip_version=None, on_line=None, extra_args=()):
+    """Upgrades distributions to their newest versions using wheel store.
+
+    Newest versions which are not in the store as universal wheels are
+    fetched with `pip wheel` first (pip takes compatible wheels from the
+    store if there are any, otherwise downloads or builds them) and the
+    resulting wheels are added to the store. Then distributions are upgraded
+    as usual, except that pip finds the stored wheels first.
+
+    :param WheelStore store: Wheel store.
+    :param list distributions: Distributions to upgrade (with newest versions
+        resolved).
+    :param str python: Interpreter to run pip with.
+    :param str pip_version: Version of pip installed for `python`.
+    :param on_line: Optional callable called with every line of pip output.
+    :param list extra_args: Additional pip options.
+    :rtype: InstallResult
+    """
+    on_line = on_line or (lambda line: None)
+    hits, misses, used, requirements = 0, 0, [], []
+    for d in distributions:
+        stored = [
+            w for w in store.find(d.name, d.newest_version)
+            if is_universal(w.filename)
+        ]
+        if stored:
+            hits += 1
+            used.extend(stored)
+        else:
+            requirements.append('{}=={}'.format(d.name, d.newest_version))
+    if requirements:
+        if not os.path.isfile(store.index_path):
+            store.write_index()  # pip warns about missing --find-links.
+        wheel_dir = tempfile.mkdtemp(prefix='pip-manager-')
+        try:
+            pip_wheel(
+                requirements, wheel_dir, python=python, on_line=on_line,
+                extra_args=list(extra_args) + store.pip_args,
+            )
+            for filename in sorted(os.listdir(wheel_dir)):
+                wheel, was_stored = store.add(os.path.join(wheel_dir, filename))  # noqa: E501 line too long
+                if wheel is not None:
+                    used.append(wheel)
+                    hits += was_stored
+                    misses += not was_stored
+        finally:
+            shutil.rmtree(wheel_dir, ignore_errors=True)
+    # Wheels about to be installed are marked as used first, so they are
+    # never the ones evicted.
+    store.touch(used)
+    store.evict(keep=used)
+    store.write_index()
+    store.record(hits, misses)
+    on_line('Wheel store: {} hits, {} misses'.format(hits, misses))
+    return pip_install(
+        [d.name for d in distributions], python=python,
+        pip_version=pip_version, on_line=on_line,
+        extra_args=list(extra_args) + store.pip_args,
+    )
@@ -0,0 +1,332 @@
+# -*- coding: utf-8 -*-
+"""Long-lived pip processes.
+
+Starting an interpreter and importing pip takes a good part of a second, so
+instead of running `python -m pip ...` for every command, pip commands are
+sent to worker processes (one or more per interpreter) which import pip once
+and run it in-process.
+
+Worker talks over its stdin and stdout using frames - length of JSON payload
+in ASCII digits, newline, payload. Requests are `{"args": [...]}`, responses
+are any number of `{"line": ...}` (pip output as it is printed) followed by
+`{"returncode": ...}`. Worker announces itself with `{"ready": ...}`.
+"""
+import atexit
+import json
+import os
+import subprocess
+import threading
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+from pip_manager.utils import get_use_pip_worker
+from pip_manager.utils import get_worker_timeout
+
+WORKER = r'''
+import json, os, sys
+requests = os.fdopen(os.dup(0), 'rb')
+frames = os.fdopen(os.dup(1), 'wb')
+# Nothing pip (or processes it runs) prints may get between frames.
+devnull = os.open(os.devnull, os.O_RDWR)
+os.dup2(devnull, 0)
+os.dup2(devnull, 1)
+
+
+def send(message):
+    data = json.dumps(message).encode('utf-8')
+    frames.write(str(len(data)).encode('ascii') + b'\n' + data)
+    frames.flush()
+
+
+def receive():
+    header = requests.readline()
+    if not header:
+        return None
+    return json.loads(requests.read(int(header)).decode('utf-8'))
+
+
+class Lines(object):
+    encoding = 'utf-8'
+
+    def __init__(self):
+        self.buffer = ''
+
+    def write(self, text):
+        if isinstance(text, bytes):
+            text = text.decode('utf-8', 'replace')
+        self.buffer += text
+        while '\n' in self.buffer:
+            line, self.buffer = self.buffer.split('\n', 1)
+            send({'line': line.rstrip('\r')})
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def isatty(self):
+        return False
+
+
+try:
+    from pip._internal.cli.main import main
+except ImportError:
+    try:
+        from pip._internal import main
+    except ImportError:
+        from pip import main
+import pip
+send({'ready': pip.__version__})
+while True:
+    request = receive()
+    if request is None:
+        break
+    out = Lines()
+    sys.stdout = sys.stderr = out
+    try:
+        returncode = main(request['args'])
+    except SystemExit as e:
+        returncode = e.code if isinstance(e.code, int) else int(bool(e.code))
+    except Exception as e:
+        out.write('{}: {}\n'.format(type(e).__name__, e))
+        returncode = 1
+    finally:
+        sys.stdout, sys.stderr = sys.__stdout__, sys.__stderr__
+    if out.buffer:
+        send({'line': out.buffer})
+    send({'returncode': returncode or 0})
+'''
+
+
+class WorkerError(Exception):
+    pass
+
+
+def write_frame(stream, message):
+    """Writes JSON message as one frame.
+
+    :param stream: Binary stream.
+    :param dict message: Message.
+    """
+    data = json.dumps(message).encode('utf-8')
+    stream.write(str(len(data)).encode('ascii') + b'\n' + data)
+    stream.flush()
+
+
+def read_frame(stream):
+    """Reads one frame.
+
+    :param stream: Binary stream.
+    :return: Message or None if stream has ended.
+    :rtype: dict or None
+    :raises ValueError: If frame is malformed.
+    """
+    header = stream.readline()
+    if not header:
+        return None
+    size = int(header)
+    data = stream.read(size)
+    if len(data) != size:
+        return None
+    return json.loads(data.decode('utf-8'))
+
+
+class PipWorker(object):
+    """Interpreter running pip commands it is sent one at a time."""
+
+    def __init__(self, python):
+        self.python = python
+        try:
+            with open(os.devnull, 'wb') as devnull:
+                self.process = subprocess.Popen(
+                    [python, '-c', WORKER], stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE, stderr=devnull,
+                )
+        except OSError as e:
+            raise WorkerError('Cannot start pip worker: {}'.format(e))
+        self.pip_version = None
+        self._frames = queue.Queue()
+        reader = threading.Thread(target=self._read)
+        reader.daemon = True
+        reader.start()
+
+    @property
+    def is_alive(self):
+        return self.process.poll() is None
+
+    def _read(self):
+        try:
+            frame = read_frame(self.process.stdout)
+            while frame is not None:
+                self._frames.put(frame)
+                frame = read_frame(self.process.stdout)
+        except (ValueError, IOError, OSError):
+            pass
+        self._frames.put(None)
+
+    def _get_frame(self, timeout):
+        try:
+            frame = self._frames.get(timeout=timeout)
+        except queue.Empty:
+            self.close()
+            raise WorkerError('pip worker timed out')
+        if frame is None:
+            self.close()
+            raise WorkerError('pip worker exited')
+        return frame
+
+    def run(self, args, on_line=None, timeout=None):
+        """Runs pip command.
+
+        :param list args: pip arguments (e.g. `['install', 'flask']`).
+        :param on_line: Optional callable called with every output line as
+            soon as it is printed.
+        :param float timeout: Seconds to wait for the worker to start and
+            then for every output line.
+        :return: Tuple of return code and output. If worker crashes or times
+            out while running the command, return code is 1 (and the worker
+            is stopped).
+        :rtype: tuple
+        :raises WorkerError: If the command could not be sent (worker is
+            stopped, the command has not been run).
+        """
+        if self.pip_version is None:
+            frame = self._get_frame(timeout)
+            if 'ready' not in frame:
+                self.close()
+                raise WorkerError('pip worker did not start')
+            self.pip_version = frame['ready']
+        try:
+            write_frame(self.process.stdin, {'args': list(args)})
+        except (IOError, OSError, ValueError):
+            self.close()
+            raise WorkerError('pip worker exited')
+
+        lines = []
+        while True:
+            try:
+                frame = self._get_frame(timeout)
+            except WorkerError as e:
+                line = 'ERROR: {}'.format(e)
+                if on_line is not None:
+                    on_line(line)
+                return 1, ''.join(lines) + line + '\n'
+            if 'returncode' in frame:
+                return frame['returncode'], ''.join(lines)
+            lines.append(frame['line'] + '\n')
+            if on_line is not None:
+                on_line(frame['line'])
+
+    def close(self):
+        """Stops the worker."""
+        if self.is_alive:
+            try:
+                self.process.kill()
+            except OSError:
+                pass
+        self.process.wait()
+        # Reader thread gets EOF once the worker is gone.
+        for stream in (self.process.stdin, self.process.stdout):
+            try:
+                stream.close()
+            except (IOError, OSError):
+                pass
+
+
+class WorkerPool(object):
+    """Idle pip workers kept per interpreter.
+
+    Workers are started on demand (so concurrent commands get their own
+    workers) and kept for the next commands. Worker which has changed
+    installed distributions is replaced by a fresh one (started right away),
+    as pip it has imported may be stale.
+    """
+
+    def __init__(self, timeout=None):
+        self.timeout = get_worker_timeout() if timeout is None else timeout
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def _checkout(self, python):
+        with self._lock:
+            idle = self._idle.get(python)
+            if idle:
+                return idle.pop()
+        return PipWorker(python)
+
+    def _checkin(self, worker):
+        with self._lock:
+            self._idle.setdefault(worker.python, []).append(worker)
+
+    def prewarm(self, python):
+        """Starts worker for given interpreter unless there is an idle one.
+
+        :param str python: Interpreter.
+        """
+        with self._lock:
+            if self._idle.get(python):
+                return
+        try:
+            self._checkin(PipWorker(python))
+        except WorkerError:
+            pass
+
+    def run(self, python, args, on_line=None, retire=False):
+        """Runs pip command in a worker of given interpreter.
+
+        Worker which has exited before it got the command is restarted
+        once.
+
+        :param str python: Interpreter.
+        :param list args: pip arguments.
+        :param on_line: Optional callable called with every output line.
+        :param bool retire: Whether the command may change installed
+            distributions (worker is replaced afterwards).
+        :return: Tuple of return code and output or None if no worker could
+            run the command.
+        :rtype: tuple or None
+        """
+        for _ in range(2):
+            try:
+                worker = self._checkout(python)
+                result = worker.run(args, on_line, self.timeout)
+            except WorkerError:
+                continue
+            if retire or not worker.is_alive:
+                worker.close()
+                if retire:
+                    self.prewarm(python)
+            else:
+                self._checkin(worker)
+            return result
+        return None
+
+    def close(self):
+        """Stops all idle workers."""
+        with self._lock:
+            workers = [w for idle in self._idle.values() for w in idle]
+            self._idle = {}
+        for worker in workers:
+            worker.close()
+
+
+_worker_pool = None
+_worker_pool_lock = threading.Lock()
+
+
+def get_worker_pool():
+    """Gets worker pool shared by the whole session.
+
+    :return: Worker pool or None if pip workers are disabled in config.
+    :rtype: WorkerPool or None
+    """
+    global _worker_pool
+    if not get_use_pip_worker():
+        return None
+    with _worker_pool_lock:
+        if _worker_pool is None:
+            _worker_pool = WorkerPool()
+            atexit.register(_worker_pool.close)
+        return _worker_pool
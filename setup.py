@@ -47,7 +47,10 @@ setup(
     packages=find_packages(),
     include_package_data=True,
     package_data={'': ['config.ini']},
-    install_requires=['pip'],
+    install_requires=[
+        'pip',
+        'importlib_metadata; python_version < "3.8"',
+    ],
     entry_points={
         'console_scripts': [
             'pip-manager=pip_manager.run:main',
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+import json
+
+import pytest
+
+from pip_manager.advisories import EXACT
+from pip_manager.advisories import FIXED
+from pip_manager.advisories import LAST_AFFECTED
+from pip_manager.advisories import AdvisoryIndex
+from pip_manager.advisories import InvalidAdvisoryDatabase
+from pip_manager.advisories import build_index
+from pip_manager.advisories import get_intervals
+from pip_manager.advisories import load_advisories
+
+ADVISORIES = [
+    {
+        'id': 'PYSEC-2023-62',
+        'affected': [{
+            'package': {'ecosystem': 'PyPI', 'name': 'Flask'},
+            'ranges': [{'type': 'ECOSYSTEM', 'events': [
+                {'introduced': '0'}, {'fixed': '2.2.5'},
+                {'introduced': '2.3.0'}, {'fixed': '2.3.2'},
+            ]}],
+            'versions': ['2.2.4', '2.3.0', '2.3.1'],
+        }],
+    },
+    {
+        'id': 'GHSA-aaaa-bbbb-cccc',
+        'affected': [
+            {
+                'package': {'ecosystem': 'PyPI', 'name': 'zope.interface'},
+                'ranges': [{'type': 'ECOSYSTEM', 'events': [{'introduced': '5.0'}, {'last_affected': '5.1'}]}],
+            },
+            {
+                'package': {'ecosystem': 'npm', 'name': 'flask'},
+                'ranges': [{'type': 'SEMVER', 'events': [{'introduced': '0'}]}],
+            },
+        ],
+    },
+    {
+        'id': 'PYSEC-2020-1',
+        'affected': [{
+            'package': {'ecosystem': 'PyPI', 'name': 'flask'},
+            'ranges': [{'type': 'GIT', 'repo': 'https://github.com/pallets/flask', 'events': [{'introduced': 'abc'}]}],
+            'versions': ['0.12', '0.12.1'],
+        }],
+    },
+    {
+        'id': 'PYSEC-2021-9',
+        'affected': [{
+            'package': {'ecosystem': 'PyPI', 'name': 'pytest'},
+            'ranges': [{'type': 'ECOSYSTEM', 'events': [{'introduced': '7.0'}]}],
+        }],
+    },
+    {
+        'id': 'PYSEC-2021-10',
+        'withdrawn': '2021-06-01T00:00:00Z',
+        'affected': [{
+            'package': {'ecosystem': 'PyPI', 'name': 'pip'},
+            'ranges': [{'type': 'ECOSYSTEM', 'events': [{'introduced': '0'}]}],
+        }],
+    },
+]
+
+
+@pytest.fixture
+def db_dir(tmpdir):
+    db_dir = tmpdir.mkdir('osv')
+    for advisory in ADVISORIES:
+        db_dir.join('{}.json'.format(advisory['id'])).write(json.dumps(advisory))
+    db_dir.join('README.txt').write('not an advisory')
+    db_dir.mkdir('broken').join('broken.json').write('{')
+    return db_dir
+
+
+@pytest.fixture
+def index(db_dir, tmpdir):
+    path = str(tmpdir.join('cache', 'advisories.idx'))
+    build_index(str(db_dir), path)
+    index = AdvisoryIndex(path)
+    yield index
+    index.close()
+
+
+def test_get_intervals():
+    assert get_intervals(ADVISORIES[0]) == [
+        ('flask', '', '2.2.5', FIXED, 'PYSEC-2023-62'),
+        ('flask', '2.3.0', '2.3.2', FIXED, 'PYSEC-2023-62'),
+    ]
+    assert get_intervals(ADVISORIES[1]) == [('zope-interface', '5.0', '5.1', LAST_AFFECTED, 'GHSA-aaaa-bbbb-cccc')]
+    assert get_intervals(ADVISORIES[2]) == [
+        ('flask', '0.12', '0.12', EXACT, 'PYSEC-2020-1'),
+        ('flask', '0.12.1', '0.12.1', EXACT, 'PYSEC-2020-1'),
+    ]
+    assert get_intervals(ADVISORIES[3]) == [('pytest', '7.0', '', FIXED, 'PYSEC-2021-9')]
+    assert get_intervals(ADVISORIES[4]) == []
+
+
+@pytest.mark.parametrize('name, version, expected', [
+    ('Flask', '0.12.0', ['PYSEC-2020-1', 'PYSEC-2023-62']),
+    ('flask', '2.2.4', ['PYSEC-2023-62']),
+    ('flask', '2.2.5', []),
+    ('flask', '2.3', ['PYSEC-2023-62']),
+    ('flask', '2.3.2', []),
+    ('zope_interface', '5.0.0', ['GHSA-aaaa-bbbb-cccc']),
+    ('zope.interface', '5.1', ['GHSA-aaaa-bbbb-cccc']),
+    ('zope.interface', '5.1.1', []),
+    ('pytest', '6.2', []),
+    ('pytest', '8.0.0', ['PYSEC-2021-9']),
+    ('pip', '9.0.3', []),
+    ('aaa', '1.0', []),
+    ('zzz', '1.0', []),
+])
+def test_get_advisories(name, version, expected, index):
+    assert index.get_advisories(name, version) == expected
+
+
+def test_load_advisories_rebuilds_stale_index(db_dir, tmpdir, mocker):
+    path = str(tmpdir.join('advisories.idx'))
+    spy = mocker.patch('pip_manager.advisories.build_index', wraps=build_index)
+
+    load_advisories(str(db_dir), path).close()
+    load_advisories(str(db_dir), path).close()
+    assert spy.call_count == 1
+
+    db_dir.join('PYSEC-2024-1.json').write(json.dumps({
+        'id': 'PYSEC-2024-1',
+        'affected': [{'package': {'ecosystem': 'PyPI', 'name': 'pip'}, 'versions': ['9.0.3']}],
+    }))
+    index = load_advisories(str(db_dir), path)
+
+    assert spy.call_count == 2
+    assert index.get_advisories('pip', '9.0.3') == ['PYSEC-2024-1']
+    index.close()
+
+
+def test_load_advisories_corrupted_index(db_dir, tmpdir):
+    path = tmpdir.join('advisories.idx')
+    path.write('garbage')
+
+    index = load_advisories(str(db_dir), str(path))
+
+    assert index.get_advisories('pytest', '7.0') == ['PYSEC-2021-9']
+    index.close()
+
+
+def test_load_advisories_missing_db(tmpdir):
+    with pytest.raises(InvalidAdvisoryDatabase) as e:
+        load_advisories(str(tmpdir.join('missing')), str(tmpdir.join('advisories.idx')))
+
+    assert str(e.value).startswith('Advisory database not found: ')
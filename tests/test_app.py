@@ -1,63 +1,246 @@
 # -*- coding: utf-8 -*-
+import curses
+import os
 import sys
+import threading
+import time
 from collections import namedtuple
 import pytest
 
+from pip_manager import distribution
+from pip_manager import index
 from pip_manager.app import PipManager
+from pip_manager.commands import InstallResult
+from pip_manager.commands import UninstallResult
+from pip_manager.depgraph import DependencyGraph
+from pip_manager.depgraph import Requirement
+from pip_manager.discovery import InstalledDistribution
+from pip_manager.environment import Environment
+from pip_manager.jobs import Job
+from pip_manager.lockfile import InvalidLockfile
+from pip_manager.lockfile import LockedDistribution
+from pip_manager.utils import ProtectedMatcher
+
+
+@pytest.fixture(autouse=True)
+def no_worker_pool(mocker):
+    return mocker.patch('pip_manager.app.get_worker_pool', return_value=None)
 
 
 def test_init(mocker):
     mocked_Gui = mocker.patch('pip_manager.app.Gui')
+    mocked_get_version_source = mocker.patch('pip_manager.app.get_version_source')
     mocker.patch('pip_manager.app.PipManager.get_distributions')
 
     pm = PipManager()
 
-    assert pm.page == 0
-    assert pm.cursor_pos == 0
+    assert pm.viewport.top == 0
+    assert pm.viewport.cursor == 0
     mocked_Gui.assert_called_with(line_width=79)
     assert pm.get_distributions.called
+    assert mocked_get_version_source.return_value.refresh is False
+
+
+@pytest.mark.parametrize('pre, setting, expected', [
+    (False, False, False),
+    (True, False, True),
+    (False, True, True),
+])
+def test_init_pre(pre, setting, expected, mocker):
+    mocker.patch('pip_manager.app.Gui')
+    mocker.patch('pip_manager.app.get_version_source')
+    mocker.patch('pip_manager.app.get_allow_prereleases').return_value = setting
+    mocker.patch('pip_manager.app.PipManager.get_distributions')
+    mocker.patch.object(distribution.Distribution, 'allow_prereleases', False)
+
+    PipManager(pre=pre)
+
+    assert distribution.Distribution.allow_prereleases is expected
+
+
+def test_init_refresh(mocker):
+    mocker.patch('pip_manager.app.Gui')
+    mocked_get_version_source = mocker.patch('pip_manager.app.get_version_source')
+    mocker.patch('pip_manager.app.PipManager.get_distributions')
+
+    PipManager(refresh=True)
+
+    assert mocked_get_version_source.return_value.refresh is True
+
+
+def test_init_find_links(mocker):
+    mocker.patch('pip_manager.app.Gui')
+    mocker.patch('pip_manager.app.PipManager.get_distributions')
+    mocker.patch('pip_manager.index._version_source', None)
+
+    pm = PipManager(find_links=['/wheels'])
+
+    source = index.get_version_source()
+    assert isinstance(source, index.LocalSource)
+    assert source.find_links == ['/wheels']
+    assert pm.pip_args == ['--no-index', '--find-links', '/wheels']
 
 
 @pytest.fixture
 def pm(mocker):
     mocker.patch('pip_manager.app.Gui')
+    mocker.patch('pip_manager.app.get_version_source')
     mocker.patch('pip_manager.app.Distribution.get_newest_version').return_value = '9.99.999'
-    mocked_pkg_resources = mocker.patch('pip_manager.app.pkg_resources')
-    DummyWorkingSetDist = namedtuple('DummyWorkingSetDist', ['key', 'version'])
-    mocked_working_set = mocker.PropertyMock(return_value=[
-        DummyWorkingSetDist(key='pip', version='9.0.3'),
-        DummyWorkingSetDist(key='flask', version='1.0.0'),
-        DummyWorkingSetDist(key='pytest', version='3.5.0'),
+    mocker.patch('pip_manager.app.iter_installed').side_effect = lambda paths=None: iter([
+        InstalledDistribution(name='pip', version='9.0.3', path=''),
+        InstalledDistribution(name='flask', version='1.0.0', path=''),
+        InstalledDistribution(name='pytest', version='3.5.0', path=''),
     ])
-    type(mocked_pkg_resources).working_set = mocked_working_set
-    return PipManager()
+    pm = PipManager()
+    list(pm.resolver.iter_resolved())
+    return pm
 
 
 Distribution = namedtuple('Distribution', ['name', 'version'])
+Installed = namedtuple('Installed', ['name', 'path'])
 
 
-@pytest.mark.parametrize('page, win_height, expected', [
-    (0, 0, []),
+@pytest.mark.parametrize('cursor, win_height, expected', [
     (0, 1, [Distribution(name='flask', version='1.0.0')]),
     (1, 1, [Distribution(name='pip', version='9.0.3')]),
     (2, 1, [Distribution(name='pytest', version='3.5.0')]),
     (0, 2, [Distribution(name='flask', version='1.0.0'), Distribution(name='pip', version='9.0.3')]),
-    (1, 2, [Distribution(name='pytest', version='3.5.0')]),
+    (2, 2, [Distribution(name='pip', version='9.0.3'), Distribution(name='pytest', version='3.5.0')]),
     (0, 3, [Distribution(name='flask', version='1.0.0'), Distribution(name='pip', version='9.0.3'), Distribution(name='pytest', version='3.5.0')]),
+    (2, 5, [Distribution(name='flask', version='1.0.0'), Distribution(name='pip', version='9.0.3'), Distribution(name='pytest', version='3.5.0')]),
 ])
-def test_dists_to_draw(page, win_height, expected, pm):
-    pm.page = page
-    pm.gui.dist_win_height = win_height
+def test_dists_to_draw(cursor, win_height, expected, pm):
+    pm.viewport.resize(height=win_height)
+    pm.viewport.move_to(cursor)
     assert pm.dists_to_draw == expected
 
 
+@pytest.mark.parametrize('name, expected', [
+    ('Flask', Distribution(name='flask', version='1.0.0')),
+    ('pytest', Distribution(name='pytest', version='3.5.0')),
+    ('django', None),
+])
+def test_get_distribution(name, expected, pm):
+    assert pm.get_distribution(name) == expected
+
+
+def test_widths(pm):
+    assert (pm.widths.name, pm.widths.version) == (6, 5)
+
+
 def test_get_distributions(pm):
     assert pm.get_distributions() == [
         Distribution(name='flask', version='1.0.0'),
         Distribution(name='pip', version='9.0.3'),
         Distribution(name='pytest', version='3.5.0'),
     ]
-    assert pm.gui.draw_popup.called
+    assert all(not d.is_resolved for d in pm.get_distributions())
+
+
+def test_init_headless(mocker):
+    mocked_Gui = mocker.patch('pip_manager.app.Gui')
+    mocker.patch('pip_manager.app.get_version_source')
+    mocker.patch('pip_manager.app.PipManager.get_distributions')
+
+    pm = PipManager(headless=True)
+
+    assert pm.gui is None
+    assert not mocked_Gui.called
+
+
+def test_init_starts_resolver(mocker):
+    mocker.patch('pip_manager.app.Gui')
+    mocker.patch('pip_manager.app.get_version_source')
+    mocker.patch('pip_manager.app.get_workers_count').return_value = 2
+    mocked_Resolver = mocker.patch('pip_manager.app.Resolver')
+    mocker.patch('pip_manager.app.PipManager.get_distributions')
+
+    pm = PipManager()
+
+    mocked_Resolver.assert_called_with(pm.distributions, 2)
+
+
+def test_prioritize_visible(mocker, pm):
+    pm.resolver = mocker.Mock()
+    pm.viewport.resize(height=1)
+    pm.viewport.move_to(1)
+
+    pm._prioritize_visible()
+
+    pm.resolver.prioritize.assert_called_with([
+        Distribution(name='pip', version='9.0.3'),
+        Distribution(name='pytest', version='3.5.0'),
+    ])
+
+
+def test_get_key_redraws_on_resolved(mocker, pm):
+    pm.resolver = mocker.Mock(is_finished=False)
+    pm.resolver.drain.side_effect = [[], [mocker.sentinel.dist]]
+    pm.gui.dist_win.getch.return_value = -1
+
+    assert pm._get_key() is None
+    pm.gui.dist_win.timeout.assert_called_with(100)
+
+
+def test_get_key_blocks_when_finished(mocker, pm):
+    pm.gui.dist_win.getch.return_value = ord('q')
+
+    assert pm._get_key() == ord('q')
+    pm.gui.dist_win.timeout.assert_called_with(-1)
+
+
+def test_get_key_redraws_while_jobs_run(mocker, pm):
+    pm.jobs = mocker.Mock(is_busy=True)
+    pm.jobs.drain.return_value = []
+    pm.gui.dist_win.getch.return_value = -1
+
+    assert pm._get_key() is None
+    pm.gui.dist_win.timeout.assert_called_with(100)
+
+
+def test_get_jobs_lines(mocker, pm):
+    release = threading.Event()
+
+    def pip_install(names, python, on_line):
+        on_line('Collecting flask\n')
+        release.wait()
+        return InstallResult(1, {}, '')
+
+    mocker.patch('pip_manager.app.pip_install', side_effect=pip_install)
+    mocker.patch('pip_manager.jobs.get_cache_dir').return_value = os.devnull
+    pm.gui.stdscr.getch.return_value = ord('y')
+    pm.distributions[0].is_selected = True
+    pm.update_distributions()
+    while not pm.jobs.jobs[0].log:
+        time.sleep(0.01)
+
+    lines = pm._get_jobs_lines()
+
+    assert [attr for _, attr in lines] == [curses.A_NORMAL, curses.A_DIM]
+    assert lines[0][0].startswith('running ')
+    assert lines[0][0].endswith('#1 upgrade flask')
+    assert lines[1][0] == '    Collecting flask'
+
+    release.set()
+    pm.jobs.wait()
+
+    assert pm._get_jobs_lines()[0][0].endswith('#1 upgrade flask  (L - show log)')
+
+
+def test_show_failed_log(mocker, pm):
+    pm.show_failed_log()
+    assert not pm.gui.draw_popup.called
+
+    job = Job('upgrade', [pm.distributions[0]], None)
+    job.id, job.state, job.log, job.log_path = 3, 'failed', ['ERROR: ResolutionImpossible'], '/logs/job-3.log'
+    pm.jobs.jobs.append(job)
+
+    pm.show_failed_log()
+
+    pm.gui.draw_popup.assert_called_with(
+        '#3 upgrade flask failed:\n  ERROR: ResolutionImpossible\nFull log: /logs/job-3.log\nPress any key'
+    )
+    assert pm.gui.stdscr.getch.called
 
 
 def test_toggle_one(pm):
@@ -81,78 +264,204 @@ def test_toggle_all(pm):
 
 
 def test_update_distributions(mocker, pm):
-    mocked_subprocess = mocker.patch('pip_manager.app.subprocess')
+    mocked_pip_install = mocker.patch('pip_manager.app.pip_install')
+    mocked_pip_install.return_value = InstallResult(0, {'flask': '9.99.998', 'pip': '10.0.0'}, '')
+    pm.gui.stdscr.getch.return_value = ord('y')
     pm.distributions[0].is_selected = True
+    pm.distributions[2].is_selected = True
 
     pm.update_distributions()
 
-    mocked_subprocess.call.assert_called_with([sys.executable, '-m', 'pip', 'install', '-U', 'flask'], stdout=mocker.ANY, stderr=mocker.ANY)
-    assert pm.distributions[0].is_selected is False
+    assert all(not d.is_selected for d in pm.distributions)
+    pm.jobs.wait()
+    pm.apply_finished_jobs()
+
+    mocked_pip_install.assert_called_once_with(['flask', 'pytest'], python=sys.executable, on_line=mocker.ANY)
+    assert all(not d.is_selected for d in pm.distributions)
+    assert [d.version for d in pm.distributions] == ['9.99.998', '10.0.0', '3.5.0']
+
+
+def test_update_distributions_pip_args(mocker, pm):
+    mocked_pip_install = mocker.patch('pip_manager.app.pip_install')
+    mocked_pip_install.return_value = InstallResult(0, {'flask': '9.99.999'}, '')
+    pm.gui.stdscr.getch.return_value = ord('y')
+    pm.pip_args = ['--no-index', '--find-links', '/wheels']
+    pm.distributions[0].is_selected = True
+
+    pm.update_distributions()
+    pm.jobs.wait()
+    pm.apply_finished_jobs()
+
+    mocked_pip_install.assert_called_once_with(
+        ['flask'], python=sys.executable, extra_args=['--no-index', '--find-links', '/wheels'], on_line=mocker.ANY
+    )
+
+
+def test_update_distributions_wheel_store(mocker, pm):
+    mocked_install_with_store = mocker.patch('pip_manager.app.install_with_store')
+    mocked_install_with_store.return_value = InstallResult(0, {'flask': '9.99.999'}, '')
+    mocked_pip_install = mocker.patch('pip_manager.app.pip_install')
+    pm.gui.stdscr.getch.return_value = ord('y')
+    pm.wheel_store = mocker.Mock()
+    pm.distributions[0].is_selected = True
+
+    pm.update_distributions()
+    pm.jobs.wait()
+    pm.apply_finished_jobs()
+
+    mocked_install_with_store.assert_called_once_with(pm.wheel_store, [pm.distributions[0]], python=sys.executable, on_line=mocker.ANY)
+    assert not mocked_pip_install.called
     assert pm.distributions[0].version == '9.99.999'
 
 
+@pytest.mark.parametrize('size, enabled', [(0, False), (1024, True)])
+def test_init_wheel_store(size, enabled, mocker):
+    mocker.patch('pip_manager.app.Gui')
+    mocker.patch('pip_manager.app.get_version_source').return_value.pip_args = ()
+    mocker.patch('pip_manager.app.PipManager.get_distributions').return_value = []
+    mocker.patch('pip_manager.app.get_wheel_store_size').return_value = size
+
+    pm = PipManager()
+
+    assert (pm.wheel_store is not None) is enabled
+    assert enabled is False or pm.wheel_store.max_size == 1024
+
+
+def test_update_distributions_failed(mocker, pm, tmpdir):
+    def pip_install(names, python, on_line):
+        on_line('ERROR: ResolutionImpossible\n')
+        return InstallResult(1, {}, 'ERROR: ResolutionImpossible\n')
+
+    mocker.patch('pip_manager.app.pip_install', side_effect=pip_install)
+    pm.gui.stdscr.getch.return_value = ord('y')
+    pm.distributions[0].is_selected = True
+
+    mocker.patch('pip_manager.jobs.get_cache_dir').return_value = str(tmpdir)
+
+    pm.update_distributions()
+    pm.jobs.wait()
+    pm.apply_finished_jobs()
+
+    assert pm.distributions[0].is_selected
+    assert pm.distributions[0].version == '1.0.0'
+    assert pm.jobs.last_failed.log == ['ERROR: ResolutionImpossible']
+
+
+
+def test_update_distributions_failed_after_report(mocker, pm, tmpdir):
+    mocker.patch('pip_manager.app.pip_install').return_value = InstallResult(
+        1, {'flask': '9.99.999', 'click': '8.0.0', 'pytest': '9.99.999'}, 'ERROR: Could not install packages\n'
+    )
+    mocker.patch('pip_manager.jobs.get_cache_dir').return_value = str(tmpdir)
+    pm.gui.stdscr.getch.return_value = ord('y')
+    pm.distributions[0].is_selected = True
+    pm.distributions[2].is_selected = True
+
+    pm.update_distributions()
+    pm.jobs.wait()
+    mocker.patch('pip_manager.app.iter_installed').side_effect = lambda paths=None: iter([
+        InstalledDistribution(name='flask', version='1.0.0', path=''),
+        InstalledDistribution(name='pytest', version='9.99.999', path=''),
+    ])
+    pm.apply_finished_jobs()
+
+    assert [(d.name, d.version, d.is_selected) for d in pm.distributions] == [
+        ('flask', '1.0.0', True), ('pip', '9.0.3', False), ('pytest', '9.99.999', False),
+    ]
+
+
 def test_update_distributions_none_selected(mocker, pm):
-    mocked_subprocess = mocker.patch('pip_manager.app.subprocess')
+    mocked_pip_install = mocker.patch('pip_manager.app.pip_install')
 
     pm.update_distributions()
 
-    assert not mocked_subprocess.call.called
+    assert not mocked_pip_install.called
     assert pm.distributions[0].is_selected is False
     assert pm.distributions[0].version == '1.0.0'
 
 
 def test_update_distributions_no_newest_version(mocker, pm):
-    mocked_subprocess = mocker.patch('pip_manager.app.subprocess')
+    mocked_pip_install = mocker.patch('pip_manager.app.pip_install')
     pm.distributions[0].is_selected = True
     pm.distributions[0].newest_version = 'n/a'
 
     pm.update_distributions()
 
-    assert not mocked_subprocess.call.called
+    assert not mocked_pip_install.called
     assert pm.distributions[0].is_selected
     assert pm.distributions[0].version == '1.0.0'
 
 
 def test_update_distributions_same_versions(mocker, pm):
-    mocked_subprocess = mocker.patch('pip_manager.app.subprocess')
+    mocked_pip_install = mocker.patch('pip_manager.app.pip_install')
     pm.distributions[0].is_selected = True
     pm.distributions[0].newest_version = '1.0.0'
 
     pm.update_distributions()
 
-    assert not mocked_subprocess.call.called
+    assert not mocked_pip_install.called
     assert pm.distributions[0].is_selected
     assert pm.distributions[0].version == '1.0.0'
 
 
 def test_uninstall_distributions(mocker, pm):
-    mocked_subprocess = mocker.patch('pip_manager.app.subprocess')
+    def pip_uninstall(names, python, on_line):
+        on_line('  Successfully uninstalled flask-1.0.0')
+        return UninstallResult(0, {'flask'}, '')
+
+    mocked_pip_uninstall = mocker.patch('pip_manager.app.pip_uninstall', side_effect=pip_uninstall)
     mocked_get_protected_dists = mocker.patch('pip_manager.app.get_protected_dists')
     mocked_get_protected_dists.return_value = ['pip']
     pm.gui.stdscr.getch.return_value = ord('y')
 
     pm.distributions[0].is_selected = True
+    pm.distributions[1].is_selected = True
 
     pm.uninstall_distributions()
+    pm.jobs.wait()
+    pm.apply_finished_jobs()
 
-    assert mocked_subprocess.call.called
+    mocked_pip_uninstall.assert_called_once_with(['flask'], python=sys.executable, on_line=mocker.ANY)
+    assert pm.jobs.jobs[0].get_tail() == ['  Successfully uninstalled flask-1.0.0']
     assert not any(d.name == 'flask' for d in pm.distributions)
     assert len(pm.distributions) == 2
 
 
+def test_uninstall_distributions_failed(mocker, pm, tmpdir):
+    mocked_pip_uninstall = mocker.patch('pip_manager.app.pip_uninstall')
+    mocked_pip_uninstall.return_value = UninstallResult(1, {'flask'}, '')
+    mocked_get_protected_dists = mocker.patch('pip_manager.app.get_protected_dists')
+    mocked_get_protected_dists.return_value = []
+    pm.gui.stdscr.getch.return_value = ord('y')
+
+    pm.distributions[0].is_selected = True
+    pm.distributions[2].is_selected = True
+
+    mocker.patch('pip_manager.jobs.get_cache_dir').return_value = str(tmpdir)
+
+    pm.uninstall_distributions()
+    pm.jobs.wait()
+    pm.apply_finished_jobs()
+
+    mocked_pip_uninstall.assert_called_once_with(['flask', 'pytest'], python=sys.executable, on_line=mocker.ANY)
+    assert [d.name for d in pm.distributions] == ['pip', 'pytest']
+    assert [d.is_selected for d in pm.distributions] == [False, True]
+    assert pm.jobs.last_failed is pm.jobs.jobs[0]
+
+
 def test_uninstall_distributions_none_selected(mocker, pm):
-    mocked_subprocess = mocker.patch('pip_manager.app.subprocess')
+    mocked_pip_uninstall = mocker.patch('pip_manager.app.pip_uninstall')
     mocked_get_protected_dists = mocker.patch('pip_manager.app.get_protected_dists')
     mocked_get_protected_dists.return_value = ['pip']
 
     pm.uninstall_distributions()
 
-    assert not mocked_subprocess.call.called
+    assert not mocked_pip_uninstall.called
     assert len(pm.distributions) == 3
 
 
 def test_uninstall_distributions_protected(mocker, pm):
-    mocked_subprocess = mocker.patch('pip_manager.app.subprocess')
+    mocked_pip_uninstall = mocker.patch('pip_manager.app.pip_uninstall')
     mocked_get_protected_dists = mocker.patch('pip_manager.app.get_protected_dists')
     mocked_get_protected_dists.return_value = ['pip']
 
@@ -160,12 +469,12 @@ def test_uninstall_distributions_protected(mocker, pm):
 
     pm.uninstall_distributions()
 
-    assert not mocked_subprocess.call.called
+    assert not mocked_pip_uninstall.called
     assert len(pm.distributions) == 3
 
 
 def test_uninstall_distributions_non_confirmed(mocker, pm):
-    mocked_subprocess = mocker.patch('pip_manager.app.subprocess')
+    mocked_pip_uninstall = mocker.patch('pip_manager.app.pip_uninstall')
     mocked_get_protected_dists = mocker.patch('pip_manager.app.get_protected_dists')
     mocked_get_protected_dists.return_value = ['pip']
     pm.gui.stdscr.getch.return_value = ord('n')
@@ -174,15 +483,480 @@ def test_uninstall_distributions_non_confirmed(mocker, pm):
 
     pm.uninstall_distributions()
 
-    assert not mocked_subprocess.call.called
+    assert not mocked_pip_uninstall.called
     assert len(pm.distributions) == 3
 
 
-@pytest.mark.parametrize('dist_win_height, expected', [
-    (1, 2),
-    (2, 1),
-    (3, 0),
+def test_set_filter(pm):
+    pm.viewport.resize(height=5)
+    pm.viewport.move_to(2)
+
+    pm.set_filter('p')
+
+    assert pm.view == [
+        Distribution(name='pip', version='9.0.3'),
+        Distribution(name='pytest', version='3.5.0'),
+    ]
+    assert pm.viewport.total == 2
+    assert pm.viewport.cursor == 0
+
+    pm.set_filter('')
+
+    assert pm.view is pm.distributions
+    assert pm.viewport.total == 3
+
+
+def test_toggle_filtered(pm):
+    pm.set_filter('pyt')
+
+    pm.toggle_one(0)
+    assert [d.name for d in pm.distributions if d.is_selected] == ['pytest']
+
+    pm.toggle_all()
+    assert not any(d.is_selected for d in pm.distributions)
+    pm.toggle_all()
+    assert [d.name for d in pm.distributions if d.is_selected] == ['pytest']
+
+
+def test_toggle_one_empty_filter(pm):
+    pm.set_filter('zzz')
+
+    pm.toggle_one(0)
+
+    assert not any(d.is_selected for d in pm.distributions)
+
+
+@pytest.mark.parametrize('keys, expected_query, expected_filtering', [
+    ([ord('p'), ord('i')], 'pi', True),
+    ([ord('p'), ord('i'), 127], 'p', True),
+    ([ord('p'), 10], 'p', False),
+    ([ord('p'), 27], '', False),
+    ([ord('p'), None], 'p', True),
+])
+def test_handle_filter_key(keys, expected_query, expected_filtering, pm):
+    for key in keys:
+        filtering = pm._handle_filter_key(key)
+
+    assert pm.filter_query == expected_query
+    assert filtering is expected_filtering
+
+
+def test_uninstall_keeps_filter(mocker, pm):
+    mocker.patch('pip_manager.app.pip_uninstall').return_value = UninstallResult(0, {'pip'}, '')
+    mocker.patch('pip_manager.app.get_protected_dists').return_value = []
+    pm.gui.stdscr.getch.return_value = ord('y')
+    pm.set_filter('p')
+    pm.toggle_one(0)
+
+    pm.uninstall_distributions()
+    pm.jobs.wait()
+    pm.apply_finished_jobs()
+
+    assert pm.view == [Distribution(name='pytest', version='3.5.0')]
+
+
+@pytest.fixture
+def envs():
+    return [
+        Environment('/a/bin/python', 'a', ('/a',), '22.0'),
+        Environment('/b/bin/python', 'b', ('/b',), '9.0.3'),
+    ]
+
+
+@pytest.fixture
+def multi_env_pm(mocker, envs):
+    mocker.patch('pip_manager.app.Gui')
+    mocker.patch('pip_manager.app.get_version_source')
+    mocker.patch('pip_manager.app.Distribution.get_newest_version').return_value = '9.99.999'
+    mocker.patch('pip_manager.app.discover_environments').return_value = [
+        (envs[0], [InstalledDistribution('flask', '1.0.0', ''), InstalledDistribution('pip', '9.0', '')]),
+        (envs[1], [InstalledDistribution('flask', '0.12', '')]),
+    ]
+    pm = PipManager(environments=['/a', '/b'])
+    list(pm.resolver.iter_resolved())
+    return pm
+
+
+def test_get_distributions_many_environments(envs, multi_env_pm):
+    assert [(d.name, d.version, d.env_label) for d in multi_env_pm.distributions] == [
+        ('flask', '1.0.0', 'a'),
+        ('flask', '0.12', 'b'),
+        ('pip', '9.0', 'a'),
+    ]
+    assert multi_env_pm.widths.env == 1
+    assert multi_env_pm.get_distribution('flask', envs[1]).version == '0.12'
+    assert multi_env_pm.get_distribution('pip', envs[1]) is None
+
+
+def test_update_distributions_many_environments(mocker, envs, multi_env_pm, tmpdir):
+    mocked_pip_install = mocker.patch('pip_manager.app.pip_install')
+    mocked_pip_install.side_effect = [
+        InstallResult(0, {'flask': '9.99.999', 'pip': '9.99.999'}, ''),
+        InstallResult(1, {}, ''),
+    ]
+    pm = multi_env_pm
+    pm.gui.stdscr.getch.return_value = ord('y')
+    pm.toggle_all()
+    mocker.patch('pip_manager.jobs.get_cache_dir').return_value = str(tmpdir)
+
+    pm.update_distributions()
+    pm.jobs.wait()
+    pm.apply_finished_jobs()
+
+    assert mocked_pip_install.call_args_list == [
+        mocker.call(['flask', 'pip'], python='/a/bin/python', pip_version='22.0', on_line=mocker.ANY),
+        mocker.call(['flask'], python='/b/bin/python', pip_version='9.0.3', on_line=mocker.ANY),
+    ]
+    assert [d.version for d in pm.distributions] == ['9.99.999', '0.12', '9.99.999']
+    assert [d.is_selected for d in pm.distributions] == [False, True, False]
+    assert [job.state for job in pm.jobs.jobs] == ['done', 'failed']
+
+
+def test_uninstall_distributions_many_environments(mocker, multi_env_pm):
+    mocked_pip_uninstall = mocker.patch('pip_manager.app.pip_uninstall')
+    mocked_pip_uninstall.return_value = UninstallResult(0, {'flask'}, '')
+    mocker.patch('pip_manager.app.get_protected_dists').return_value = []
+    pm = multi_env_pm
+    pm.gui.stdscr.getch.return_value = ord('y')
+    pm.distributions[1].is_selected = True
+
+    pm.uninstall_distributions()
+    pm.jobs.wait()
+    pm.apply_finished_jobs()
+
+    mocked_pip_uninstall.assert_called_once_with(['flask'], python='/b/bin/python', on_line=mocker.ANY)
+    assert [(d.name, d.env_label) for d in pm.distributions] == [('flask', 'a'), ('pip', 'a')]
+
+
+def test_update_distributions_not_confirmed(mocker, pm):
+    mocked_pip_install = mocker.patch('pip_manager.app.pip_install')
+    pm.gui.stdscr.getch.return_value = ord('n')
+    pm.distributions[0].is_selected = True
+
+    pm.update_distributions()
+
+    assert not mocked_pip_install.called
+    pm.gui.draw_popup.assert_called_with(
+        'Upgrade plan:\n  flask 1.0.0 -> 9.99.999\nProceed? [y/N]'
+    )
+    assert pm.distributions[0].is_selected
+
+
+def test_update_distributions_plan(mocker, pm):
+    graph = DependencyGraph(
+        [Installed('flask', 'flask'), Installed('pytest', 'pytest'), Installed('flask-login', 'flask-login')],
+        read=lambda path: {
+            'flask': [Requirement('pytest', '', None)],
+            'flask-login': [Requirement('flask', '<2', None)],
+        }.get(path, []),
+    )
+    mocker.patch.object(pm, 'get_graph').return_value = graph
+    mocked_pip_install = mocker.patch('pip_manager.app.pip_install')
+    mocked_pip_install.return_value = InstallResult(0, {'flask': '9.99.999', 'pytest': '9.99.999'}, '')
+    pm.gui.stdscr.getch.return_value = ord('y')
+    pm.distributions[0].is_selected = True
+    pm.distributions[2].is_selected = True
+
+    pm.update_distributions()
+    pm.jobs.wait()
+    pm.apply_finished_jobs()
+
+    pm.gui.draw_popup.assert_any_call(
+        'Upgrade plan:\n'
+        '  pytest 3.5.0 -> 9.99.999\n'
+        '  flask 1.0.0 -> 9.99.999\n'
+        'Conflicts:\n'
+        '  flask-login requires flask<2\n'
+        'Proceed? [y/N]'
+    )
+    mocked_pip_install.assert_called_once_with(['pytest', 'flask'], python=sys.executable, on_line=mocker.ANY)
+
+
+def test_update_distributions_refreshes_graph(mocker, pm):
+    mocker.patch('pip_manager.app.pip_install').return_value = InstallResult(0, {'flask': '9.99.999'}, '')
+    mocked_read = mocker.Mock(return_value=[])
+    pm._graphs[None] = DependencyGraph(pm.distributions, read=mocked_read)
+    mocked_read.reset_mock()
+    pm.gui.stdscr.getch.return_value = ord('y')
+    pm.distributions[0].is_selected = True
+    mocker.patch('pip_manager.app.iter_installed').return_value = iter([
+        InstalledDistribution(name='flask', version='9.99.999', path='/site/flask-9.99.999.dist-info'),
+        InstalledDistribution(name='pip', version='9.0.3', path='/site/pip-9.0.3.dist-info'),
+    ])
+
+    pm.update_distributions()
+    pm.jobs.wait()
+    pm.apply_finished_jobs()
+
+    assert pm.distributions[0].path == '/site/flask-9.99.999.dist-info'
+    assert pm.distributions[1].path == ''
+    mocked_read.assert_called_once_with('/site/flask-9.99.999.dist-info')
+
+
+
+def test_update_distributions_adds_new_dependencies(mocker, pm):
+    mocker.patch('pip_manager.app.pip_install').return_value = InstallResult(
+        0, {'flask': '9.99.999', 'click': '8.0.0'}, ''
+    )
+    mocked_read = mocker.Mock(side_effect=lambda path: [Requirement('click', '', None)] if 'flask' in path else [])
+    pm._graphs[None] = DependencyGraph(pm.distributions, read=mocked_read)
+    pm.gui.stdscr.getch.return_value = ord('y')
+    pm.distributions[0].is_selected = True
+    mocker.patch('pip_manager.app.iter_installed').return_value = iter([
+        InstalledDistribution(name='click', version='8.0.0', path='/site/click-8.0.0.dist-info'),
+        InstalledDistribution(name='flask', version='9.99.999', path='/site/flask-9.99.999.dist-info'),
+        InstalledDistribution(name='pip', version='9.0.3', path='/site/pip-9.0.3.dist-info'),
+    ])
+
+    pm.update_distributions()
+    pm.jobs.wait()
+    pm.apply_finished_jobs()
+
+    assert [(d.name, d.version) for d in pm.distributions] == [
+        ('click', '8.0.0'), ('flask', '9.99.999'), ('pip', '9.0.3'), ('pytest', '3.5.0'),
+    ]
+    click = pm.get_distribution('click')
+    assert click.path == '/site/click-8.0.0.dist-info'
+    assert pm.viewport.total == 4
+    assert pm.get_graph().get_dependencies('flask') == ['click']
+    list(pm.resolver.iter_resolved())
+    assert click.newest_version == '9.99.999'
+
+
+@pytest.fixture
+def graph_pm(mocker, pm):
+    # flask requires pytest (a dependency nobody else needs), pip requires nothing.
+    pm._graphs[None] = DependencyGraph(
+        [Installed(d.name, d.name) for d in pm.distributions],
+        read=lambda path: {'flask': [Requirement('pytest', '', None)]}.get(path, []),
+    )
+    mocker.patch('pip_manager.app.is_requested', side_effect=lambda path: False)
+    mocker.patch('pip_manager.app.get_protected_dists').return_value = []
+    return pm
+
+
+@pytest.mark.parametrize('answers, expected_names', [
+    ([ord('y'), ord('y')], ['flask', 'pytest']),
+    ([ord('y'), ord('n')], ['flask']),
 ])
-def test_last_page(dist_win_height, expected, pm):
-    pm.gui.dist_win_height = dist_win_height
-    assert pm.last_page == expected
+def test_uninstall_distributions_orphans(answers, expected_names, mocker, graph_pm):
+    mocked_pip_uninstall = mocker.patch('pip_manager.app.pip_uninstall')
+    mocked_pip_uninstall.return_value = UninstallResult(0, set(expected_names), '')
+    graph_pm.gui.stdscr.getch.side_effect = answers
+    graph_pm.distributions[0].is_selected = True
+
+    graph_pm.uninstall_distributions()
+    graph_pm.jobs.wait()
+    graph_pm.apply_finished_jobs()
+
+    graph_pm.gui.draw_popup.assert_any_call('Dependencies not needed anymore:\n  pytest\nRemove them too? [y/N]')
+    mocked_pip_uninstall.assert_called_once_with(expected_names, python=sys.executable, on_line=mocker.ANY)
+    assert [d.name for d in graph_pm.distributions] == [n for n in ['flask', 'pip', 'pytest'] if n not in expected_names]
+    assert 'flask' not in graph_pm.get_graph()
+
+
+def test_plan_removal_requested_dependency(mocker, graph_pm):
+    mocker.patch('pip_manager.app.is_requested', side_effect=lambda path: path == 'pytest')
+    graph_pm.distributions[0].path = 'flask'
+    graph_pm.distributions[2].path = 'pytest'
+
+    assert graph_pm.plan_removal([graph_pm.distributions[0]]) == ([graph_pm.distributions[0]], [])
+
+
+def test_plan_removal_protected_transitively(mocker, graph_pm):
+    mocker.patch('pip_manager.app.get_protected_dists').return_value = ProtectedMatcher(['Fl*'])
+
+    to_remove, orphans = graph_pm.plan_removal(graph_pm.distributions)
+
+    assert [d.name for d in to_remove] == ['pip']
+    assert orphans == []
+
+
+def test_plan_sync(mocker, graph_pm):
+    locked = [
+        LockedDistribution('Flask', '1.0', '1.0', None),
+        LockedDistribution('pip', '10.0.0', '10.0.0', None),
+        LockedDistribution('requests', '2.0.0', '2.0.0', None),
+    ]
+
+    [plan] = graph_pm.plan_sync(locked)
+
+    assert plan.env is None
+    assert plan.install == [('pip', '10.0.0'), ('requests', '2.0.0')]
+    assert [d.name for d in plan.remove] == ['pytest']
+
+
+def test_plan_sync_keeps_protected(mocker, graph_pm):
+    mocker.patch('pip_manager.app.get_protected_dists').return_value = ProtectedMatcher(['pip'])
+
+    [plan] = graph_pm.plan_sync([LockedDistribution('flask', '1.0.0', None, None)])
+
+    assert plan.install == []
+    assert [d.name for d in plan.remove] == ['pytest']
+
+
+def test_plan_sync_many_environments(mocker, envs, multi_env_pm):
+    mocker.patch('pip_manager.app.get_protected_dists').return_value = []
+    locked = [
+        LockedDistribution('flask', '1.0.0', None, 'a'),
+        LockedDistribution('flask', '1.0.0', None, 'b'),
+        LockedDistribution('six', '1.16.0', None, 'b'),
+    ]
+
+    plans = multi_env_pm.plan_sync(locked)
+
+    assert [(p.env, p.install, [d.name for d in p.remove]) for p in plans] == [
+        (envs[0], [], ['pip']),
+        (envs[1], [('flask', '1.0.0'), ('six', '1.16.0')], []),
+    ]
+
+
+def test_plan_sync_mismatched_labels(mocker, envs, multi_env_pm):
+    mocker.patch('pip_manager.app.get_protected_dists').return_value = []
+    locked = [
+        LockedDistribution('flask', '1.0.0', None, 'a'),
+        LockedDistribution('flask', '1.0.0', None, '.venv'),
+    ]
+
+    with pytest.raises(InvalidLockfile) as e:
+        multi_env_pm.plan_sync(locked)
+
+    assert str(e.value) == 'Lockfile lists environments .venv, a only, not b'
+
+
+def test_plan_sync_labelled_lockfile_without_environments(mocker, graph_pm):
+    mocker.patch('pip_manager.app.get_protected_dists').return_value = []
+
+    with pytest.raises(InvalidLockfile) as e:
+        graph_pm.plan_sync([LockedDistribution('flask', '1.0.0', None, '.venv')])
+
+    assert str(e.value) == 'Lockfile lists environments .venv only (see --env)'
+
+
+@pytest.mark.parametrize('locked, message', [
+    (
+        [
+            LockedDistribution('flask', '1.0.0', None, 'a'),
+            LockedDistribution('flask', '1.0.0', None, 'b'),
+            LockedDistribution('Flask', '2.0.0', None, 'b'),
+        ],
+        'Distribution locked more than once: flask (b)',
+    ),
+    (
+        [LockedDistribution('flask', '1.0.0', None, None), LockedDistribution('flask', '2.0.0', None, 'a')],
+        'Distribution locked more than once: flask (a)',
+    ),
+])
+def test_plan_sync_duplicates(locked, message, mocker, multi_env_pm):
+    mocker.patch('pip_manager.app.get_protected_dists').return_value = []
+
+    with pytest.raises(InvalidLockfile) as e:
+        multi_env_pm.plan_sync(locked)
+
+    assert str(e.value) == message
+
+
+def test_sync_distributions(mocker, envs, multi_env_pm):
+    mocked_pip_install = mocker.patch('pip_manager.app.pip_install')
+    mocked_pip_install.return_value = InstallResult(0, {'flask': '1.0.0', 'six': '1.16.0'}, '')
+    mocked_pip_uninstall = mocker.patch('pip_manager.app.pip_uninstall')
+    mocked_pip_uninstall.return_value = UninstallResult(0, {'pip'}, '')
+    mocker.patch('pip_manager.app.get_protected_dists').return_value = []
+    pm = multi_env_pm
+    pm.pip_args = ['--no-index']
+    plans = pm.plan_sync([
+        LockedDistribution('flask', '1.0.0', None, 'a'),
+        LockedDistribution('flask', '1.0.0', None, 'b'),
+        LockedDistribution('six', '1.16.0', None, 'b'),
+    ])
+
+    jobs = pm.sync_distributions(plans)
+    pm.jobs.wait()
+    pm.apply_finished_jobs()
+
+    assert [(job.kind, job.env) for job in jobs] == [('remove', envs[0]), ('upgrade', envs[1])]
+    mocked_pip_uninstall.assert_called_once_with(['pip'], python='/a/bin/python', on_line=mocker.ANY)
+    mocked_pip_install.assert_called_once_with(
+        ['flask==1.0.0', 'six==1.16.0'], upgrade=False, python='/b/bin/python', pip_version='9.0.3',
+        extra_args=['--no-index', '--no-deps'], on_line=mocker.ANY,
+    )
+    assert [(d.name, d.version, d.env_label) for d in pm.distributions] == [('flask', '1.0.0', 'a'), ('flask', '1.0.0', 'b')]
+
+
+@pytest.mark.parametrize('headless, expected', [
+    (False, [(('/a/bin/python',),), (('/b/bin/python',),)]),
+    (True, []),
+])
+def test_init_prewarms_workers(headless, expected, mocker, envs, no_worker_pool):
+    mocker.patch('pip_manager.app.Gui')
+    mocker.patch('pip_manager.app.get_version_source').return_value.pip_args = ()
+    mocker.patch('pip_manager.app.discover_environments').return_value = [
+        (envs[1], [InstalledDistribution('flask', '0.12', '')]),
+        (envs[0], [InstalledDistribution('flask', '1.0.0', ''), InstalledDistribution('pip', '9.0', '')]),
+    ]
+    pool = no_worker_pool.return_value = mocker.Mock()
+
+    PipManager(environments=['/a', '/b'], headless=headless)
+
+    assert pool.prewarm.call_args_list == expected
+
+
+@pytest.fixture
+def advisory_pm(mocker, pm):
+    mocked_index = mocker.Mock()
+    mocked_index.get_advisories.side_effect = lambda name, version: {
+        ('flask', '1.0.0'): ['PYSEC-2023-62'],
+        ('pytest', '3.5.0'): ['GHSA-aaaa-bbbb-cccc', 'PYSEC-2021-9'],
+    }.get((name, version), [])
+    pm.advisories = mocked_index
+    pm._check_advisories(pm.distributions)
+    return pm
+
+
+def test_init_advisory_db(mocker):
+    mocker.patch('pip_manager.app.Gui')
+    mocker.patch('pip_manager.app.get_version_source')
+    mocker.patch('pip_manager.app.iter_installed').side_effect = lambda paths=None: iter([
+        InstalledDistribution(name='flask', version='1.0.0', path=''),
+        InstalledDistribution(name='pip', version='9.0.3', path=''),
+    ])
+    mocked_load_advisories = mocker.patch('pip_manager.app.load_advisories')
+    mocked_load_advisories.return_value.get_advisories.side_effect = (
+        lambda name, version: ['PYSEC-2023-62'] if name == 'flask' else []
+    )
+
+    pm = PipManager(advisory_db='/srv/osv')
+
+    mocked_load_advisories.assert_called_once_with('/srv/osv')
+    assert [(d.name, d.advisories) for d in pm.distributions] == [
+        ('flask', ('PYSEC-2023-62',)), ('pip', ()),
+    ]
+
+
+def test_init_no_advisory_db(pm):
+    assert pm.advisories is None
+    assert all(d.advisories == () for d in pm.distributions)
+
+
+def test_select_vulnerable(advisory_pm):
+    assert advisory_pm.select_vulnerable() == 2
+    assert [d.is_selected for d in advisory_pm.distributions] == [True, False, True]
+
+    advisory_pm.distributions[0].is_selected = False
+    advisory_pm.set_filter('pip')
+    assert advisory_pm.select_vulnerable() == 0
+    assert not advisory_pm.distributions[0].is_selected
+
+
+def test_update_distributions_rechecks_advisories(mocker, advisory_pm):
+    mocked_pip_install = mocker.patch('pip_manager.app.pip_install')
+    mocked_pip_install.return_value = InstallResult(0, {'flask': '9.99.999'}, '')
+    advisory_pm.gui.stdscr.getch.return_value = ord('y')
+    advisory_pm.select_vulnerable()
+
+    advisory_pm.update_distributions()
+    advisory_pm.jobs.wait()
+    advisory_pm.apply_finished_jobs()
+
+    assert advisory_pm.distributions[0].advisories == ()
+    assert advisory_pm.distributions[2].advisories == ('GHSA-aaaa-bbbb-cccc', 'PYSEC-2021-9')
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from pip_manager.cache import CacheEntry
+from pip_manager.cache import VersionCache
+
+
+@pytest.fixture
+def cache(tmpdir):
+    cache = VersionCache(path=str(tmpdir.join('cache', 'versions.sqlite3')), ttl=60)
+    yield cache
+    cache.close()
+
+
+@pytest.mark.parametrize('fetched_at, expected', [
+    (1000, True),
+    (941, True),
+    (940, False),
+])
+def test_cache_entry_is_fresh(fetched_at, expected):
+    assert CacheEntry([], fetched_at, None, None).is_fresh(60, now=1000) is expected
+
+
+def test_get_missing(cache):
+    assert cache.get('https://pypi.org/simple/', 'flask') is None
+
+
+def test_put_get(cache):
+    entry = CacheEntry(['1.0', '2.0'], 1000.0, '"abc"', 'Mon, 01 Jan 2018 00:00:00 GMT')
+    cache.put('https://pypi.org/simple/', 'flask', entry)
+
+    assert cache.get('https://pypi.org/simple/', 'flask') == entry
+    assert cache.get('https://example.com/simple/', 'flask') is None
+
+
+def test_put_replaces(cache):
+    cache.put('https://pypi.org/simple/', 'flask', CacheEntry(['1.0'], 1000.0, None, None))
+    cache.put('https://pypi.org/simple/', 'flask', CacheEntry(['2.0'], 2000.0, None, None))
+
+    assert cache.get('https://pypi.org/simple/', 'flask').versions == ['2.0']
+
+
+def test_persistent(cache):
+    cache.put('https://pypi.org/simple/', 'flask', CacheEntry(['1.0'], 1000.0, None, None))
+    cache.close()
+
+    assert VersionCache(path=cache.path).get('https://pypi.org/simple/', 'flask').versions == ['1.0']
+
+
+def test_unusable_path_disables_cache(tmpdir):
+    tmpdir.join('file').write('')
+    cache = VersionCache(path=str(tmpdir.join('file', 'versions.sqlite3')))
+
+    cache.put('https://pypi.org/simple/', 'flask', CacheEntry(['1.0'], 1000.0, None, None))
+
+    assert cache.get('https://pypi.org/simple/', 'flask') is None
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+import json
+import sys
+
+import pytest
+
+from pip_manager import commands
+from pip_manager.commands import InstallResult
+from pip_manager.commands import UninstallResult
+
+
+@pytest.fixture(autouse=True)
+def no_worker_pool(mocker):
+    mocker.patch('pip_manager.commands.get_worker_pool').return_value = None
+
+
+@pytest.mark.parametrize('returncode, installed, name, expected', [
+    (0, {'flask': '1.0'}, 'Flask', 'installed'),
+    (0, {}, 'flask', 'unchanged'),
+    (1, {}, 'flask', 'failed'),
+])
+def test_install_result_get_outcome(returncode, installed, name, expected):
+    assert InstallResult(returncode, installed, '').get_outcome(name) == expected
+
+
+def test_parse_install_report():
+    report = {'version': '1', 'install': [
+        {'metadata': {'name': 'Flask', 'version': '1.0.2'}},
+        {'metadata': {'name': 'zope.interface', 'version': '4.5.0'}},
+    ]}
+    assert commands.parse_install_report(report) == {'flask': '1.0.2', 'zope-interface': '4.5.0'}
+
+
+def test_parse_install_output():
+    output = 'Collecting flask\nSuccessfully installed Flask-1.0.2 zope.interface-4.5.0\n'
+    assert commands.parse_install_output(output) == {'flask': '1.0.2', 'zope-interface': '4.5.0'}
+
+
+@pytest.mark.parametrize('pip_version, expected', [
+    ((22, 1), False),
+    ((22, 2), True),
+    ((23, 0), True),
+])
+def test_supports_install_report(pip_version, expected, mocker):
+    mocker.patch('pip_manager.commands._get_pip_version').return_value = pip_version
+    assert commands.supports_install_report() is expected
+
+
+def test_pip_install(mocker):
+    mocker.patch('pip_manager.commands.supports_install_report').return_value = True
+
+    def run(args, on_line):
+        with open(args[args.index('--report') + 1], 'w') as f:
+            json.dump({'install': [{'metadata': {'name': 'Flask', 'version': '1.0.2'}}]}, f)
+        return 0, 'output'
+
+    mocked_run = mocker.patch('pip_manager.commands._run', side_effect=run)
+
+    result = commands.pip_install(['flask', 'pytest'])
+
+    assert result == InstallResult(0, {'flask': '1.0.2'}, 'output')
+    args = mocked_run.call_args[0][0]
+    assert args[:5] == [sys.executable, '-m', 'pip', 'install', '-U']
+    assert args[-2:] == ['flask', 'pytest']
+
+
+def test_pip_install_missing_report(mocker):
+    mocker.patch('pip_manager.commands.supports_install_report').return_value = True
+    mocker.patch('pip_manager.commands._run').return_value = (1, 'ERROR')
+
+    assert commands.pip_install(['flask']) == InstallResult(1, {}, 'ERROR')
+
+
+def test_pip_install_without_report(mocker):
+    mocker.patch('pip_manager.commands.supports_install_report').return_value = False
+    mocked_run = mocker.patch('pip_manager.commands._run')
+    mocked_run.return_value = (0, 'Successfully installed Flask-1.0.2\n')
+
+    assert commands.pip_install(['flask']) == InstallResult(0, {'flask': '1.0.2'}, 'Successfully installed Flask-1.0.2\n')
+    mocked_run.assert_called_with([sys.executable, '-m', 'pip', 'install', '-U', 'flask'], None)
+
+
+def test_pip_install_extra_args(mocker):
+    mocker.patch('pip_manager.commands.supports_install_report').return_value = False
+    mocked_run = mocker.patch('pip_manager.commands._run')
+    mocked_run.return_value = (0, '')
+
+    commands.pip_install(['flask'], extra_args=['--no-index', '--find-links', '/wheels'])
+
+    mocked_run.assert_called_with(
+        [sys.executable, '-m', 'pip', 'install', '-U', '--no-index', '--find-links', '/wheels', 'flask'], None
+    )
+
+
+@pytest.mark.parametrize('pool_result, expected', [
+    ((0, 'pip 23.0'), (0, 'pip 23.0')),
+    (None, (1, 'spawned')),
+])
+def test_run_pip(pool_result, expected, mocker):
+    pool = mocker.patch('pip_manager.commands.get_worker_pool').return_value
+    pool.run.return_value = pool_result
+    mocked_run = mocker.patch('pip_manager.commands._run')
+    mocked_run.return_value = (1, 'spawned')
+    on_line = mocker.Mock()
+
+    assert commands.run_pip('/a/bin/python', ['uninstall', 'flask'], on_line, retire=True) == expected
+    pool.run.assert_called_with('/a/bin/python', ['uninstall', 'flask'], on_line, True)
+    if pool_result is None:
+        mocked_run.assert_called_with(['/a/bin/python', '-m', 'pip', 'uninstall', 'flask'], on_line)
+
+
+def test_pip_wheel(mocker):
+    mocked_run = mocker.patch('pip_manager.commands._run')
+    mocked_run.return_value = (1, '')
+    on_line = mocker.Mock()
+
+    assert commands.pip_wheel(['flask==1.0.2'], '/tmp/wheels', python='/a/bin/python', on_line=on_line, extra_args=['--find-links', '/store/index.html']) == 1
+    mocked_run.assert_called_with(
+        ['/a/bin/python', '-m', 'pip', 'wheel', '--no-deps', '--wheel-dir', '/tmp/wheels', '--find-links', '/store/index.html', 'flask==1.0.2'],
+        on_line
+    )
+
+
+@pytest.mark.parametrize('line, expected', [
+    ('  Successfully uninstalled Flask-1.0.2', 'flask'),
+    ('Successfully uninstalled zope.interface-4.5.0', 'zope-interface'),
+    ('Found existing installation: Flask 1.0.2', None),
+    ('WARNING: Skipping pytest as it is not installed.', None),
+])
+def test_parse_uninstall_line(line, expected):
+    assert commands.parse_uninstall_line(line) == expected
+
+
+def test_pip_uninstall(mocker):
+    def run(args, on_line):
+        for line in ('Found existing installation: Flask 1.0.2', '  Successfully uninstalled Flask-1.0.2',
+                     'WARNING: Skipping pytest as it is not installed.'):
+            on_line(line)
+        return 0, 'output'
+
+    mocked_run = mocker.patch('pip_manager.commands._run', side_effect=run)
+    uninstalled = []
+
+    result = commands.pip_uninstall(['flask', 'pytest'], on_uninstalled=uninstalled.append)
+
+    assert result == UninstallResult(0, {'flask'}, 'output')
+    assert uninstalled == ['flask']
+    mocked_run.assert_called_with([sys.executable, '-m', 'pip', 'uninstall', '--yes', 'flask', 'pytest'], mocker.ANY)
+
+
+def test_pip_uninstall_on_line(mocker):
+    def run(args, on_line):
+        on_line('  Successfully uninstalled Flask-1.0.2')
+        return 0, 'output'
+
+    mocker.patch('pip_manager.commands._run', side_effect=run)
+    lines = []
+
+    commands.pip_uninstall(['flask'], on_line=lines.append)
+
+    assert lines == ['  Successfully uninstalled Flask-1.0.2']
+
+
+def test_run():
+    lines = []
+
+    returncode, output = commands._run([sys.executable, '-c', 'print("a"); print("b")'], lines.append)
+
+    assert returncode == 0
+    assert output.splitlines() == ['a', 'b']
+    assert lines == ['a', 'b']
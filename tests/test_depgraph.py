@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+from collections import namedtuple
+
+import pytest
+
+from pip_manager import depgraph
+from pip_manager.depgraph import Conflict
+from pip_manager.depgraph import DependencyGraph
+from pip_manager.depgraph import Requirement
+
+Installed = namedtuple('Installed', ['name', 'path'])
+
+REQUIRES = {
+    'flask': ['Werkzeug>=0.15', 'Jinja2 (>=2.10.1)', 'itsdangerous>=0.24', 'click>=5.1'],
+    'flask-login': ['Flask (<2,>=1.0.4)'],
+    'jinja2': ['MarkupSafe>=0.23'],
+    'werkzeug': [],
+    'markupsafe': [],
+    'click': ['colorama; platform_system == "Windows"', 'importlib-metadata; extra == "docs"'],
+}
+
+
+def read(path):
+    return [depgraph.parse_requirement(line) for line in REQUIRES.get(path, []) if 'extra' not in line]
+
+
+@pytest.fixture
+def graph():
+    return DependencyGraph([Installed(name, name) for name in REQUIRES], read=read)
+
+
+@pytest.mark.parametrize('line, expected', [
+    ('six', Requirement('six', '', None)),
+    ('Jinja2 (>=2.10.1)', Requirement('jinja2', '>=2.10.1', None)),
+    ('requests[socks] >= 2.0, < 3', Requirement('requests', '>=2.0,<3', None)),
+    ('zope.interface; python_version < "3"', Requirement('zope-interface', '', 'python_version < "3"')),
+    ('pkg @ https://example.com/pkg.whl', Requirement('pkg', '', None)),
+    ('!!!', None),
+])
+def test_parse_requirement(line, expected):
+    assert depgraph.parse_requirement(line) == expected
+
+
+@pytest.mark.parametrize('marker, expected', [
+    (None, True),
+    ('extra == "docs"', False),
+    ('python_version < "2"', False),
+    ('python_version >= "2"', True),
+])
+def test_applies(marker, expected):
+    assert depgraph.applies(Requirement('six', '', marker)) is expected
+
+
+@pytest.mark.parametrize('marker, expected', [
+    (None, True),
+    ('extra == "docs"', False),
+    ('python_version < "2"', True),
+])
+def test_applies_without_packaging(marker, expected, mocker):
+    mocker.patch('pip_manager.depgraph.Marker', None)
+    assert depgraph.applies(Requirement('six', '', marker)) is expected
+
+
+def test_read_requirements(tmpdir):
+    dist_info = tmpdir.mkdir('flask-1.0.2.dist-info')
+    dist_info.join('METADATA').write(
+        'Metadata-Version: 2.1\nName: Flask\nVersion: 1.0.2\n'
+        'Requires-Dist: Werkzeug (>=0.14)\n'
+        'Requires-Dist: Jinja2>=2.10\n'
+        'Requires-Dist: coverage; extra == "dev"\n'
+    )
+
+    assert depgraph.read_requirements(str(dist_info)) == [
+        Requirement('werkzeug', '>=0.14', None),
+        Requirement('jinja2', '>=2.10', None),
+    ]
+
+
+@pytest.mark.parametrize('path', ['', '/does/not/exist.dist-info'])
+def test_read_requirements_missing(path):
+    assert depgraph.read_requirements(path) == []
+
+
+def test_dependencies_and_dependents(graph):
+    assert graph.get_dependencies('Flask') == ['click', 'jinja2', 'werkzeug']
+    assert graph.get_dependents('flask') == ['flask-login']
+    assert graph.get_dependents('MarkupSafe') == ['jinja2']
+    assert graph.get_dependents('flask-login') == []
+    assert 'flask' in graph
+
+
+def test_remove_and_add(graph):
+    graph.remove('jinja2')
+
+    assert 'jinja2' not in graph
+    assert graph.get_dependents('markupsafe') == []
+    assert graph.get_dependencies('flask') == ['click', 'werkzeug']
+
+    graph.add('jinja2', 'jinja2')
+
+    assert graph.get_dependents('markupsafe') == ['jinja2']
+    assert graph.get_dependencies('flask') == ['click', 'jinja2', 'werkzeug']
+
+
+def test_add_replaces_requirements(graph):
+    REQUIRES['flask-login-new'] = ['Flask>=1.0.4']
+    try:
+        graph.add('flask-login', 'flask-login-new')
+    finally:
+        del REQUIRES['flask-login-new']
+
+    assert graph.requires['flask-login'] == [Requirement('flask', '>=1.0.4', None)]
+    assert graph.get_conflicts('flask', '2.0.0') == []
+
+
+def test_get_conflicts(graph):
+    assert graph.get_conflicts('flask', '1.1.2') == []
+    assert graph.get_conflicts('flask', '2.0.0') == [
+        Conflict('flask', '2.0.0', 'flask-login', '<2,>=1.0.4'),
+    ]
+    assert graph.get_conflicts('flask', '2.0.0', ignored=['flask-login']) == []
+
+
+def test_plan(graph):
+    plan = graph.plan({
+        'flask-login': '0.5.0', 'Flask': '2.0.0', 'MarkupSafe': '2.0.1', 'jinja2': '3.0.0',
+    })
+
+    assert plan.order == ['MarkupSafe', 'jinja2', 'Flask', 'flask-login']
+    assert plan.conflicts == []
+
+
+def test_plan_conflicts(graph):
+    plan = graph.plan({'flask': '2.0.0', 'werkzeug': '2.0.0'})
+
+    assert plan.order == ['werkzeug', 'flask']
+    assert plan.conflicts == [Conflict('flask', '2.0.0', 'flask-login', '<2,>=1.0.4')]
+
+
+def test_plan_cycle():
+    requires = {'a': ['b'], 'b': ['a'], 'c': ['a']}
+    graph = DependencyGraph(
+        [Installed(name, name) for name in requires],
+        read=lambda path: [depgraph.parse_requirement(r) for r in requires[path]],
+    )
+
+    assert graph.plan({'c': '1', 'b': '1', 'a': '1'}).order == ['a', 'b', 'c']
+
+
+def test_get_closure(graph):
+    assert graph.get_closure(['flask-login']) == {'flask-login', 'flask', 'werkzeug', 'jinja2', 'markupsafe', 'click'}
+    assert graph.get_closure(['Jinja2', 'not-installed']) == {'jinja2', 'markupsafe', 'not-installed'}
+
+
+def test_find_orphans(graph):
+    assert graph.find_orphans(['werkzeug']) == []
+    assert graph.find_orphans(['flask']) == ['click', 'jinja2', 'markupsafe', 'werkzeug']
+    assert graph.find_orphans(['flask-login']) == ['click', 'flask', 'jinja2', 'markupsafe', 'werkzeug']
+    assert graph.find_orphans(['flask-login', 'flask'], keep=lambda name: name == 'jinja2') == ['click', 'werkzeug']
+
+
+def test_find_orphans_shared_dependency():
+    requires = {'a': ['c'], 'b': ['c'], 'c': ['d'], 'd': []}
+    graph = DependencyGraph(
+        [Installed(name, name) for name in requires],
+        read=lambda path: [depgraph.parse_requirement(r) for r in requires[path]],
+    )
+
+    assert graph.find_orphans(['a']) == []
+    assert graph.find_orphans(['a', 'b']) == ['c', 'd']
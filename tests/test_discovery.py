@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from pip_manager.discovery import InstalledDistribution
+from pip_manager.discovery import _parse_entry_name
+from pip_manager.discovery import is_requested
+from pip_manager.discovery import iter_installed
+
+
+@pytest.mark.parametrize('entry, expected', [
+    ('Flask-1.0.2.dist-info', ('Flask', '1.0.2')),
+    ('zope.interface-4.5.0.dist-info', ('zope.interface', '4.5.0')),
+    ('Jinja2-2.10-py2.7.egg-info', ('Jinja2', '2.10')),
+    ('Pillow.egg-info', ('Pillow', None)),
+])
+def test_parse_entry_name(entry, expected):
+    assert _parse_entry_name(entry) == expected
+
+
+@pytest.fixture
+def site_packages(tmpdir):
+    site_packages = tmpdir.mkdir('site-packages')
+    site_packages.mkdir('Flask-1.0.2.dist-info').join('METADATA').write('Name: Flask\nVersion: 1.0.2\n')
+    site_packages.mkdir('zope.interface-4.5.0.dist-info')
+    site_packages.mkdir('Develop.egg-info').join('PKG-INFO').write('Metadata-Version: 1.0\nName: Develop\nVersion: 0.1.dev0\n')
+    site_packages.join('legacy-0.9-py2.7.egg-info').write('Metadata-Version: 1.0\nName: legacy\nVersion: 0.9\n')
+    site_packages.mkdir('Broken.egg-info')
+    site_packages.mkdir('flask')
+    return site_packages
+
+
+def test_iter_installed(site_packages):
+    assert [(d.name, d.version) for d in iter_installed([str(site_packages)])] == [
+        ('develop', '0.1.dev0'),
+        ('flask', '1.0.2'),
+        ('legacy', '0.9'),
+        ('zope-interface', '4.5.0'),
+    ]
+
+
+def test_iter_installed_first_wins(site_packages, tmpdir):
+    other = tmpdir.mkdir('other')
+    other.mkdir('flask-0.12.dist-info')
+
+    dists = list(iter_installed([str(other), str(tmpdir.join('missing')), str(site_packages)]))
+
+    assert dists[0] == InstalledDistribution('flask', '0.12', str(other.join('flask-0.12.dist-info')))
+    assert [d.name for d in dists].count('flask') == 1
+
+
+def test_iter_installed_is_lazy(site_packages, mocker):
+    mocked_listdir = mocker.patch('pip_manager.discovery.os.listdir', return_value=['a-1.0.dist-info'])
+
+    dists = iter_installed([str(site_packages), str(site_packages)])
+    next(dists)
+
+    assert mocked_listdir.call_count == 1
+
+
+def test_is_requested(tmpdir):
+    requested = tmpdir.mkdir('flask-1.0.2.dist-info')
+    requested.join('REQUESTED').write('')
+    dependency = tmpdir.mkdir('jinja2-2.10.dist-info')
+
+    assert is_requested(str(requested))
+    assert not is_requested(str(dependency))
+    assert is_requested(str(tmpdir.join('six-1.0.egg-info')))
+    assert is_requested('')
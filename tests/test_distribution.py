@@ -1,10 +1,10 @@
 # -*- coding: utf-8 -*-
+import json
 import sys
-from subprocess import CalledProcessError
-from subprocess import STDOUT
 
 import pytest
 
+from pip_manager.distribution import PENDING
 from pip_manager.distribution import Distribution
 
 
@@ -20,9 +20,9 @@ def test_init():
 
     assert d.name == 'flask'
     assert d.version == '1.0.0'
-    assert d.newest_version == '9.99.999'
+    assert d.newest_version == PENDING
     assert d.is_selected is False
-    assert d.get_newest_version.called
+    assert not d.get_newest_version.called
 
 
 @pytest.mark.parametrize('name1, ver1, name2, ver2, expected', [
@@ -35,23 +35,97 @@ def test_eq(name1, ver1, name2, ver2, expected):
     assert (Distribution(name=name1, version=ver1) == Distribution(name=name2, version=ver2)) is expected
 
 
+def test_eq_environments():
+    env = ('/venv/bin/python', 'venv', (), '22.0')
+
+    assert Distribution('flask', '1.0.0', env=env) == Distribution('flask', '1.0.0', env=env)
+    assert Distribution('flask', '1.0.0', env=env) != Distribution('flask', '1.0.0')
+
+
+def test_hash():
+    flask = Distribution(name='flask', version='1.0.0')
+    by_dist = {flask: 'flask', Distribution(name='pip', version='9.0.3'): 'pip'}
+
+    assert by_dist[Distribution(name='flask', version='1.0.0')] == 'flask'
+    flask.version = '1.0.2'
+    assert by_dist[flask] == 'flask'
+
+
+def test_slots():
+    d = Distribution(name='flask', version='1.0.0')
+
+    assert not hasattr(d, '__dict__')
+    with pytest.raises(AttributeError):
+        d.extra = True
+
+
+def test_interned():
+    d = Distribution(name=''.join(['fla', 'sk']), version=''.join(['1.0', '.0']))
+
+    assert d.name is getattr(sys, 'intern', lambda s: s)('flask')
+    assert d.version is Distribution(name='flask', version='1.0.0').version
+
+
+
+def test_unicode_name_and_version():
+    d = Distribution(name=json.loads('"flask"'), version=json.loads('"1.0.0"'))
+
+    assert d.name == 'flask'
+    assert d.version == '1.0.0'
+
+
+@pytest.mark.parametrize('version, newest_version, is_resolved, is_outdated', [
+    ('1.0.0', PENDING, False, False),
+    ('1.0.0', 'n/a', True, False),
+    ('1.0.0', '1.0.0', True, False),
+    ('1.0.0', '1.0.1', True, True),
+    ('1.0.0', '1.0', True, False),
+    ('1.0', '1.0.0', True, False),
+    ('2.0.0', '1.0.0', True, False),
+    ('1.0.0', '1.0.0.post1', True, True),
+])
+def test_is_resolved_is_outdated(version, newest_version, is_resolved, is_outdated):
+    d = Distribution(name='flask', version=version, newest_version=newest_version)
+    assert d.is_resolved is is_resolved
+    assert d.is_outdated is is_outdated
+
+
+
+def test_is_vulnerable():
+    d = Distribution(name='flask', version='1.0.0')
+    assert d.advisories == ()
+    assert d.is_vulnerable is False
+
+    d.advisories = ('PYSEC-2023-62',)
+    assert d.is_vulnerable is True
+
+
 @pytest.mark.dont_use_mocked_get_newest_version
-@pytest.mark.parametrize('name, versions, expected', [
-    ('pip', '10.0.0b2, 10.0.0, 10.0.1', '10.0.1'),
-    ('pip', '10.0.0b2, 10.0.0, 10.0.1, 10.0.2a', '10.0.1'),
-    ('pip', '10.0.0b2', '10.0.0b2'),
-    ('pip', '', 'n/a'),
+@pytest.mark.parametrize('versions, expected', [
+    (['10.0.0b2', '10.0.0', '10.0.1'], '10.0.1'),
+    (['10.0.1', '10.0.0b2', '10.0.0', '9.0.3'], '10.0.1'),
+    (['10.0.0b2', '10.0.0', '10.0.1', '10.0.2a'], '10.0.1'),
+    (['10.0.0b2'], '10.0.0b2'),
+    (['3.2.3.post1', '3.2.3.post2'], '3.2.3.post2'),
+    (['1.9', '1.10', '1.10.dev1'], '1.10'),
+    ([], 'n/a'),
 ])
-def test_get_newest_version(name, versions, expected, mocker):
-    mocked_subprocess = mocker.patch('pip_manager.distribution.subprocess')
-    mocked_subprocess.check_output.side_effect = CalledProcessError(
-        returncode=1,
-        cmd='dummy cmd',
-        output=(
-            'ERROR: Could not find a version that satisfies the requirement {0}==lxPhr_ffmS3fZ3E4P7U1Lw '
-            '(from versions: {1})\nERROR: No matching distribution found for {0}==lxPhr_ffmS3fZ3E4P7U1Lw\n'.format(name, versions)
-        ).encode(),
-    )
-    d = Distribution(name=name, version='1.0.0')
-    assert d.newest_version == expected
-    mocked_subprocess.check_output.assert_called_with([sys.executable, '-m', 'pip', 'install', '{}==lxPhr_ffmS3fZ3E4P7U1Lw'.format(name)], stderr=STDOUT)
+def test_get_newest_version(versions, expected, mocker):
+    mocked_get_version_source = mocker.patch('pip_manager.distribution.get_version_source')
+    mocked_get_version_source.return_value.get_versions.return_value = versions
+
+    d = Distribution(name='pip', version='1.0.0')
+
+    assert d.get_newest_version() == expected
+    mocked_get_version_source.return_value.get_versions.assert_called_with('pip')
+
+
+@pytest.mark.dont_use_mocked_get_newest_version
+def test_get_newest_version_prereleases(mocker):
+    mocked_get_version_source = mocker.patch('pip_manager.distribution.get_version_source')
+    mocked_get_version_source.return_value.get_versions.return_value = ['10.0.0', '10.0.1rc1']
+    mocker.patch.object(Distribution, 'allow_prereleases', True)
+
+    d = Distribution(name='pip', version='1.0.0')
+
+    assert d.get_newest_version() == '10.0.1rc1'
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+
+import pytest
+
+from pip_manager import environment
+from pip_manager.discovery import InstalledDistribution
+from pip_manager.environment import Environment
+from pip_manager.environment import InvalidEnvironment
+
+
+def test_find_python_interpreter():
+    assert environment.find_python('python3') == 'python3'
+
+
+@pytest.mark.parametrize('relative_path', [
+    ['bin', 'python'],
+    ['Scripts', 'python.exe'],
+])
+def test_find_python_venv(relative_path, tmpdir):
+    python = tmpdir.join(*relative_path).ensure()
+
+    assert environment.find_python(str(tmpdir)) == str(python)
+
+
+def test_find_python_not_found(tmpdir):
+    with pytest.raises(InvalidEnvironment):
+        environment.find_python(str(tmpdir))
+
+
+def test_probe_environment():
+    env = environment.probe_environment(sys.executable)
+
+    assert env.python == sys.executable
+    assert env.label == os.path.normpath(sys.prefix)
+    assert os.path.dirname(os.__file__) in env.paths
+    assert '' not in env.paths
+    assert env.pip_version is not None
+
+
+def test_probe_environment_broken(tmpdir):
+    with pytest.raises(InvalidEnvironment):
+        environment.probe_environment(str(tmpdir.join('python')))
+
+
+def test_discover_environments(mocker, tmpdir):
+    site_packages = tmpdir.mkdir('site-packages')
+    site_packages.mkdir('flask-1.0.2.dist-info')
+    envs = {
+        'a': Environment('a', 'a', (str(site_packages),), '22.0'),
+        'b': Environment('b', 'b', (), '22.0'),
+    }
+    mocker.patch('pip_manager.environment.probe_environment', side_effect=envs.get)
+
+    discovered = environment.discover_environments(['a', 'b', 'a'], workers=2)
+
+    assert discovered == [
+        (envs['a'], [InstalledDistribution('flask', '1.0.2', str(site_packages.join('flask-1.0.2.dist-info')))]),
+        (envs['b'], []),
+    ]
+
+
+@pytest.mark.parametrize('prefixes, expected', [
+    ([], []),
+    (['/usr'], ['usr']),
+    (['/venvs/a', '/venvs/b'], ['a', 'b']),
+    (['/tmp/a/.venv', '/tmp/b/.venv', '/srv/app'], ['a/.venv', 'b/.venv', 'app']),
+    (['/x/a/.venv', '/y/a/.venv'], ['x/a/.venv', 'y/a/.venv']),
+    (['/venv', '/opt/venv'], ['/venv', 'opt/venv']),
+])
+def test_shorten_labels(prefixes, expected):
+    prefixes = [p.replace('/', os.sep) for p in prefixes]
+    assert environment.shorten_labels(prefixes) == [e.replace('/', os.sep) for e in expected]
+
+
+def test_discover_environments_same_basename(mocker):
+    envs = {
+        'a': Environment('a', os.path.join(os.sep, 'tmp', 'a', '.venv'), ('a',), '22.0'),
+        'b': Environment('b', os.path.join(os.sep, 'tmp', 'b', '.venv'), ('b',), '22.0'),
+    }
+    mocker.patch('pip_manager.environment.probe_environment', side_effect=envs.get)
+    mocker.patch('pip_manager.environment.iter_installed', return_value=iter([]))
+
+    discovered = environment.discover_environments(['a', 'b'], workers=2)
+
+    assert [env.label for env, _ in discovered] == [os.path.join('a', '.venv'), os.path.join('b', '.venv')]
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from pip_manager.distribution import Distribution
+from pip_manager.gui import Gui
+from pip_manager.viewport import ColumnWidths
+
+
+@pytest.fixture
+def gui(mocker):
+    mocked_curses = mocker.patch('pip_manager.gui.curses')
+    mocked_curses.newwin.side_effect = lambda *args: mocker.MagicMock()
+    mocked_curses.initscr.return_value.getmaxyx.return_value = (20, 79)
+    gui = Gui(line_width=79)
+    yield gui
+    gui.stdscr = None
+
+
+@pytest.fixture
+def dists():
+    return [
+        Distribution(name='flask', version='1.0.0', newest_version='1.0.2'),
+        Distribution(name='pip', version='9.0.3', newest_version='9.0.3'),
+        Distribution(name='pytest', version='3.5.0'),
+    ]
+
+
+@pytest.fixture
+def widths(dists):
+    return ColumnWidths(dists)
+
+
+def drawn_rows(gui):
+    return [c[0][0] for c in gui.dist_win.move.call_args_list]
+
+
+def test_draw_distributions_first_frame(mocker, gui, dists, widths):
+    gui.draw_distributions(dists, 0, 3, 0, widths)
+
+    assert drawn_rows(gui)[:gui.dist_win_height] == list(range(gui.dist_win_height))
+    gui.dist_win.addnstr.assert_any_call(0, 0, '[ ] flask   1.0.0', 78)
+    gui.dist_win.chgat.assert_called_once_with(0, 3, mocker.ANY)
+    assert gui.page_win.addstr.called
+    assert gui.menu_win.addstr.called
+
+
+def test_draw_distributions_unchanged_frame(gui, dists, widths):
+    gui.draw_distributions(dists, 0, 3, 0, widths)
+    gui.dist_win.reset_mock()
+    gui.page_win.reset_mock()
+    gui.menu_win.reset_mock()
+
+    gui.draw_distributions(dists, 0, 3, 0, widths)
+
+    assert drawn_rows(gui) == [0]  # cursor placement only
+    assert not gui.dist_win.addnstr.called
+    assert not gui.page_win.addstr.called
+    assert not gui.menu_win.addstr.called
+
+
+def test_draw_distributions_cursor_moved(mocker, gui, dists, widths):
+    gui.draw_distributions(dists, 0, 3, 0, widths)
+    gui.dist_win.reset_mock()
+
+    gui.draw_distributions(dists, 0, 3, 1, widths)
+
+    assert drawn_rows(gui) == [0, 1, 1]
+    gui.dist_win.chgat.assert_called_once_with(1, 3, mocker.ANY)
+
+
+def test_draw_distributions_resolved(gui, dists, widths):
+    gui.draw_distributions(dists, 0, 3, 0, widths, '2/3 checked')
+    gui.dist_win.reset_mock()
+    gui.page_win.reset_mock()
+
+    dists[2].newest_version = '3.6.0'
+    gui.draw_distributions(dists, 0, 3, 0, widths)
+
+    assert drawn_rows(gui) == [2, 0]
+    gui.page_win.addstr.assert_called_once_with('Rows: 1-3/3')
+
+
+def test_draw_popup_invalidates_frame(gui, dists, widths):
+    gui.draw_distributions(dists, 0, 3, 0, widths)
+    gui.draw_popup('Upgrading 1 package(s)')
+    gui.dist_win.reset_mock()
+
+    gui.draw_distributions(dists, 0, 3, 0, widths)
+
+    assert drawn_rows(gui)[:gui.dist_win_height] == list(range(gui.dist_win_height))
+
+
+def test_draw_popup(gui):
+    gui.draw_popup('Upgrade plan:\n  flask 1.0.0 -> 1.0.2\nProceed? [y/N]')
+
+    gui.popup_win.resize.assert_called_with(5, 35)
+    assert [c[0] for c in gui.popup_win.addnstr.call_args_list] == [
+        (1, 1, 'Upgrade plan:', 33),
+        (2, 1, '  flask 1.0.0 -> 1.0.2', 33),
+        (3, 1, 'Proceed? [y/N]', 33),
+    ]
+
+
+def test_draw_popup_too_many_lines(gui):
+    lines = ['line {}'.format(i) for i in range(30)] + ['Proceed? [y/N]']
+
+    gui.draw_popup('\n'.join(lines))
+
+    gui.popup_win.resize.assert_called_with(19, 35)
+    drawn = [c[0][2] for c in gui.popup_win.addnstr.call_args_list]
+    assert drawn[0] == 'line 0'
+    assert drawn[-2:] == ['  ... (15 more)', 'Proceed? [y/N]']
+    assert len(drawn) == 17
+
+
+def test_draw_jobs(mocker, gui, dists, widths):
+    height = gui.dist_win_height
+    gui.draw_distributions(dists, 0, 3, 0, widths)
+    assert gui.jobs_win is None
+
+    gui.set_jobs([('running    3s  #1 upgrade flask', 0), ('    Collecting flask', 1)])
+    gui.draw_distributions(dists, 0, 3, 0, widths)
+
+    assert gui.dist_win_height == height - 2
+    gui.dist_win.resize.assert_called_with(height - 2, 79)
+    assert [c[0] for c in gui.jobs_win.addnstr.call_args_list] == [
+        (0, 0, 'running    3s  #1 upgrade flask', 78, 0),
+        (1, 0, '    Collecting flask', 78, 1),
+    ]
+
+    gui.jobs_win.reset_mock()
+    gui.draw_distributions(dists, 0, 3, 0, widths)
+    assert not gui.jobs_win.addnstr.called
+
+
+def test_set_jobs_keeps_one_row(gui):
+    gui.set_jobs([('job', 0)] * 50)
+
+    assert gui.dist_win_height == 1
+
+
+def test_draw_advisories(mocker, gui, dists, widths):
+    dists[0].advisories = ('PYSEC-2023-62', 'GHSA-m2qf-hxjv-5gpq')
+    dists[1].advisories = ('PYSEC-2019-1',)
+
+    gui.draw_distributions(dists, 0, 3, 0, widths)
+
+    gui.dist_win.addnstr.assert_any_call(0, 60, '! PYSEC-2023-62 +1', 18, mocker.ANY)
+    gui.dist_win.addnstr.assert_any_call(1, 64, '! PYSEC-2019-1', 14, mocker.ANY)
+    assert len([c for c in gui.dist_win.addnstr.call_args_list if c[0][0] == 2]) == 1
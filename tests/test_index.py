@@ -0,0 +1,388 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+try:
+    from http.server import HTTPServer
+    from http.server import SimpleHTTPRequestHandler
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import HTTPServer
+    from SimpleHTTPServer import SimpleHTTPRequestHandler
+    from SocketServer import ThreadingMixIn
+
+from pip_manager import index
+from pip_manager.cache import CacheEntry
+from pip_manager.index import ConnectionPool
+from pip_manager.index import LocalSource
+from pip_manager.index import PipSource
+from pip_manager.index import SimpleIndexSource
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class LocalIndex(object):
+    """Serves "simple" index from a temporary directory."""
+
+    def __init__(self, root):
+        self.root = root
+        self.client_ports = set()
+        self.requests = []
+
+        local_index = self
+
+        class Handler(SimpleHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def translate_path(self, path):
+                path = path.split('?', 1)[0]
+                return os.path.join(local_index.root, *path.strip('/').split('/'))
+
+            def send_head(self):
+                local_index.client_ports.add(self.client_address[1])
+                local_index.requests.append(self.path)
+                json_path = os.path.join(self.translate_path(self.path), 'index.json')
+                if index.JSON_CONTENT_TYPE in self.headers.get('Accept', '') and os.path.exists(json_path):
+                    with open(json_path, 'rb') as f:
+                        body = f.read()
+                    self.send_response(200)
+                    self.send_header('Content-Type', index.JSON_CONTENT_TYPE)
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return None
+                return SimpleHTTPRequestHandler.send_head(self)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = 'http://127.0.0.1:{}/simple/'.format(self.server.server_address[1])
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def add_html_project(self, name, filenames):
+        links = ''.join(
+            '<a href="../../files/{0}#sha256=0">{0}</a><br/>'.format(f) for f in filenames
+        )
+        self._write(name, 'index.html', '<html><body>{}</body></html>'.format(links))
+
+    def add_json_project(self, name, files):
+        self._write(name, 'index.json', json.dumps({
+            'meta': {'api-version': '1.0'},
+            'name': name,
+            'files': files,
+        }))
+
+    def _write(self, name, filename, content):
+        project_dir = os.path.join(self.root, 'simple', name)
+        if not os.path.isdir(project_dir):
+            os.makedirs(project_dir)
+        with open(os.path.join(project_dir, filename), 'w') as f:
+            f.write(content)
+
+    def shutdown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def local_index(tmpdir):
+    local_index = LocalIndex(str(tmpdir))
+    yield local_index
+    local_index.shutdown()
+
+
+@pytest.mark.parametrize('filename, expected', [
+    ('Flask-1.0.2-py2.py3-none-any.whl', '1.0.2'),
+    ('Flask-1.0.2.tar.gz', '1.0.2'),
+    ('flask-0.12.zip', '0.12'),
+    ('Flask-0.10.1-py2.7.egg', '0.10.1'),
+    ('Flask-0.10.1.win32.exe', None),
+    ('flask-extras-1.0.tar.gz', None),
+    ('other-1.0.tar.gz', None),
+])
+def test_version_from_filename(filename, expected):
+    assert index._version_from_filename(filename, 'flask') == expected
+
+
+def test_version_from_filename_dashed_name():
+    assert index._version_from_filename('zope.interface-4.5.0.tar.gz', 'zope-interface') == '4.5.0'
+
+
+@pytest.mark.parametrize('filename, expected', [
+    ('Flask-1.0.2-py2.py3-none-any.whl', ('flask', '1.0.2')),
+    ('zope.interface-4.5.0.tar.gz', ('zope-interface', '4.5.0')),
+    ('flask-extras-1.0.tar.gz', ('flask-extras', '1.0')),
+    ('Flask-0.10.1-py2.7.egg', ('flask', '0.10.1')),
+    ('Flask-0.10.1.win32.exe', None),
+    ('README.txt', None),
+    ('flask.tar.gz', None),
+])
+def test_split_filename(filename, expected):
+    assert index._split_filename(filename) == expected
+
+
+def test_parse_html_page_skips_yanked():
+    body = (
+        b'<a href="a/flask-1.0.tar.gz">flask-1.0.tar.gz</a>'
+        b'<a href="a/flask-1.1.tar.gz" data-yanked="">flask-1.1.tar.gz</a>'
+        b'<a href="a/flask-1.2-py3-none-any.whl"></a>'
+    )
+    assert index.parse_html_page(body, 'flask') == ['1.0', '1.2']
+
+
+def test_parse_json_page_skips_yanked():
+    body = json.dumps({'files': [
+        {'filename': 'flask-1.0.tar.gz'},
+        {'filename': 'flask-1.0-py3-none-any.whl'},
+        {'filename': 'flask-1.1.tar.gz', 'yanked': 'broken'},
+    ]}).encode()
+    assert index.parse_json_page(body, 'flask') == ['1.0']
+
+
+def test_simple_index_source_html(local_index):
+    local_index.add_html_project('flask', ['Flask-0.12.tar.gz', 'Flask-1.0.2-py2.py3-none-any.whl'])
+    source = SimpleIndexSource(index_urls=[local_index.url])
+
+    assert source.get_versions('Flask') == ['0.12', '1.0.2']
+
+
+def test_simple_index_source_json(local_index):
+    local_index.add_html_project('flask', ['Flask-0.1.tar.gz'])
+    local_index.add_json_project('flask', [{'filename': 'Flask-1.0.2.tar.gz'}])
+    source = SimpleIndexSource(index_urls=[local_index.url])
+
+    assert source.get_versions('flask') == ['1.0.2']
+
+
+def test_simple_index_source_missing_project(local_index):
+    source = SimpleIndexSource(index_urls=[local_index.url])
+
+    assert source.query(local_index.url, 'flask') is None
+    assert source.get_versions('flask') == []
+
+
+def test_simple_index_source_extra_index(local_index, tmpdir):
+    extra_index = LocalIndex(str(tmpdir.mkdir('extra')))
+    try:
+        local_index.add_html_project('flask', ['Flask-1.0.tar.gz'])
+        extra_index.add_html_project('flask', ['Flask-1.0.tar.gz', 'Flask-2.0.tar.gz'])
+        source = SimpleIndexSource(index_urls=[local_index.url, extra_index.url])
+
+        assert source.get_versions('flask') == ['1.0', '2.0']
+    finally:
+        extra_index.shutdown()
+
+
+def test_simple_index_source_reuses_connection(local_index):
+    for name in ('flask', 'pytest', 'pip'):
+        local_index.add_html_project(name, ['{}-1.0.tar.gz'.format(name)])
+    source = SimpleIndexSource(index_urls=[local_index.url])
+
+    for name in ('flask', 'pytest', 'pip'):
+        assert source.get_versions(name) == ['1.0']
+
+    assert len(local_index.requests) == 3
+    assert len(local_index.client_ports) == 1
+
+
+def test_connection_pool_follows_redirects(mocker):
+    pool = ConnectionPool()
+    mocker.patch.object(pool, '_request_once', side_effect=[
+        (301, {'location': '/simple/flask/'}, b''),
+        (200, {}, b'ok'),
+    ])
+
+    assert pool.request('http://example.com/simple/Flask/') == ('http://example.com/simple/flask/', 200, {}, b'ok')
+
+
+@pytest.fixture
+def pip_config(mocker, tmpdir):
+    for env_var in ('PIP_INDEX_URL', 'PIP_EXTRA_INDEX_URL', 'PIP_NO_INDEX'):
+        mocker.patch.dict(os.environ, {env_var: ''})
+        del os.environ[env_var]
+    config = tmpdir.join('pip.conf')
+    mocker.patch('pip_manager.index._get_pip_config_files').return_value = [str(config)]
+    return config
+
+
+@pytest.mark.parametrize('content, env, expected', [
+    ('', {}, [index.PYPI_SIMPLE_URL]),
+    ('[global]\nindex-url = http://a/simple\n', {}, ['http://a/simple']),
+    ('[global]\nindex-url = http://a/simple\n[install]\nindex-url = http://b/simple\n', {}, ['http://b/simple']),
+    ('[global]\nextra-index-url =\n    http://b/simple\n    http://c/simple\n', {}, [index.PYPI_SIMPLE_URL, 'http://b/simple', 'http://c/simple']),
+    ('[global]\nindex-url = http://a/simple\n', {'PIP_INDEX_URL': 'http://d/simple'}, ['http://d/simple']),
+    ('', {'PIP_EXTRA_INDEX_URL': 'http://b/simple http://c/simple'}, [index.PYPI_SIMPLE_URL, 'http://b/simple', 'http://c/simple']),
+    ('[global]\nno-index = true\n', {}, []),
+])
+def test_get_pip_index_urls(content, env, expected, pip_config, mocker):
+    pip_config.write(content)
+    mocker.patch.dict(os.environ, env)
+    assert index.get_pip_index_urls() == expected
+
+
+@pytest.mark.parametrize('versions, expected', [
+    ('10.0.0b2, 10.0.0, 10.0.1', ['10.0.0b2', '10.0.0', '10.0.1']),
+    ('', []),
+])
+def test_pip_source(versions, expected, mocker):
+    mocked_run_pip = mocker.patch('pip_manager.index.run_pip')
+    mocked_run_pip.return_value = (1, (
+        'ERROR: Could not find a version that satisfies the requirement {0}==lxPhr_ffmS3fZ3E4P7U1Lw '
+        '(from versions: {1})\nERROR: No matching distribution found for {0}==lxPhr_ffmS3fZ3E4P7U1Lw\n'.format('pip', versions)
+    ))
+
+    assert PipSource().get_versions('pip') == expected
+    mocked_run_pip.assert_called_with(sys.executable, ['install', 'pip==lxPhr_ffmS3fZ3E4P7U1Lw'])
+
+
+@pytest.fixture
+def wheelhouse(tmpdir):
+    wheelhouse = tmpdir.mkdir('wheels')
+    for filename in ('Flask-1.0.2-py2.py3-none-any.whl', 'Flask-1.0.2.tar.gz', 'flask-0.12.zip',
+                     'pytest-3.5.0-py2.py3-none-any.whl', 'notes.txt'):
+        wheelhouse.join(filename).write('')
+    return wheelhouse
+
+
+@pytest.fixture
+def mirror(tmpdir):
+    mirror = tmpdir.mkdir('simple')
+    mirror.mkdir('flask').join('index.html').write(
+        '<html><body><a href="../../packages/Flask-2.0.0.tar.gz#sha256=0">Flask-2.0.0.tar.gz</a>'
+        '<a href="../../packages/Flask-1.0.2.tar.gz#sha256=0">Flask-1.0.2.tar.gz</a></body></html>'
+    )
+    return mirror
+
+
+def test_local_source_find_links(wheelhouse):
+    source = LocalSource([str(wheelhouse)])
+
+    assert source.get_versions('Flask') == ['1.0.2', '0.12']
+    assert source.get_versions('pytest') == ['3.5.0']
+    assert source.get_versions('pip') == []
+    assert source.pip_args == ['--no-index', '--find-links', str(wheelhouse)]
+
+
+def test_local_source_lists_directories_once(mocker, wheelhouse):
+    source = LocalSource([str(wheelhouse)])
+    mocked_listdir = mocker.patch('pip_manager.index.os.listdir', side_effect=os.listdir)
+
+    source.get_versions('flask')
+    source.get_versions('pytest')
+    source.get_versions('pip')
+
+    mocked_listdir.assert_called_once_with(str(wheelhouse))
+
+
+def test_local_source_mirror(wheelhouse, mirror):
+    source = LocalSource(['file://' + str(wheelhouse)], mirror=str(mirror))
+
+    assert source.get_versions('flask') == ['1.0.2', '0.12', '2.0.0']
+    assert source.get_versions('pip') == []
+    assert source.pip_args == ['--index-url', 'file://' + str(mirror), '--find-links', str(wheelhouse)]
+
+
+def test_local_source_missing_directories(tmpdir):
+    source = LocalSource([str(tmpdir.join('missing'))], mirror=str(tmpdir.join('missing')))
+
+    assert source.get_versions('flask') == []
+
+
+def test_get_version_source_local(mocker):
+    mocker.patch('pip_manager.index._version_source', None)
+    mocker.patch('pip_manager.index.get_find_links').return_value = ['/wheels']
+    mocker.patch('pip_manager.index.get_mirror').return_value = None
+
+    source = index.get_version_source()
+
+    assert isinstance(source, LocalSource)
+    assert source.find_links == ['/wheels']
+
+
+@pytest.mark.parametrize('source_name, expected_cls', [
+    ('index', SimpleIndexSource),
+    ('pip', PipSource),
+])
+def test_get_version_source(source_name, expected_cls, mocker):
+    mocker.patch('pip_manager.index._version_source', None)
+    mocker.patch('pip_manager.index.get_find_links').return_value = []
+    mocker.patch('pip_manager.index.get_mirror').return_value = None
+    mocker.patch('pip_manager.index.get_version_source_name').return_value = source_name
+    mocker.patch('pip_manager.index.get_pip_index_urls').return_value = []
+
+    source = index.get_version_source()
+
+    assert isinstance(source, expected_cls)
+    assert index.get_version_source() is source
+
+
+class DummyCache(dict):
+    ttl = 60
+
+    def get(self, index_url, name):
+        return dict.get(self, (index_url, name))
+
+    def put(self, index_url, name, entry):
+        self[(index_url, name)] = entry
+
+
+def test_simple_index_source_cache_fresh(local_index):
+    cache = DummyCache()
+    cache.put(local_index.url, 'flask', CacheEntry(['0.1'], time.time(), None, None))
+    source = SimpleIndexSource(index_urls=[local_index.url], cache=cache)
+
+    assert source.get_versions('flask') == ['0.1']
+    assert local_index.requests == []
+
+
+def test_simple_index_source_cache_stores(local_index):
+    local_index.add_html_project('flask', ['Flask-1.0.tar.gz'])
+    cache = DummyCache()
+    source = SimpleIndexSource(index_urls=[local_index.url], cache=cache)
+
+    assert source.get_versions('flask') == ['1.0']
+    entry = cache.get(local_index.url, 'flask')
+    assert entry.versions == ['1.0']
+    assert entry.last_modified
+
+
+def test_simple_index_source_cache_revalidates(local_index):
+    local_index.add_html_project('flask', ['Flask-1.0.tar.gz'])
+    cache = DummyCache()
+    source = SimpleIndexSource(index_urls=[local_index.url], cache=cache)
+    source.get_versions('flask')
+    stale_entry = cache.get(local_index.url, 'flask')._replace(versions=['0.1'], fetched_at=0)
+    cache.put(local_index.url, 'flask', stale_entry)
+
+    assert source.get_versions('flask') == ['0.1']
+    assert len(local_index.requests) == 2
+    assert cache.get(local_index.url, 'flask').fetched_at > 0
+
+
+def test_simple_index_source_cache_refresh(local_index):
+    local_index.add_html_project('flask', ['Flask-1.0.tar.gz'])
+    cache = DummyCache()
+    cache.put(local_index.url, 'flask', CacheEntry(['0.1'], time.time(), None, None))
+    source = SimpleIndexSource(index_urls=[local_index.url], cache=cache)
+    source.refresh = True
+
+    assert source.get_versions('flask') == ['1.0']
+    assert cache.get(local_index.url, 'flask').versions == ['1.0']
+
+
+def test_simple_index_source_cache_stale_when_unreachable(local_index):
+    cache = DummyCache()
+    cache.put(local_index.url, 'flask', CacheEntry(['0.1'], 0, None, None))
+    source = SimpleIndexSource(index_urls=[local_index.url], cache=cache)
+
+    assert source.get_versions('flask') == ['0.1']
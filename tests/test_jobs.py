@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+import os
+import threading
+
+import pytest
+
+from pip_manager import jobs
+from pip_manager.commands import InstallResult
+from pip_manager.jobs import Job
+from pip_manager.jobs import JobQueue
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(mocker, tmpdir):
+    mocker.patch('pip_manager.jobs.get_cache_dir').return_value = str(tmpdir)
+    return tmpdir
+
+
+def make_run(lines, returncode=0):
+    def run(on_line):
+        for line in lines:
+            on_line(line + '\n')
+        return InstallResult(returncode, {}, '\n'.join(lines))
+    return run
+
+
+def test_job_run():
+    job = Job('upgrade', [], make_run(['Collecting flask', 'Successfully installed flask-1.0.2']))
+
+    assert job.state == jobs.QUEUED
+    assert job.elapsed == 0.0
+
+    job.run()
+
+    assert job.state == jobs.DONE
+    assert job.result.returncode == 0
+    assert job.log == ['Collecting flask', 'Successfully installed flask-1.0.2']
+    assert job.log_path is None
+    assert job.elapsed >= 0
+
+
+def test_job_run_trims_log():
+    job = Job('upgrade', [], make_run([str(i) for i in range(100)]))
+
+    job.run()
+
+    assert job.log == [str(i) for i in range(100 - jobs.TAIL_LINES, 100)]
+
+
+def test_job_run_failed_keeps_log(cache_dir):
+    lines = [str(i) for i in range(100)]
+    job = Job('upgrade', [], make_run(lines, returncode=1))
+    job.id = 7
+
+    job.run()
+
+    assert job.state == jobs.FAILED
+    assert job.log == lines
+    assert os.path.dirname(job.log_path) == str(cache_dir.join('logs'))
+    assert job.log_path.endswith('-7.log')
+    with open(job.log_path) as f:
+        assert f.read().splitlines() == lines
+
+
+def test_job_run_exception(mocker):
+    mocker.patch('pip_manager.jobs.get_cache_dir').return_value = os.devnull  # cannot create directory in it
+
+    def run(on_line):
+        on_line('Collecting flask')
+        raise OSError('pip not found')
+
+    job = Job('remove', [], run)
+
+    job.run()
+
+    assert job.state == jobs.FAILED
+    assert job.result is None
+    assert job.log[0] == 'Collecting flask'
+    assert job.log[-1] == 'OSError: pip not found'
+    assert job.log_path is None
+
+
+def test_get_tail():
+    job = Job('upgrade', [], None)
+    for line in ['a', '', 'b', '  ', 'c']:
+        job.add_line(line)
+
+    assert job.get_tail(2) == ['b', 'c']
+    assert job.get_tail() == ['a', 'b', 'c']
+
+
+def test_queue_runs_jobs_in_order():
+    started = []
+    release = threading.Event()
+
+    def run(name):
+        def run_job(on_line):
+            started.append(name)
+            release.wait()
+            return InstallResult(0, {}, '')
+        return run_job
+
+    queue = JobQueue()
+    first = queue.submit(Job('upgrade', [], run('first')))
+    second = queue.submit(Job('remove', [], run('second')))
+
+    assert (first.id, second.id) == (1, 2)
+    assert queue.is_busy
+    assert queue.drain() == []
+
+    release.set()
+    queue.wait()
+
+    assert started == ['first', 'second']
+    assert queue.is_busy
+    assert queue.drain() == [first, second]
+    assert not queue.is_busy
+    assert queue.drain() == []
+
+
+def test_queue_last_failed():
+    queue = JobQueue()
+    failed = queue.submit(Job('upgrade', [], make_run([], returncode=1)))
+    queue.submit(Job('upgrade', [], make_run([])))
+    queue.wait()
+
+    assert queue.last_failed is failed
+
+
+def test_queue_history_keeps_failed():
+    queue = JobQueue(history=2)
+    failed = queue.submit(Job('upgrade', [], make_run([], returncode=1)))
+    queue.wait()
+    for _ in range(3):
+        queue.submit(Job('upgrade', [], make_run([])))
+        queue.wait()
+
+    assert len(queue.jobs) == 2
+    assert queue.jobs[0] is failed
+    assert queue.get_recent(1) == [queue.jobs[-1]]
+    assert queue.get_recent(0) == []
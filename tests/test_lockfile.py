@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+import json
+
+import pytest
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+from pip_manager.app import SyncPlan
+from pip_manager.distribution import Distribution
+from pip_manager.environment import Environment
+from pip_manager.jobs import DONE
+from pip_manager.jobs import FAILED
+from pip_manager.lockfile import InvalidLockfile
+from pip_manager.lockfile import LockedDistribution
+from pip_manager.lockfile import dump_lockfile
+from pip_manager.lockfile import export_lockfile
+from pip_manager.lockfile import load_lockfile
+from pip_manager.lockfile import sync_lockfile
+
+ENV = Environment('/a/bin/python', 'a', ('/a',), '22.0')
+
+
+@pytest.mark.parametrize('with_env_label, env_label', [
+    (False, None),
+    (True, 'a'),
+])
+def test_dump_and_load_lockfile(with_env_label, env_label):
+    out = StringIO()
+
+    dump_lockfile([
+        Distribution(name='flask', version='1.0.0', newest_version='1.0.2', env=ENV),
+        Distribution(name='pip', version='9.0.3', newest_version='n/a', env=ENV),
+    ], out, with_env_label)
+
+    data = json.loads(out.getvalue())
+    assert data['lockfile_version'] == 1
+    assert 'created' in data and 'python' in data
+    out.seek(0)
+    assert load_lockfile(out) == [
+        LockedDistribution('flask', '1.0.0', '1.0.2', env_label),
+        LockedDistribution('pip', '9.0.3', 'n/a', env_label),
+    ]
+
+
+@pytest.mark.parametrize('content, message', [
+    ('not json', 'Invalid lockfile: '),
+    ('[]', 'Unsupported lockfile version (expected 1)'),
+    ('{"lockfile_version": 2, "packages": []}', 'Unsupported lockfile version (expected 1)'),
+    ('{"lockfile_version": 1, "packages": [{"name": "flask"}]}', 'Invalid lockfile entry: {"name": "flask"}'),
+])
+def test_load_lockfile_invalid(content, message):
+    with pytest.raises(InvalidLockfile) as e:
+        load_lockfile(StringIO(content))
+
+    assert str(e.value).startswith(message)
+
+
+def test_export_lockfile(mocker):
+    pm = mocker.Mock(environments=None, distributions=[
+        Distribution(name='flask', version='1.0.0', newest_version='1.0.2'),
+    ])
+    pm.resolver.iter_resolved.return_value = iter(pm.distributions)
+    out = StringIO()
+
+    assert export_lockfile(pm, out) == 0
+    assert json.loads(out.getvalue())['packages'] == [
+        {'name': 'flask', 'version': '1.0.0', 'newest_version': '1.0.2'},
+    ]
+
+
+@pytest.fixture
+def pm(mocker):
+    installed = {
+        'flask': Distribution(name='flask', version='1.0.0', env=ENV),
+        'pytest': Distribution(name='pytest', version='3.5.0', env=ENV),
+    }
+    pm = mocker.Mock()
+    pm.get_distribution.side_effect = lambda name, env=None: installed.get(name)
+    pm.plan_sync.return_value = [SyncPlan(
+        ENV, [('flask', '1.0.2'), ('six', '1.16.0')], [installed['pytest']],
+    )]
+    return pm
+
+
+def test_sync_lockfile_dry_run(pm):
+    out = StringIO()
+
+    assert sync_lockfile(pm, [], dry_run=True, out=out) == 0
+    assert out.getvalue().splitlines() == [
+        '- pytest 3.5.0 (a)',
+        '~ flask 1.0.0 -> 1.0.2 (a)',
+        '+ six 1.16.0 (a)',
+    ]
+    assert not pm.sync_distributions.called
+
+
+def test_sync_lockfile(mocker, pm):
+    pm.sync_distributions.return_value = [
+        mocker.Mock(kind='remove', env=ENV, state=DONE),
+        mocker.Mock(kind='upgrade', env=ENV, state=FAILED, log_path='/logs/job.log'),
+    ]
+    out = StringIO()
+
+    assert sync_lockfile(pm, [], out=out) == 1
+    pm.sync_distributions.assert_called_with(pm.plan_sync.return_value)
+    assert pm.jobs.wait.called
+    assert pm.apply_finished_jobs.called
+    assert out.getvalue().splitlines()[-1] == 'pip install failed (a) - see /logs/job.log'
+
+
+def test_sync_lockfile_in_sync(pm):
+    pm.plan_sync.return_value = [SyncPlan(None, [], [])]
+    out = StringIO()
+
+    assert sync_lockfile(pm, [], out=out) == 0
+    assert out.getvalue() == 'Already in sync.\n'
+    assert not pm.sync_distributions.called
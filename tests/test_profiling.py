@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+import io
+import json
+
+import pytest
+
+from pip_manager.profiling import NULL_SPAN
+from pip_manager.profiling import Profiler
+from pip_manager.profiling import percentile
+
+
+@pytest.fixture
+def profiler():
+    profiler = Profiler()
+    profiler.enable()
+    return profiler
+
+
+def test_disabled():
+    profiler = Profiler()
+
+    with profiler.span('render') as span:
+        pass
+    profiler.record('startup.imports', 0, 1)
+
+    assert span is NULL_SPAN
+    assert profiler.events == []
+
+
+def test_span(profiler):
+    with profiler.span('resolve', 'resolve', project='flask'):
+        pass
+
+    event, = profiler.events
+    assert (event.name, event.category, event.args) == ('resolve', 'resolve', {'project': 'flask'})
+    assert event.duration >= 0
+
+
+def test_span_records_on_exception(profiler):
+    with pytest.raises(ValueError):
+        with profiler.span('render'):
+            raise ValueError
+
+    assert [e.name for e in profiler.events] == ['render']
+
+
+@pytest.mark.parametrize('fraction, expected', [
+    (0.5, 5),
+    (0.95, 10),
+    (0.01, 1),
+])
+def test_percentile(fraction, expected):
+    assert percentile(list(range(1, 11)), fraction) == expected
+
+
+def test_percentile_empty():
+    assert percentile([], 0.5) == 0.0
+
+
+def test_get_summary(profiler):
+    profiler.record('startup.imports', 0.0, 0.5)
+    for duration in (0.3, 0.1, 0.2):
+        profiler.record('resolve', 1.0, 1.0 + duration)
+
+    imports, resolve = profiler.get_summary()
+
+    assert imports == ('startup.imports', 1, 0.5, 0.5, 0.5, 0.5)
+    assert (resolve.name, resolve.count) == ('resolve', 3)
+    assert resolve[2:] == pytest.approx((0.6, 0.2, 0.3, 0.3))
+
+
+def test_format_summary(profiler):
+    profiler.record('render', 0.0, 0.002)
+
+    header, row = profiler.format_summary().splitlines()
+
+    assert header.split() == ['span', 'count', 'total', 'ms', 'p50', 'ms', 'p95', 'ms', 'max', 'ms']
+    assert row.split() == ['render', '1', '2.0', '2.00', '2.00', '2.00']
+
+
+def test_report_trace(profiler, tmpdir):
+    path = str(tmpdir.join('trace.json'))
+    profiler.record('render', profiler.origin + 1, profiler.origin + 1.5, 'render', {'rows': 3})
+    out = io.StringIO()
+
+    profiler.report(path, out)
+
+    with open(path) as f:
+        event, = json.load(f)['traceEvents']
+    assert event['name'] == 'render'
+    assert event['ph'] == 'X'
+    assert (event['ts'], event['dur']) == (1e6, 5e5)
+    assert event['args'] == {'rows': 3}
+    assert out.getvalue().endswith('Profile written to {}\n'.format(path))
+
+
+def test_report_cprofile(tmpdir):
+    path = str(tmpdir.join('profile.prof'))
+    profiler = Profiler()
+    profiler.enable(cprofile=True)
+    sum(range(10))
+    out = io.StringIO()
+
+    profiler.report(path, out)
+
+    assert tmpdir.join('profile.prof').size() > 0
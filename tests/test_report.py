@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+import json
+
+import pytest
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+from pip_manager.distribution import Distribution
+from pip_manager.environment import Environment
+from pip_manager.report import list_outdated
+from pip_manager.utils import ProtectedMatcher
+
+
+@pytest.fixture(autouse=True)
+def protected(mocker):
+    mocker.patch('pip_manager.report.get_protected_dists').return_value = ProtectedMatcher(['wheel'])
+
+
+@pytest.fixture
+def pm(mocker):
+    pm = mocker.Mock(environments=None)
+    pm.resolver.iter_resolved.return_value = iter([
+        Distribution(name='flask', version='1.0.0', newest_version='1.0.2'),
+        Distribution(name='pip', version='9.0.3', newest_version='9.0.3'),
+        Distribution(name='pytest', version='3.5.0', newest_version='n/a'),
+        Distribution(name='wheel', version='0.30.0', newest_version='0.31.1'),
+    ])
+    return pm
+
+
+def test_list_outdated_json(pm):
+    out = StringIO()
+
+    assert list_outdated(pm, 'json', out) == 1
+    assert [json.loads(line) for line in out.getvalue().splitlines()] == [
+        {'name': 'flask', 'version': '1.0.0', 'newest_version': '1.0.2', 'protected': False},
+        {'name': 'wheel', 'version': '0.30.0', 'newest_version': '0.31.1', 'protected': True},
+    ]
+
+
+def test_list_outdated_csv(pm):
+    out = StringIO()
+
+    assert list_outdated(pm, 'csv', out) == 1
+    assert out.getvalue().splitlines() == [
+        'name,version,newest_version,protected',
+        'flask,1.0.0,1.0.2,False',
+        'wheel,0.30.0,0.31.1,True',
+    ]
+
+
+def test_list_outdated_up_to_date(mocker):
+    pm = mocker.Mock(environments=None)
+    pm.resolver.iter_resolved.return_value = iter([
+        Distribution(name='pip', version='9.0.3', newest_version='9.0.3'),
+    ])
+    out = StringIO()
+
+    assert list_outdated(pm, 'json', out) == 0
+    assert out.getvalue() == ''
+
+
+def test_list_outdated_environments(mocker):
+    env = Environment('/a/bin/python', 'a', (), '22.0')
+    pm = mocker.Mock(environments=['/a'])
+    pm.resolver.iter_resolved.return_value = iter([
+        Distribution(name='flask', version='1.0.0', newest_version='1.0.2', env=env),
+    ])
+    out = StringIO()
+
+    assert list_outdated(pm, 'csv', out) == 1
+    assert out.getvalue().splitlines() == [
+        'name,version,newest_version,protected,env_label',
+        'flask,1.0.0,1.0.2,False,a',
+    ]
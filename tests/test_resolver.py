@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+import threading
+
+from pip_manager.distribution import PENDING
+from pip_manager.resolver import Resolver
+
+
+class DummyDistribution(object):
+    def __init__(self, name, newest_version='1.0', resolved=None, release=None):
+        self.name = name
+        self.newest_version = PENDING
+        self._newest_version = newest_version
+        self._resolved = resolved
+        self._release = release
+        self.started = threading.Event()
+
+    def get_newest_version(self):
+        self.started.set()
+        if self._release is not None:
+            self._release.wait()
+        if self._resolved is not None:
+            self._resolved.append(self.name)
+        if self._newest_version is None:
+            raise RuntimeError
+        return self._newest_version
+
+
+def test_iter_resolved():
+    dists = [DummyDistribution('a', '1.0'), DummyDistribution('b', '2.0')]
+    resolver = Resolver(dists, workers=4)
+
+    assert sorted(d.name for d in resolver.iter_resolved()) == ['a', 'b']
+    assert resolver.is_finished
+    assert [d.newest_version for d in dists] == ['1.0', '2.0']
+
+
+def test_failing_lookup():
+    dists = [DummyDistribution('a', None)]
+    resolver = Resolver(dists, workers=1)
+
+    list(resolver.iter_resolved())
+
+    assert dists[0].newest_version == 'n/a'
+
+
+def test_drain_applies_only_finished():
+    release = threading.Event()
+    dists = [DummyDistribution('a', release=release)]
+    resolver = Resolver(dists, workers=1)
+
+    assert resolver.drain() == []
+    assert dists[0].newest_version == PENDING
+    assert not resolver.is_finished
+
+    release.set()
+    list(resolver.iter_resolved())
+    assert dists[0].newest_version == '1.0'
+
+
+def test_prioritize():
+    release = threading.Event()
+    resolved = []
+    dists = [DummyDistribution(name, resolved=resolved, release=release) for name in 'abcdef']
+    resolver = Resolver(dists, workers=1)
+    dists[0].started.wait()
+
+    resolver.prioritize(dists[4:6])
+    resolver.prioritize(dists[2:4])
+    release.set()
+    list(resolver.iter_resolved())
+
+    # 'a' was taken by the worker before anything got prioritized.
+    assert resolved == ['a', 'c', 'd', 'e', 'f', 'b']
+    assert resolver.resolved == resolver.total == 6
+
+
+def test_deduplicates_lookups():
+    resolved = []
+    dists = [
+        DummyDistribution('a', '1.0', resolved=resolved),
+        DummyDistribution('b', '2.0', resolved=resolved),
+        DummyDistribution('a', '1.0', resolved=resolved),
+    ]
+    resolver = Resolver(dists, workers=4)
+
+    assert len(list(resolver.iter_resolved())) == 3
+    assert sorted(resolved) == ['a', 'b']
+    assert [d.newest_version for d in dists] == ['1.0', '2.0', '1.0']
+    assert resolver.resolved == resolver.total == 3
+
+
+def test_add():
+    dists = [DummyDistribution('a', '1.0')]
+    resolver = Resolver(dists, workers=2)
+    list(resolver.iter_resolved())
+
+    added = [DummyDistribution('a', '9.9'), DummyDistribution('b', '2.0'), DummyDistribution('c', '3.0')]
+    resolver.add(added)
+
+    assert added[0].newest_version == '1.0'
+    assert not resolver.is_finished
+    assert sorted(d.name for d in resolver.iter_resolved()) == ['b', 'c']
+    assert [d.newest_version for d in added] == ['1.0', '2.0', '3.0']
+    assert resolver.resolved == resolver.total == 4
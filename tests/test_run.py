@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from pip_manager import run
+from pip_manager.advisories import InvalidAdvisoryDatabase
+from pip_manager.environment import InvalidEnvironment
+from pip_manager.wheelstore import StoreStats
+
+
+def test_main(mocker):
+    mocker.patch('sys.argv', ['pip-manager', '--refresh'])
+    mocked_PipManager = mocker.patch('pip_manager.run.PipManager')
+
+    run.main()
+
+    mocked_PipManager.assert_called_with(refresh=True)
+    assert mocked_PipManager.return_value.mainloop.called
+
+
+def test_main_list_outdated(mocker):
+    mocker.patch('sys.argv', ['pip-manager', '--list-outdated', '--format', 'csv'])
+    mocked_PipManager = mocker.patch('pip_manager.run.PipManager')
+    mocked_list_outdated = mocker.patch('pip_manager.run.list_outdated')
+    mocked_list_outdated.return_value = 1
+
+    with pytest.raises(SystemExit) as e:
+        run.main()
+
+    assert e.value.code == 1
+    mocked_PipManager.assert_called_with(refresh=False, headless=True)
+    mocked_list_outdated.assert_called_with(mocked_PipManager.return_value, 'csv')
+    assert not mocked_PipManager.return_value.mainloop.called
+
+
+def test_main_environments(mocker):
+    mocker.patch('sys.argv', ['pip-manager', '--env', '/venvs/a', '--env', 'python3.6'])
+    mocked_PipManager = mocker.patch('pip_manager.run.PipManager')
+
+    run.main()
+
+    mocked_PipManager.assert_called_with(refresh=False, environments=['/venvs/a', 'python3.6'])
+
+
+def test_main_invalid_environment(mocker):
+    mocker.patch('sys.argv', ['pip-manager', '--env', '/venvs/a'])
+    mocker.patch('pip_manager.run.PipManager', side_effect=InvalidEnvironment('No python interpreter found in /venvs/a'))
+
+    with pytest.raises(SystemExit) as e:
+        run.main()
+
+    assert e.value.code == 'No python interpreter found in /venvs/a'
+
+
+def test_main_advisory_db(mocker):
+    mocker.patch('sys.argv', ['pip-manager', '--advisory-db', '/srv/osv'])
+    mocked_PipManager = mocker.patch('pip_manager.run.PipManager')
+
+    run.main()
+
+    mocked_PipManager.assert_called_with(refresh=False, advisory_db='/srv/osv')
+
+
+def test_main_invalid_advisory_db(mocker):
+    mocker.patch('sys.argv', ['pip-manager', '--advisory-db', '/srv/osv'])
+    mocker.patch('pip_manager.run.PipManager', side_effect=InvalidAdvisoryDatabase('Advisory database not found: /srv/osv'))
+
+    with pytest.raises(SystemExit) as e:
+        run.main()
+
+    assert e.value.code == 'Advisory database not found: /srv/osv'
+
+
+def test_main_pre(mocker):
+    mocker.patch('sys.argv', ['pip-manager', '--pre'])
+    mocked_PipManager = mocker.patch('pip_manager.run.PipManager')
+
+    run.main()
+
+    mocked_PipManager.assert_called_with(refresh=False, pre=True)
+
+
+def test_main_find_links(mocker):
+    mocker.patch('sys.argv', ['pip-manager', '--find-links', '/wheels', '--find-links', 'more', '--mirror', '/mirror'])
+    mocked_PipManager = mocker.patch('pip_manager.run.PipManager')
+
+    run.main()
+
+    mocked_PipManager.assert_called_with(refresh=False, find_links=['/wheels', 'more'], mirror='/mirror')
+
+
+@pytest.mark.parametrize('argv, expected', [
+    (['--profile'], None),
+    (['--profile-output', 'trace.json'], 'trace.json'),
+])
+def test_main_profile(argv, expected, mocker):
+    mocker.patch('sys.argv', ['pip-manager'] + argv)
+    mocker.patch('pip_manager.run.PipManager')
+    mocked_start_profiling = mocker.patch('pip_manager.run.start_profiling')
+
+    run.main()
+
+    mocked_start_profiling.assert_called_with(expected)
+
+
+@pytest.mark.parametrize('output, cprofile', [
+    (None, False),
+    ('trace.json', False),
+    ('stats.prof', True),
+])
+def test_start_profiling(output, cprofile, mocker):
+    mocked_profiler = mocker.patch('pip_manager.run.profiler')
+    mocked_atexit = mocker.patch('pip_manager.run.atexit')
+
+    run.start_profiling(output)
+
+    mocked_profiler.enable.assert_called_with(cprofile=cprofile)
+    assert mocked_profiler.record.call_args[0][0] == 'startup.imports'
+    mocked_atexit.register.assert_called_with(mocked_profiler.report, output)
+
+
+@pytest.mark.parametrize('target', ['-', 'lock.json'])
+def test_main_export(target, mocker, tmpdir):
+    tmpdir.chdir()
+    mocker.patch('sys.argv', ['pip-manager', '--export', target])
+    mocked_PipManager = mocker.patch('pip_manager.run.PipManager')
+    mocked_export_lockfile = mocker.patch('pip_manager.run.export_lockfile')
+    mocked_export_lockfile.return_value = 0
+
+    with pytest.raises(SystemExit) as e:
+        run.main()
+
+    assert e.value.code == 0
+    mocked_PipManager.assert_called_with(refresh=False, headless=True)
+    assert mocked_export_lockfile.call_args[0][0] is mocked_PipManager.return_value
+    assert tmpdir.join('lock.json').check() is (target != '-')
+
+
+@pytest.mark.parametrize('argv, dry_run', [
+    (['--sync', 'lock.json'], False),
+    (['--sync', 'lock.json', '--dry-run'], True),
+])
+def test_main_sync(argv, dry_run, mocker, tmpdir):
+    tmpdir.chdir()
+    tmpdir.join('lock.json').write('{"lockfile_version": 1, "packages": []}')
+    mocker.patch('sys.argv', ['pip-manager'] + argv)
+    mocked_PipManager = mocker.patch('pip_manager.run.PipManager')
+    mocked_sync_lockfile = mocker.patch('pip_manager.run.sync_lockfile')
+    mocked_sync_lockfile.return_value = 1
+
+    with pytest.raises(SystemExit) as e:
+        run.main()
+
+    assert e.value.code == 1
+    mocked_PipManager.assert_called_with(refresh=False, headless=True)
+    mocked_sync_lockfile.assert_called_with(mocked_PipManager.return_value, [], dry_run)
+
+
+def test_main_sync_invalid_lockfile(mocker, tmpdir):
+    tmpdir.chdir()
+    tmpdir.join('lock.json').write('[]')
+    mocker.patch('sys.argv', ['pip-manager', '--sync', 'lock.json'])
+    mocked_PipManager = mocker.patch('pip_manager.run.PipManager')
+
+    with pytest.raises(SystemExit) as e:
+        run.main()
+
+    assert e.value.code == 'Unsupported lockfile version (expected 1)'
+    assert not mocked_PipManager.called
+
+
+def test_main_wheel_store_stats(mocker, capsys):
+    mocker.patch('sys.argv', ['pip-manager', '--wheel-store-stats'])
+    mocker.patch('pip_manager.run.get_wheel_store_size').return_value = 1024 * 1024
+    mocked_WheelStore = mocker.patch('pip_manager.run.WheelStore')
+    mocked_WheelStore.return_value.get_stats.return_value = StoreStats(0, 0, 1024 * 1024, 0, 0)
+    mocked_PipManager = mocker.patch('pip_manager.run.PipManager')
+
+    with pytest.raises(SystemExit) as e:
+        run.main()
+
+    assert e.value.code == 0
+    mocked_WheelStore.assert_called_with(max_size=1024 * 1024)
+    assert capsys.readouterr().out == 'Wheel store: 0 wheels, 0.0 of 1 MB, 0 hits, 0 misses (0% hit rate)\n'
+    assert not mocked_PipManager.called
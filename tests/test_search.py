@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from pip_manager.search import SearchIndex
+from pip_manager.search import is_subsequence
+
+NAMES = ['flask', 'flask-login', 'pip', 'pytest', 'pytest-flask', 'six']
+
+
+@pytest.mark.parametrize('query, name, expected', [
+    ('', 'flask', True),
+    ('flsk', 'flask', True),
+    ('fl', 'flask', True),
+    ('kf', 'flask', False),
+    ('flasks', 'flask', False),
+])
+def test_is_subsequence(query, name, expected):
+    assert is_subsequence(query, name) is expected
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('', [0, 1, 2, 3, 4, 5]),
+    ('flask', [0, 1, 4]),
+    ('Flask', [0, 1, 4]),
+    ('flask_login', [1]),
+    ('pt', [3, 4]),
+    ('ptf', [4]),
+    ('s', [0, 1, 3, 4, 5]),
+    ('zzz', []),
+])
+def test_search(query, expected):
+    assert SearchIndex(NAMES).search(query) == expected
+
+
+def test_search_substring_matches_first():
+    index = SearchIndex(['flask-login', 'login-flask', 'lg'])
+    assert index.search('lg') == [2, 0, 1]
+
+
+def test_search_incremental(mocker):
+    index = SearchIndex(NAMES)
+    assert index.search('p') == [2, 3, 4]
+
+    spy = mocker.spy(index, '_candidates')
+    assert index.search('py') == [3, 4]
+    assert index.search('pyt') == [3, 4]
+    assert index.search('py') == [3, 4]
+    assert index.search('pi') == [2]
+    assert not spy.called
+
+    assert index.search('s') == [0, 1, 3, 4, 5]
+    assert spy.call_count == 1
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from pip_manager import utils
+
+
+@pytest.fixture
+def config_file(mocker, tmpdir):
+    config = tmpdir.join('config.ini')
+    mocker.patch('pip_manager.utils.get_config_files').return_value = [str(config)]
+    mocker.patch('pip_manager.utils._config', utils._Config())
+    return config
+
+
+def test_get_protected_dists(config_file):
+    config_file.write('[protected]\npip =\nwheel =\n')
+    assert list(utils.get_protected_dists()) == ['pip', 'wheel']
+
+
+@pytest.mark.parametrize('content, expected', [
+    ('[settings]\nworkers = 4\n', 4),
+    ('[settings]\nworkers = 0\n', 1),
+    ('[settings]\nworkers = many\n', utils.DEFAULT_WORKERS),
+    ('[settings]\n', utils.DEFAULT_WORKERS),
+    ('', utils.DEFAULT_WORKERS),
+])
+def test_get_workers_count(content, expected, config_file):
+    config_file.write(content)
+    assert utils.get_workers_count() == expected
+
+
+@pytest.mark.parametrize('content, expected', [
+    ('[settings]\npre = true\n', True),
+    ('[settings]\npre = no\n', False),
+    ('[settings]\npre = maybe\n', False),
+    ('', False),
+])
+def test_get_allow_prereleases(content, expected, config_file):
+    config_file.write(content)
+    assert utils.get_allow_prereleases() is expected
+
+
+@pytest.mark.parametrize('content, find_links, mirror', [
+    ('[settings]\nfind_links = /wheels\n  /more-wheels\nmirror = /mirror/simple\n', ['/wheels', '/more-wheels'], '/mirror/simple'),
+    ('[settings]\nfind_links =\nmirror =\n', [], None),
+    ('', [], None),
+])
+def test_get_find_links_and_mirror(content, find_links, mirror, config_file):
+    config_file.write(content)
+    assert utils.get_find_links() == find_links
+    assert utils.get_mirror() == mirror
+
+
+@pytest.mark.parametrize('content, expected', [
+    ('[settings]\nwheel_store_size = 100\n', 100 * 1024 * 1024),
+    ('[settings]\nwheel_store_size = -1\n', 0),
+    ('[settings]\nwheel_store_size = lots\n', 0),
+    ('', 0),
+])
+def test_get_wheel_store_size(content, expected, config_file):
+    config_file.write(content)
+    assert utils.get_wheel_store_size() == expected
+
+
+@pytest.mark.parametrize('content, use_pip_worker, worker_timeout', [
+    ('[settings]\npip_worker = false\nworker_timeout = 30\n', False, 30),
+    ('[settings]\npip_worker = maybe\nworker_timeout = 0\n', True, 1),
+    ('', True, utils.DEFAULT_WORKER_TIMEOUT),
+])
+def test_get_pip_worker_settings(content, use_pip_worker, worker_timeout, config_file):
+    config_file.write(content)
+    assert utils.get_use_pip_worker() is use_pip_worker
+    assert utils.get_worker_timeout() == worker_timeout
+
+
+@pytest.mark.parametrize('content, expected', [
+    ('[settings]\nadvisory_db = /srv/osv/PyPI\n', '/srv/osv/PyPI'),
+    ('[settings]\nadvisory_db =\n', None),
+    ('', None),
+])
+def test_get_advisory_db(content, expected, config_file):
+    config_file.write(content)
+    assert utils.get_advisory_db() == expected
+
+
+@pytest.mark.parametrize('patterns, name, expected', [
+    (['pip'], 'pip', True),
+    (['pip'], 'pipenv', False),
+    (['django-*'], 'Django_Extensions', True),
+    (['zope.*'], 'zope-interface', True),
+    (['py?est'], 'pytest', True),
+    ([], 'pip', False),
+])
+def test_protected_matcher(patterns, name, expected):
+    assert (name in utils.ProtectedMatcher(patterns)) is expected
+
+
+@pytest.fixture
+def config_files(mocker, tmpdir):
+    files = [tmpdir.join('package.ini'), tmpdir.join('user.ini'), tmpdir.join('project.ini')]
+    mocker.patch('pip_manager.utils.get_config_files').return_value = [str(f) for f in files]
+    mocker.patch('pip_manager.utils._config', utils._Config())
+    return files
+
+
+def test_layered_config(config_files):
+    package, user, project = config_files
+    package.write('[protected]\npip =\nwheel =\n[settings]\nworkers = 8\ncache_ttl = 60\n')
+    user.write('[protected]\ndjango-* =\nwheel = false\n[settings]\nworkers = 4\n')
+    project.write('[settings]\nworkers = 2\n')
+
+    assert list(utils.get_protected_dists()) == ['django-*', 'pip']
+    assert utils.get_workers_count() == 2
+    assert utils.get_cache_ttl() == 60
+
+
+def test_config_loaded_once(mocker, config_files):
+    config_files[0].write('[protected]\npip =\n')
+    spy = mocker.spy(utils, 'ConfigParser')
+
+    matcher = utils.get_protected_dists()
+    loaded = spy.call_count
+    utils.get_workers_count()
+
+    assert utils.get_protected_dists() is matcher
+    assert loaded > 0
+    assert spy.call_count == loaded
+
+
+def test_invalid_config_file_skipped(config_files):
+    config_files[0].write('[protected]\npip =\n\n[settings]\nworkers = 4\n')
+    config_files[1].write('[protected]\nfoo\n')
+
+    with pytest.warns(UserWarning, match='Skipping invalid config file'):
+        assert list(utils.get_protected_dists()) == ['pip']
+    assert utils.get_workers_count() == 4
+
+
+def test_config_reloaded_on_change(config_files):
+    config_files[0].write('[protected]\npip =\n')
+    assert 'wheel' not in utils.get_protected_dists()
+
+    config_files[1].write('[protected]\nwheel =\n')
+
+    assert 'wheel' in utils.get_protected_dists()
+
+
+def test_get_config_files(mocker, tmpdir):
+    mocker.patch('pip_manager.utils.get_config_dir').return_value = '/home/user/.config/pip-manager'
+    mocker.patch('pip_manager.utils.os.getcwd').return_value = '/project'
+    mocker.patch.dict('os.environ', {'PIP_MANAGER_CONFIG': '/etc/pip-manager.ini'})
+
+    files = utils.get_config_files()
+
+    assert files[0].endswith('config.ini')
+    assert files[1:] == [
+        '/home/user/.config/pip-manager/config.ini',
+        '/project/pip-manager.ini',
+        '/etc/pip-manager.ini',
+    ]
+
+
+def test_get_config_dir(mocker):
+    mocker.patch('pip_manager.utils.sys.platform', 'linux')
+    mocker.patch.dict('os.environ', {'XDG_CONFIG_HOME': '/xdg'})
+
+    assert utils.get_config_dir() == '/xdg/pip-manager'
+
+
+def test_intern_string():
+    name = ''.join(['fla', 'sk'])
+    assert utils.intern_string(name) is utils.intern_string('flask')
+    assert utils.intern_string(u'zope.interface\u00e9') == u'zope.interface\u00e9'
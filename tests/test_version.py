@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+import json
+
+import pytest
+
+from pip_manager import version
+from pip_manager.version import get_newest
+from pip_manager.version import is_newer
+from pip_manager.version import parse_version
+from pip_manager.version import version_key
+
+# Ordered as specified in PEP 440.
+ORDERED = [
+    'not-a-version',
+    '1.0.dev456',
+    '1.0a1',
+    '1.0a2.dev456',
+    '1.0a12.dev456',
+    '1.0a12',
+    '1.0b1.dev456',
+    '1.0b2',
+    '1.0b2.post345.dev456',
+    '1.0b2.post345',
+    '1.0rc1.dev456',
+    '1.0rc1',
+    '1.0',
+    '1.0+abc.5',
+    '1.0+abc.7',
+    '1.0+5',
+    '1.0.post456.dev34',
+    '1.0.post456',
+    '1.0.15',
+    '1.1.dev1',
+    '1!0.1',
+]
+
+
+def test_ordering():
+    assert sorted(reversed(ORDERED), key=version_key) == ORDERED
+
+
+@pytest.mark.parametrize('version1, version2', [
+    ('1.0', '1.0.0'),
+    ('1.0', 'v1.0'),
+    ('1.0alpha1', '1.0a1'),
+    ('1.0-c1', '1.0rc1'),
+    ('1.0-1', '1.0.post1'),
+    ('1.0.rev1', '1.0.post1'),
+    ('1.0.DEV', '1.0.dev0'),
+])
+def test_equivalent(version1, version2):
+    assert version_key(version1) == version_key(version2)
+
+
+@pytest.mark.parametrize('value, is_prerelease', [
+    ('1.0', False),
+    ('1.0.post1', False),
+    ('1.0rc1', True),
+    ('1.0.dev1', True),
+    ('1.0.post1.dev1', True),
+    ('not-a-version', False),
+])
+def test_is_prerelease(value, is_prerelease):
+    assert parse_version(value).is_prerelease is is_prerelease
+
+
+def test_parse_version_memoized(mocker):
+    spy = mocker.spy(version, '_parse')
+    parsed = parse_version('4.2.0-memo')
+
+    assert parse_version('4.2.0-memo') is parsed
+    assert spy.call_count == 1
+
+
+
+def test_parse_version_unicode():
+    assert parse_version(u'1.0\u00e9').key[0] == -1
+    assert parse_version(json.loads('"2.0rc1"')) == parse_version('2.0rc1')
+
+
+@pytest.mark.parametrize('version1, version2, expected', [
+    ('1.0.1', '1.0', True),
+    ('1.0', '1.0.0', False),
+    ('1.0.0', '1.0', False),
+    ('1.0.post1', '1.0', True),
+    ('1.10', '1.9', True),
+])
+def test_is_newer(version1, version2, expected):
+    assert is_newer(version1, version2) is expected
+
+
+@pytest.mark.parametrize('versions, prereleases, expected', [
+    (['1.0', '2.0rc1', '1.1'], False, '1.1'),
+    (['1.0', '2.0rc1', '1.1'], True, '2.0rc1'),
+    (['1.0b1', '1.0a1'], False, '1.0b1'),
+    ([], False, None),
+])
+def test_get_newest(versions, prereleases, expected):
+    assert get_newest(versions, prereleases) == expected
+
+
+@pytest.mark.parametrize('value, specifier, expected', [
+    ('1.4', '', True),
+    ('1.4', '>=1.0,<2', True),
+    ('2.0', '>=1.0,<2', False),
+    ('2.0', '<=2', True),
+    ('2.0.1', '>2', True),
+    ('1.0', '==1.0.0', True),
+    ('1.0+local', '==1.0', True),
+    ('1.0+local', '==1.0+other', False),
+    ('1.0', '!=1.0', False),
+    ('1.3.1', '==1.3.*', True),
+    ('1.4', '==1.3.*', False),
+    ('1.3.1', '!=1.3.*', False),
+    ('1.4.5', '~=1.4.2', True),
+    ('1.5', '~=1.4.2', False),
+    ('1.9', '~=1.4', True),
+    ('2.0', '~=1.4', False),
+    ('1.0', '===1.0', True),
+    ('1.0.0', '===1.0', False),
+    ('2.0rc1', '<2.0', False),
+    ('2.0.dev1', '<2', False),
+    ('1.9rc1', '<2.0', True),
+    ('2.0a1', '<2.0rc1', True),
+    ('2.0.post1', '>2.0', False),
+    ('2.0.post1.dev1', '>2', False),
+    ('2.0.post2', '>2.0.post1', True),
+    ('2.0.post1', '>2.0rc1', True),
+    ('2.0rc1.post1', '>2.0rc1', False),
+    ('2.0.1', '>2.0', True),
+    ('not-a-version', '<1', True),
+    ('1.0', '>=whatever', True),
+])
+def test_matches_specifier(value, specifier, expected):
+    assert version.matches_specifier(value, specifier) is expected
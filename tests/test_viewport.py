@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from pip_manager.distribution import Distribution
+from pip_manager.viewport import ColumnWidths
+from pip_manager.viewport import Viewport
+
+
+@pytest.mark.parametrize('moves, expected_top, expected_cursor', [
+    ([], 0, 0),
+    ([1, 1, 1], 0, 3),
+    ([5], 1, 5),
+    ([9, 1], 5, 9),
+    ([-1], 0, 0),
+    ([9, -4], 5, 5),
+    ([9, -5], 4, 4),
+])
+def test_move(moves, expected_top, expected_cursor):
+    viewport = Viewport(total=10, height=5)
+    for delta in moves:
+        viewport.move(delta)
+    assert (viewport.top, viewport.cursor) == (expected_top, expected_cursor)
+    assert viewport.top <= viewport.cursor < viewport.bottom
+
+
+@pytest.mark.parametrize('cursor, pages, expected_top, expected_cursor', [
+    (1, 1, 4, 5),
+    (1, 2, 8, 9),
+    (1, 3, 8, 9),
+    (9, -1, 2, 5),
+    (9, -5, 0, 3),
+])
+def test_page(cursor, pages, expected_top, expected_cursor):
+    viewport = Viewport(total=12, height=4)
+    viewport.move_to(cursor)
+    viewport.page(pages)
+    assert (viewport.top, viewport.cursor) == (expected_top, expected_cursor)
+
+
+def test_resize_keeps_cursor_visible():
+    viewport = Viewport(total=100, height=10)
+    viewport.move_to(50)
+
+    viewport.resize(height=5)
+    assert viewport.top <= viewport.cursor < viewport.bottom
+
+    viewport.resize(total=20)
+    assert (viewport.top, viewport.cursor, viewport.bottom) == (15, 19, 20)
+
+    viewport.resize(total=0)
+    assert (viewport.top, viewport.cursor, viewport.bottom) == (0, 0, 0)
+
+
+def test_column_widths():
+    flask = Distribution(name='flask', version='1.0.0', newest_version='n/a')
+    zope = Distribution(name='zope-interface', version='4.5', newest_version='n/a')
+    widths = ColumnWidths([flask, zope])
+    assert (widths.name, widths.version) == (14, 5)
+
+    widths.change_version(flask.version, '1.0')
+    flask.version = '1.0'
+    assert (widths.name, widths.version) == (14, 3)
+
+    widths.remove(zope)
+    assert (widths.name, widths.version) == (5, 3)
+
+    widths.add(zope)
+    widths.remove(zope)
+    widths.remove(flask)
+    assert (widths.name, widths.version) == (0, 0)
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import os
+
+import pytest
+
+from pip_manager.commands import InstallResult
+from pip_manager.distribution import Distribution
+from pip_manager.wheelstore import StoreStats
+from pip_manager.wheelstore import WheelStore
+from pip_manager.wheelstore import format_stats
+from pip_manager.wheelstore import install_with_store
+from pip_manager.wheelstore import is_universal
+from pip_manager.wheelstore import parse_wheel_filename
+
+
+@pytest.fixture
+def store(tmpdir):
+    store = WheelStore(path=str(tmpdir.join('store')), max_size=100)
+    yield store
+    store.close()
+
+
+def make_wheel(directory, filename, size=10):
+    path = directory.join(filename)
+    path.write(filename[0] * size, ensure=True)
+    return str(path)
+
+
+@pytest.mark.parametrize('filename, expected', [
+    ('Flask-1.0.2-py2.py3-none-any.whl', ('flask', '1.0.2', 'py2.py3', 'none', 'any')),
+    ('zope.interface-5.0-1-cp36-cp36m-manylinux1_x86_64.whl', ('zope-interface', '5.0', 'cp36', 'cp36m', 'manylinux1_x86_64')),
+    ('Flask-1.0.2.tar.gz', None),
+    ('Flask-1.0.2.whl', None),
+])
+def test_parse_wheel_filename(filename, expected):
+    assert parse_wheel_filename(filename) == expected
+
+
+@pytest.mark.parametrize('filename, expected', [
+    ('six-1.16.0-py2.py3-none-any.whl', True),
+    ('lxml-4.9.0-cp311-cp311-manylinux1_x86_64.whl', False),
+    ('six-1.16.0.tar.gz', False),
+])
+def test_is_universal(filename, expected):
+    assert is_universal(filename) is expected
+
+
+def test_add_find(store, tmpdir):
+    path = make_wheel(tmpdir, 'Flask-1.0.2-py3-none-any.whl')
+
+    wheel, was_stored = store.add(path, now=1000.0)
+
+    assert not was_stored
+    assert wheel.sha256 == hashlib.sha256(b'F' * 10).hexdigest()
+    assert (wheel.name, wheel.version, wheel.size) == ('flask', '1.0.2', 10)
+    assert os.path.isfile(store.get_wheel_path(wheel))
+    assert store.get_wheel_path(wheel).endswith(os.path.join(wheel.sha256[:2], wheel.sha256, 'Flask-1.0.2-py3-none-any.whl'))
+    assert store.find('Flask', '1.0.2') == [wheel]
+    assert store.find('flask', '1.0.1') == []
+    assert store.add(path, now=1001.0) == (wheel._replace(last_used=1001.0), True)
+
+
+def test_add_not_wheel(store, tmpdir):
+    assert store.add(make_wheel(tmpdir, 'Flask-1.0.2.tar.gz')) == (None, False)
+
+
+def test_add_restores_missing_file(store, tmpdir):
+    path = make_wheel(tmpdir, 'Flask-1.0.2-py3-none-any.whl')
+    wheel, _ = store.add(path)
+    os.remove(store.get_wheel_path(wheel))
+
+    store.add(path)
+
+    assert os.path.isfile(store.get_wheel_path(wheel))
+
+
+def test_evict_least_recently_used(store, tmpdir):
+    wheels = [
+        store.add(make_wheel(tmpdir, '{}-1.0-py3-none-any.whl'.format(name), size=40), now=now)[0]
+        for name, now in (('a', 1000.0), ('b', 1001.0), ('c', 1002.0))
+    ]
+    store.touch([wheels[0]], now=1003.0)
+
+    assert store.evict() == [wheels[1]]
+    assert not os.path.exists(os.path.dirname(store.get_wheel_path(wheels[1])))
+    assert store.find('b', '1.0') == []
+    assert store.get_stats().size == 80
+
+
+def test_evict_keeps_given_wheels(store, tmpdir):
+    wheels = [
+        store.add(make_wheel(tmpdir, '{}-1.0-py3-none-any.whl'.format(name), size=40), now=now)[0]
+        for name, now in (('a', 1000.0), ('b', 1001.0), ('c', 1002.0))
+    ]
+
+    assert store.evict(keep=[wheels[0]]) == [wheels[1]]
+    assert store.find('a', '1.0') == [wheels[0]]
+
+
+def test_write_index(store, tmpdir):
+    wheel, _ = store.add(make_wheel(tmpdir, 'Flask-1.0.2-py3-none-any.whl'))
+
+    store.write_index()
+
+    with open(store.index_path) as f:
+        assert '<a href="{0}/{1}/Flask-1.0.2-py3-none-any.whl#sha256={1}">'.format(wheel.sha256[:2], wheel.sha256) in f.read()
+    assert store.pip_args == ['--find-links', store.index_path]
+
+
+def test_stats(store, tmpdir):
+    store.add(make_wheel(tmpdir, 'Flask-1.0.2-py3-none-any.whl'))
+    store.record(hits=2, misses=1)
+    store.record(hits=1)
+
+    assert store.get_stats() == StoreStats(1, 10, 100, 3, 1)
+
+
+def test_stats_disabled(tmpdir):
+    tmpdir.join('file').write('')
+    store = WheelStore(path=str(tmpdir.join('file')), max_size=100)
+
+    assert store.get_stats() == StoreStats(0, 0, 100, 0, 0)
+    assert store.find('flask', '1.0') == []
+
+
+def test_format_stats():
+    assert format_stats(StoreStats(3, 5 * 1024 * 1024, 1024 * 1024 * 1024, 3, 1)) == (
+        'Wheel store: 3 wheels, 5.0 of 1024 MB, 3 hits, 1 misses (75% hit rate)'
+    )
+
+
+def test_install_with_store(mocker, store, tmpdir):
+    store.add(make_wheel(tmpdir, 'six-1.16.0-py2.py3-none-any.whl'))
+    store.add(make_wheel(tmpdir, 'lxml-4.9.0-cp311-cp311-manylinux1_x86_64.whl'))
+    stored_lxml = make_wheel(tmpdir.join('copy'), 'lxml-4.9.0-cp311-cp311-manylinux1_x86_64.whl')
+
+    def pip_wheel(requirements, wheel_dir, **kwargs):
+        with open(os.path.join(wheel_dir, 'flask-1.0.2-py3-none-any.whl'), 'w') as f:
+            f.write('flask')
+        os.rename(stored_lxml, os.path.join(wheel_dir, 'lxml-4.9.0-cp311-cp311-manylinux1_x86_64.whl'))
+        return 0
+
+    mocked_pip_wheel = mocker.patch('pip_manager.wheelstore.pip_wheel', side_effect=pip_wheel)
+    mocked_pip_install = mocker.patch('pip_manager.wheelstore.pip_install')
+    mocked_pip_install.return_value = InstallResult(0, {}, '')
+    lines = []
+    distributions = [
+        Distribution(name='flask', version='1.0.0', newest_version='1.0.2'),
+        Distribution(name='lxml', version='4.8.0', newest_version='4.9.0'),
+        Distribution(name='six', version='1.15.0', newest_version='1.16.0'),
+    ]
+
+    result = install_with_store(store, distributions, python='/a/bin/python', pip_version='22.0', on_line=lines.append, extra_args=['--no-index'])
+
+    assert result is mocked_pip_install.return_value
+    assert mocked_pip_wheel.call_args[0][0] == ['flask==1.0.2', 'lxml==4.9.0']
+    assert mocked_pip_wheel.call_args[1]['extra_args'] == ['--no-index'] + store.pip_args
+    mocked_pip_install.assert_called_with(
+        ['flask', 'lxml', 'six'], python='/a/bin/python', pip_version='22.0', on_line=lines.append,
+        extra_args=['--no-index'] + store.pip_args,
+    )
+    assert lines == ['Wheel store: 2 hits, 1 misses']
+    assert store.get_stats().hits == 2
+    assert [w.filename for w in store.find('flask', '1.0.2')] == ['flask-1.0.2-py3-none-any.whl']
+    assert os.path.isfile(store.index_path)
+
+
+def test_install_with_store_all_stored(mocker, store, tmpdir):
+    store.add(make_wheel(tmpdir, 'six-1.16.0-py2.py3-none-any.whl'), now=1000.0)
+    mocked_pip_wheel = mocker.patch('pip_manager.wheelstore.pip_wheel')
+    mocker.patch('pip_manager.wheelstore.pip_install')
+
+    install_with_store(store, [Distribution(name='six', version='1.15.0', newest_version='1.16.0')])
+
+    assert not mocked_pip_wheel.called
+    assert store.find('six', '1.16.0')[0].last_used > 1000.0
+
+
+def test_install_with_store_keeps_reused_wheel(mocker, store, tmpdir):
+    six, _ = store.add(make_wheel(tmpdir, 'six-1.16.0-py2.py3-none-any.whl', size=40), now=1000.0)
+    store.add(make_wheel(tmpdir, 'attrs-22.1.0-py3-none-any.whl', size=40), now=2000.0)
+
+    def pip_wheel(requirements, wheel_dir, **kwargs):
+        with open(os.path.join(wheel_dir, 'flask-1.0.2-py3-none-any.whl'), 'w') as f:
+            f.write('f' * 40)
+        return 0
+
+    mocker.patch('pip_manager.wheelstore.pip_wheel', side_effect=pip_wheel)
+    mocker.patch('pip_manager.wheelstore.pip_install')
+
+    install_with_store(store, [
+        Distribution(name='flask', version='1.0.0', newest_version='1.0.2'),
+        Distribution(name='six', version='1.15.0', newest_version='1.16.0'),
+    ])
+
+    assert [w.sha256 for w in store.find('six', '1.16.0')] == [six.sha256]
+    assert os.path.isfile(store.get_wheel_path(six))
+    assert store.find('attrs', '22.1.0') == []
+    with open(store.index_path) as f:
+        assert 'six-1.16.0-py2.py3-none-any.whl' in f.read()
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+import io
+import json
+import sys
+
+import pytest
+
+from pip_manager import worker
+from pip_manager.worker import PipWorker
+from pip_manager.worker import WorkerError
+from pip_manager.worker import WorkerPool
+from pip_manager.worker import read_frame
+from pip_manager.worker import write_frame
+
+SILENT_WORKER = (
+    'import os, sys, time\n'
+    'out = os.fdopen(os.dup(1), "wb")\n'
+    'out.write(b\'12\\n{"ready": 1}\'); out.flush()\n'
+    'sys.stdin.readline(); time.sleep(30)\n'
+)
+
+
+def test_frames():
+    stream = io.BytesIO()
+    write_frame(stream, {'args': ['install', u'zażółć']})
+    write_frame(stream, {'returncode': 0})
+    stream.seek(0)
+
+    assert read_frame(stream) == {'args': ['install', u'zażółć']}
+    assert read_frame(stream) == {'returncode': 0}
+    assert read_frame(stream) is None
+
+
+def test_read_truncated_frame():
+    assert read_frame(io.BytesIO(b'10\n{"a"')) is None
+
+
+@pytest.fixture
+def pip_worker():
+    pip_worker = PipWorker(sys.executable)
+    yield pip_worker
+    pip_worker.close()
+
+
+def test_run(pip_worker):
+    lines = []
+
+    returncode, output = pip_worker.run(['list', '--format', 'json'], lines.append, timeout=60)
+
+    assert returncode == 0
+    assert 'pip' in [d['name'] for d in json.loads(output)]
+    assert lines == output.splitlines()
+    assert pip_worker.pip_version
+
+
+def test_run_many(pip_worker):
+    pid = pip_worker.process.pid
+
+    assert pip_worker.run(['--version'], timeout=60)[0] == 0
+    assert pip_worker.run(['no-such-command'], timeout=60)[0] != 0
+    assert pip_worker.run(['--version'], timeout=60)[0] == 0
+    assert pip_worker.process.pid == pid
+
+
+def test_run_after_crash(pip_worker):
+    pip_worker.run(['--version'], timeout=60)
+    pip_worker.process.kill()
+    pip_worker.process.wait()
+
+    with pytest.raises(WorkerError):
+        pip_worker.run(['--version'], timeout=60)
+
+
+def test_run_timeout(mocker):
+    mocker.patch('pip_manager.worker.WORKER', SILENT_WORKER)
+    pip_worker = PipWorker(sys.executable)
+    lines = []
+
+    assert pip_worker.run(['install', 'flask'], lines.append, timeout=0.2) == (1, 'ERROR: pip worker timed out\n')
+    assert lines == ['ERROR: pip worker timed out']
+    assert not pip_worker.is_alive
+
+
+def test_start_failure():
+    with pytest.raises(WorkerError):
+        PipWorker('/no/such/python')
+
+
+def test_pool_reuses_workers(mocker):
+    pool = WorkerPool(timeout=60)
+    started = mocker.spy(worker, 'PipWorker')
+    try:
+        assert pool.run(sys.executable, ['--version'])[0] == 0
+        assert pool.run(sys.executable, ['--version'])[0] == 0
+        assert started.call_count == 1
+
+        assert pool.run(sys.executable, ['--version'], retire=True)[0] == 0
+        assert started.call_count == 2  # Replacement started right away.
+        assert len(pool._idle[sys.executable]) == 1
+    finally:
+        pool.close()
+
+
+def test_pool_restarts_crashed_worker():
+    pool = WorkerPool(timeout=60)
+    try:
+        pool.prewarm(sys.executable)
+        crashed = pool._idle[sys.executable][0]
+        crashed.run(['--version'])
+        crashed.process.kill()
+        crashed.process.wait()
+
+        assert pool.run(sys.executable, ['--version'])[0] == 0
+        assert pool._idle[sys.executable][0] is not crashed
+    finally:
+        pool.close()
+
+
+def test_pool_cannot_start_worker():
+    assert WorkerPool(timeout=60).run('/no/such/python', ['--version']) is None
+
+
+@pytest.mark.parametrize('enabled', [True, False])
+def test_get_worker_pool(enabled, mocker):
+    mocker.patch('pip_manager.worker._worker_pool', None)
+    mocker.patch('pip_manager.worker.get_use_pip_worker').return_value = enabled
+    mocker.patch('pip_manager.worker.get_worker_timeout').return_value = 5
+    mocked_register = mocker.patch('pip_manager.worker.atexit.register')
+
+    pool = worker.get_worker_pool()
+
+    if enabled:
+        assert pool.timeout == 5
+        assert worker.get_worker_pool() is pool
+        mocked_register.assert_called_once_with(pool.close)
+    else:
+        assert pool is None